@@ -1,7 +1,16 @@
 from api.utils.models import ProfileUpdateRequest
-from api.utils.functions import get_current_user_id, get_avatar, generate_unique_filename
+from api.utils.auth_cache import user_exists_cache
+from api.utils.batch import BatchIds, batch_response
+from api.utils.friend_graph import friend_graph
+from api.utils.functions import get_current_user_id, generate_unique_filename
+from api.utils.home_feed import home_feed
+from api.utils.http_cache import cached_response, entity_cache, make_etag, serialize
+from api.utils.query_trace import query_budget
+from api.utils.recommendations import recommendation_engine
+from api.utils.search_index import search_index
 from api.utils.supabase_client import supabase_client, AVATAR_BUCKET
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from api.utils.uploads import IMAGE_UPLOAD_BODY, image_processor, limit_upload_size, receive_image
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 
 profile_router = APIRouter(
@@ -11,12 +20,12 @@ profile_router = APIRouter(
 
 
 @profile_router.get('/me')
-def get_me(user_id: int = Depends(get_current_user_id)):
+async def get_me(user_id: int = Depends(get_current_user_id)):
     return user_id
 
 
 @profile_router.patch("")
-def update_profile(
+async def update_profile(
         profile_data: ProfileUpdateRequest,
         user_id: int = Depends(get_current_user_id)
 ):
@@ -24,109 +33,132 @@ def update_profile(
     if not update_data:
         raise HTTPException(status_code=400, detail="No data provided for update")
 
-    supabase_client.table("users").update(update_data).eq("id", user_id).execute()
+    updated = (await supabase_client.table("users").update(update_data).eq("id", user_id).execute()).data
+    entity_cache.invalidate(("user", user_id))
+    if "tags" in update_data:
+        recommendation_engine.invalidate_user(user_id)
+        home_feed.invalidate(user_id)
+    if updated and update_data.keys() & {"first_name", "last_name"}:
+        search_index.upsert("users", updated[0])
 
     return {"msg": "Profile updated successfully"}
 
 
 @profile_router.delete("")
-def delete_profile(user_id: int = Depends(get_current_user_id)):
-    supabase_client.table("users").delete().eq("id", user_id).execute()
+async def delete_profile(user_id: int = Depends(get_current_user_id)):
+    await supabase_client.table("users").delete().eq("id", user_id).execute()
+    friend_graph.invalidate(user_id)
+    recommendation_engine.invalidate_user(user_id)
+    home_feed.invalidate(user_id)
+    user_exists_cache.invalidate(user_id)
+    search_index.remove("users", user_id)
+    entity_cache.invalidate(("user", user_id))
 
     return {"msg": "Profile deleted successfully"}
 
 
-@profile_router.get("/{user_id}")
-def get_profile(user_id: int, current_user_id: int = Depends(get_current_user_id)):
-    if user_id != current_user_id:
-        result = supabase_client.table("users").select(
-            "first_name, last_name, city, birthday, avatar_url"
-        ).eq("id", user_id).execute().data
-    else:
-        result = supabase_client.table("users").select(
-            "id, email, phone_number, first_name, last_name, city, birthday, tags, avatar_url"
-        ).eq("id", user_id).execute().data
+PROFILE_COUNTERS = ("friends_count", "events_created_count", "events_attending_count", "groups_count")
+PUBLIC_PROFILE_FIELDS = ("first_name", "last_name", "city", "birthday", "avatar_url", "avatar_sizes",
+                         *PROFILE_COUNTERS)
+# Поля profile_view без friendship_status
+PROFILE_COLUMNS = ", ".join(("id", "email", "phone_number", "first_name", "last_name", "city", "birthday", "tags",
+                             "avatar_url", "avatar_sizes", *PROFILE_COUNTERS))
+
+
+async def load_profile(user_id: int, viewer_id: int) -> dict:
+    """Профиль со счётчиками (sql/005_profile_counters.sql) и статусом дружбы со смотрящим"""
+    result = (await supabase_client.rpc("profile_view", {"p_user_id": user_id, "p_viewer_id": viewer_id})
+              .execute()).data
 
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user_info = result[0]
+    return result[0]
 
-    friends_response = supabase_client.table("friends").select("id").or_(
-        f"sender_id.eq.{user_id},recipient_id.eq.{user_id}"
-    ).eq("status", True).execute().data
-    user_info["friends_count"] = len(friends_response)
 
-    if user_id != current_user_id:
-        friendship = supabase_client.table("friends") \
-            .select("recipient_id, sender_id, status").or_(
-            f"and(sender_id.eq.{user_id},recipient_id.eq.{current_user_id}),and(sender_id.eq.{current_user_id},"
-            f"recipient_id.eq.{user_id})"
-        ).execute().data
+async def load_profiles(keys: list[tuple]) -> dict[tuple, dict]:
+    """Пакетный load_profile для EntityCache.get_many: те же поля без статуса дружбы, одним запросом in_"""
+    rows = (await supabase_client.table("users").select(PROFILE_COLUMNS)
+            .in_("id", [user_id for _, user_id in keys]).execute()).data
+    return {("user", row["id"]): row for row in rows}
 
-        if not friendship:
-            user_info["friendship_status"] = "not_in_friends"
-        else:
-            record = friendship[0]
-            if record["status"] is True:
-                user_info["friendship_status"] = "in_friends"
-            elif record["recipient_id"] == current_user_id:
-                user_info["friendship_status"] = "application_received"
-            else:
-                user_info["friendship_status"] = "application_sent"
 
-        return user_info
+async def profile_info(user: dict, user_id: int, viewer_id: int, friendship_status: str | None = None) -> dict:
+    """Тело ответа профиля: чужой — публичные поля и статус дружбы, свой — целиком"""
+    if user_id == viewer_id:
+        return dict(user)
+    user_info = {field: user.get(field) for field in PUBLIC_PROFILE_FIELDS}
+    user_info["friendship_status"] = friendship_status or await friend_graph.status(viewer_id, user_id)
+    return user_info
 
-    user_info.pop("hashed_password", None)
-    user_info.pop("created_at", None)
 
-    return user_info
+@profile_router.get("/batch")
+@query_budget(2)
+async def get_profiles_batch(request: Request, batch: BatchIds = Depends(),
+                             current_user_id: int = Depends(get_current_user_id)):
+    """Несколько профилей в телах GET /user/profile/{user_id}"""
+    found = await entity_cache.get_many([("user", user_id) for user_id in batch.ids], load_profiles)
+    profiles = {user_id: await profile_info(user, user_id, current_user_id) for (_, user_id), user in found.items()}
+    return batch_response(request, batch.ids, profiles, "User not found")
+
+
+@profile_router.get("/{user_id}")
+@query_budget(1)
+async def get_profile(user_id: int, request: Request, current_user_id: int = Depends(get_current_user_id)):
+    friendship_status = None
+
+    async def load() -> dict:
+        # Статус зависит от смотрящего и в общий кэш профиля не кладётся
+        nonlocal friendship_status
+        profile = await load_profile(user_id, current_user_id)
+        friendship_status = profile.pop("friendship_status", None)
+        return profile
 
+    user = await entity_cache.get(("user", user_id), load)
+    user_info = await profile_info(user, user_id, current_user_id, friendship_status)
 
-@profile_router.patch("/avatar")
-async def upload_avatar(user_id: int = Depends(get_current_user_id), file: UploadFile = File(...)):
+    body = serialize(user_info)
+    return cached_response(request, body, make_etag(body))
+
+
+@profile_router.patch("/avatar", dependencies=[Depends(limit_upload_size)], openapi_extra=IMAGE_UPLOAD_BODY)
+async def upload_avatar(request: Request, user_id: int = Depends(get_current_user_id)):
     """
     Эндпоинт для загрузки аватара и сохранения ссылки в БД
 
     Параметры:
     - user_id: ID пользователя, для которого загружается аватар
-    - file: Файл аватара
+    - file: Файл аватара (поле multipart-тела, читается потоком в receive_image)
     """
     try:
-        user_exists = supabase_client.table('users').select("id").eq("id", user_id).execute()
+        user_exists = await supabase_client.table('users').select("id").eq("id", user_id).execute()
         if not user_exists.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        filename = generate_unique_filename(user_id, file.filename)
-
-        contents = await file.read()
-
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only image files are allowed"
-            )
+        image = await receive_image(request)
+        filename = generate_unique_filename(user_id, f"avatar.{image.extension}")
 
-        supabase_client.storage.from_(AVATAR_BUCKET).upload(
-            file=contents,
-            path=filename,
-            file_options={"content-type": file.content_type}
-        )
+        async def save_avatar(url: str):
+            update_response = await supabase_client.table('users').update(
+                {"avatar_url": url, "avatar_sizes": None}
+            ).eq("id", user_id).execute()
 
-        avatar_url = supabase_client.storage.from_(AVATAR_BUCKET).get_public_url(filename)
+            if not update_response.data:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to update user avatar"
+                )
+            entity_cache.invalidate(("user", user_id))
 
-        update_response = supabase_client.table('users').update(
-            {"avatar_url": avatar_url}
-        ).eq("id", user_id).execute()
+        async def save_sizes(urls: dict):
+            await supabase_client.table('users').update({"avatar_sizes": urls}).eq("id", user_id) \
+                .eq("avatar_url", urls["original"]).execute()
+            entity_cache.invalidate(("user", user_id))
 
-        if not update_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update user avatar"
-            )
+        avatar_url = await image_processor.store(image, AVATAR_BUCKET, filename, save_avatar, save_sizes)
 
         return JSONResponse({
             "message": "Avatar uploaded and updated successfully",
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from api.utils.chat_hub import chat_hub
+from api.utils.friend_graph import friend_graph
+from api.utils.functions import get_current_user_id, user_id_from_token
+from api.utils.models import ChatCreateRequest, ChatMessageRequest, ChatSocketAuth, ChatSocketFrame
+from api.utils.pagination import PageParams, keyset, page_of
+from api.utils.supabase_client import supabase_client
+from config import CHAT_AUTH_TIMEOUT_SECONDS
+
+chats_router = APIRouter(
+    prefix="/chats",
+    tags=["chats"]
+)
+
+
+async def check_chat_access(chat_id: int, user_id: int):
+    """404, если чата нет или пользователь в нём не состоит"""
+    if chat_hub.is_member(user_id, chat_id):
+        return
+    rows = (await supabase_client.rpc("user_chats", {"p_user_id": user_id}).eq("id", chat_id)
+            .execute()).data
+    if not rows:
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+
+@chats_router.websocket("/ws")
+async def chat_socket(websocket: WebSocket):
+    """Доставка сообщений всех чатов пользователя.
+
+    Первый кадр — {"type": "auth", "token"}: токен не передаётся в URL, чтобы
+    не попадать в логи прокси; в ответ приходит {"type": "ready"}. Без него за
+    CHAT_AUTH_TIMEOUT_SECONDS соединение закрывается с кодом 1008.
+    Дальше клиент отправляет {"type": "send", "chat_id", "body", "client_id"},
+    сервер присылает {"type": "messages", "chat_id", "messages": [...]} — в том
+    числе собственные сообщения с тем же client_id после сохранения.
+    """
+    await websocket.accept()
+    try:
+        auth = ChatSocketAuth.model_validate_json(
+            await asyncio.wait_for(websocket.receive_text(), CHAT_AUTH_TIMEOUT_SECONDS))
+        user_id = user_id_from_token(auth.token)
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, ValidationError, HTTPException):
+        await websocket.close(code=1008)
+        return
+
+    try:
+        connection = await chat_hub.connect(websocket, user_id)
+    except Exception:
+        # Причина уже в логе фоновой задачи хаба
+        await websocket.close(code=1011)
+        return
+    connection.push(json.dumps({"type": "ready"}))
+
+    def report_failure(client_id):
+        def callback(future):
+            if not future.cancelled() and future.exception() is not None:
+                connection.push(json.dumps({"type": "error", "client_id": client_id,
+                                            "detail": "Failed to send message"}))
+        return callback
+
+    try:
+        while True:
+            try:
+                frame = ChatSocketFrame.model_validate_json(await websocket.receive_text())
+            except ValidationError:
+                connection.push(json.dumps({"type": "error", "detail": "Invalid frame"}))
+                continue
+            if not chat_hub.is_member(user_id, frame.chat_id):
+                connection.push(json.dumps({"type": "error", "client_id": frame.client_id,
+                                            "detail": "Chat not found"}))
+                continue
+            chat_hub.submit(frame.chat_id, user_id, frame.body, frame.client_id).add_done_callback(
+                report_failure(frame.client_id))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        chat_hub.disconnect(connection)
+
+
+@chats_router.get("")
+async def get_chats(page: PageParams = Depends(), user_id: int = Depends(get_current_user_id)):
+    chats = (await keyset(supabase_client.rpc("user_chats", {"p_user_id": user_id}), page).execute()).data
+    chats, next_cursor = page_of(chats, page)
+    return {"chats": chats, "next_cursor": next_cursor}
+
+
+@chats_router.post("")
+async def create_chat(chat: ChatCreateRequest, user_id: int = Depends(get_current_user_id)):
+    """Чат с друзьями; комнаты мероприятий и групп создаются вместе с ними"""
+    member_ids = set(chat.member_ids) - {user_id}
+    if not member_ids <= await friend_graph.friends(user_id):
+        raise HTTPException(status_code=403, detail="You can only add your friends")
+
+    created = (await supabase_client.table("chats").insert({
+        "title": chat.title,
+        "created_by": user_id
+    }).execute()).data
+    if not created:
+        raise HTTPException(status_code=500, detail="Failed to create chat")
+
+    chat_id = created[0]["id"]
+    members = [user_id, *member_ids]
+    await supabase_client.table("chat_members").insert(
+        [{"chat_id": chat_id, "user_id": member_id} for member_id in members]
+    ).execute()
+    chat_hub.add_members(chat_id, members)
+
+    return {"msg": "Chat created successfully", "chat_id": chat_id}
+
+
+@chats_router.delete("/{chat_id}")
+async def delete_chat(chat_id: int, user_id: int = Depends(get_current_user_id)):
+    chat = (await supabase_client.table("chats").select("id, created_by, event_id, group_id")
+            .eq("id", chat_id).execute()).data
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    if chat[0]["created_by"] != user_id:
+        raise HTTPException(status_code=403, detail="Only the creator can delete the chat")
+    if chat[0]["event_id"] is not None or chat[0]["group_id"] is not None:
+        raise HTTPException(status_code=400, detail="Event and group chats are deleted with them")
+
+    await supabase_client.table("chats").delete().eq("id", chat_id).execute()
+    chat_hub.close_room(chat_id)
+
+    return {"msg": "Chat deleted successfully"}
+
+
+@chats_router.get("/{chat_id}/messages")
+async def get_messages(chat_id: int, page: PageParams = Depends(), user_id: int = Depends(get_current_user_id)):
+    """История от новых к старым; next_cursor ведёт к более старым сообщениям"""
+    await check_chat_access(chat_id, user_id)
+
+    messages = (await keyset(supabase_client.table("chat_messages").select("*").eq("chat_id", chat_id),
+                             page, desc=True).execute()).data
+    messages, next_cursor = page_of(messages, page)
+    return {"messages": messages, "next_cursor": next_cursor}
+
+
+@chats_router.post("/{chat_id}/messages")
+async def send_message(chat_id: int, message: ChatMessageRequest, user_id: int = Depends(get_current_user_id)):
+    await check_chat_access(chat_id, user_id)
+
+    try:
+        return await chat_hub.send(chat_id, user_id, message.body)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
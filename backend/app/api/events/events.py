@@ -1,14 +1,29 @@
 from typing import Literal
-import supabase
-
-from api.utils.functions import get_current_user_id
-from api.utils.models import EventCreateRequest
+import asyncio
+
+from api.utils.batch import BatchIds, batch_response
+from api.utils.chat_hub import chat_hub
+from api.utils.event_index import event_index
+from api.utils.friend_graph import friend_graph
+from api.utils.functions import get_current_user_id, to_timestamp
+from api.utils.group_access import GroupAccess, get_group_access, group_access_cache
+from api.utils.group_timeline import group_timeline
+from api.utils.home_feed import describe_sources, home_feed
+from api.utils.http_cache import StaticLookup, cached_response, entity_cache, make_etag, serialize
+from api.utils.loaders import UserCardLoader, get_user_loader
+from api.utils.notifications import notification_broker
+from api.utils.pagination import PageParams, encode_cursor, keyset, page_of
+from api.utils.participation_index import participation_index
+from api.utils.query_trace import query_budget
+from api.utils.recommendations import recommendation_engine
+from api.utils.search_index import search_index
+from api.utils.models import BulkJoinRequest, EventCreateRequest, EventUpdateRequest
 from api.utils.supabase_client import supabase_client
-from fastapi import APIRouter, Query, Form, File, UploadFile, HTTPException, Depends
+from api.utils.uploads import IMAGE_UPLOAD_BODY, image_processor, limit_upload_size, receive_image
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
 from datetime import datetime
-from typing import Optional, List
+from typing import List, Optional
 import uuid
-import json
 
 events_router = APIRouter(
     prefix='/events',
@@ -16,21 +31,30 @@ events_router = APIRouter(
 )
 
 
-@events_router.get('/tags')
-async def get_tags(user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("tags") \
-        .select("tag") \
-        .execute().data
-    tags = [item['tag'] for item in response]
-    return tags
+async def load_tags() -> list[str]:
+    response = (await supabase_client.table("tags")
+                .select("tag")
+                .execute()).data
+    return [item['tag'] for item in response]
+
+
+tag_catalog = StaticLookup(load_tags)
+
+
+@events_router.get('/tags', response_model=list[str])
+async def get_tags(request: Request, user_id: int = Depends(get_current_user_id)):
+    return await tag_catalog.response(request)
 
 
 @events_router.post("")
-def create_event(event: EventCreateRequest, sponsor_id: int = Depends(get_current_user_id)):
+async def create_event(event: EventCreateRequest, sponsor_id: int = Depends(get_current_user_id)):
     if event.start_timestamptz >= event.end_timestamptz:
         raise HTTPException(status_code=400, detail="Start time must be before end time")
+    if event.group_id is not None:
+        (await group_access_cache.get(event.group_id, sponsor_id)).require_admin(
+            "Only group admins can publish events on behalf of the group")
 
-    response = supabase_client.table("events").insert({
+    response = await supabase_client.table("events").insert({
         "title": event.title,
         "description": event.description,
         "location": event.location,
@@ -38,206 +62,410 @@ def create_event(event: EventCreateRequest, sponsor_id: int = Depends(get_curren
         "end_timestamptz": event.end_timestamptz.isoformat(),
         "sponsor_id": sponsor_id,
         "tags": event.tags,
-        "participants": [sponsor_id]
+        "participants": [sponsor_id],
+        "participants_count": 1,
+        "group_id": event.group_id
     }).execute()
 
     if response.data is None:
         raise HTTPException(status_code=500, detail="Failed to create event")
 
+    participation_index.add(sponsor_id, response.data[0]["id"], event.start_timestamptz, event.end_timestamptz)
+    if event.group_id is not None:
+        group_timeline.add(event.group_id, response.data[0]["id"], event.start_timestamptz, event.end_timestamptz)
+    home_feed.event_added(response.data[0]["id"], event.start_timestamptz, event.end_timestamptz, sponsor_id,
+                          event.group_id)
+    recommendation_engine.upsert_event(response.data[0]["id"], event.tags, event.start_timestamptz,
+                                       event.end_timestamptz)
+    search_index.upsert("events", response.data[0])
+    event_index.upsert(response.data[0])
+    entity_cache.invalidate(("user", sponsor_id))
+    await chat_hub.follow("event", response.data[0]["id"], [sponsor_id])
+
     return {"msg": "Event created successfully", "event_id": response.data[0]["id"]}
 
 
-@events_router.post("/{event_id}/upload-image")
-def upload_event_image(event_id: int, file: UploadFile = File(...), sponsor_id: int = Depends(get_current_user_id)):
-    event = supabase_client.table("events").select("sponsor_id").eq("id", event_id).single().execute().data
+@events_router.post("/{event_id}/upload-image", dependencies=[Depends(limit_upload_size)],
+                    openapi_extra=IMAGE_UPLOAD_BODY)
+async def upload_event_image(event_id: int, request: Request, sponsor_id: int = Depends(get_current_user_id)):
+    event = (await supabase_client.table("events").select("sponsor_id").eq("id", event_id).single().execute()).data
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     if event["sponsor_id"] != sponsor_id:
         raise HTTPException(status_code=403, detail="You are not the sponsor of this event")
 
-    from uuid import uuid4
-    file_ext = file.filename.split(".")[-1]
-    file_path = f"events/{uuid4()}.{file_ext}"
+    image = await receive_image(request)
+    file_path = f"events/{uuid.uuid4()}.{image.extension}"
 
-    file_bytes = file.file.read()
-    supabase_client.storage.from_("images").upload(file_path, file_bytes, {"content-type": file.content_type})
+    async def save_image(url: str):
+        await supabase_client.table("events").update({"image": url, "image_sizes": None}).eq("id", event_id) \
+            .execute()
+        entity_cache.invalidate(("event", event_id))
 
-    public_url = supabase_client.storage.from_("images").get_public_url(file_path)
+    async def save_sizes(urls: dict):
+        await supabase_client.table("events").update({"image_sizes": urls}).eq("id", event_id) \
+            .eq("image", urls["original"]).execute()
+        entity_cache.invalidate(("event", event_id))
 
-    supabase_client.table("events").update({"image": public_url}).eq("id", event_id).execute()
+    public_url = await image_processor.store(image, "images", file_path, save_image, save_sizes)
 
     return {"msg": "Image uploaded successfully", "image_url": public_url}
 
 
 @events_router.get("/filter")
-def get_filtered_events(
+async def get_filtered_events(
         filter_type: Literal["recommendations", "friends", "groups"] = Query(...),
-        user_id: int = Depends(get_current_user_id)
+        page: PageParams = Depends(),
+        user_id: int = Depends(get_current_user_id),
+        loader: UserCardLoader = Depends(get_user_loader)
 ):
     if filter_type == "recommendations":
-        user = supabase_client.table("users").select("tags").eq("id", user_id).execute().data
-        user_tags = user[0]["tags"]
-        if not user or not user_tags:
-            return {'error': 'Выберите тэги в профиле', "events": []}
-
-        user_tags = user[0]["tags"]
-        if not isinstance(user_tags, list) or len(user_tags) == 0:
-            return {'error': 'Выберите тэги в профиле', "events": []}
-
-        events = supabase_client.table("events") \
-            .select("id, title, description, location, start_timestamptz, end_timestamptz, tags, image") \
-            .contains("tags", user_tags) \
-            .limit(20) \
-            .execute().data
-
-        return {"events": events}
+        ranked = recommendation_engine.cached(user_id)
+        if ranked is None:
+            user = (await supabase_client.table("users").select("tags").eq("id", user_id).execute()).data
+            user_tags = user[0]["tags"] if user else None
+            if not isinstance(user_tags, list) or len(user_tags) == 0:
+                return {'error': 'Выберите тэги в профиле', "events": []}
+
+            await recommendation_engine.ensure_loaded()
+            ranked = recommendation_engine.recommend(user_id, user_tags)
+
+        after = page.key(int)
+        offset = after[0] if after else 0
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_ids = ranked[offset:offset + page.limit]
+        if not page_ids:
+            return {"events": [], "next_cursor": None}
+
+        rows = (await supabase_client.table("events")
+                .select("id, title, description, location, start_timestamptz, end_timestamptz, tags, image")
+                .in_("id", page_ids)
+                .execute()).data
+        events_by_id = {event["id"]: event for event in rows}
+        events = [events_by_id[event_id] for event_id in page_ids if event_id in events_by_id]
+
+        next_offset = offset + page.limit
+        return {"events": events, "next_cursor": encode_cursor(next_offset) if next_offset < len(ranked) else None}
 
     elif filter_type == "friends":
-        friend_pairs = supabase_client.table("friends").select("sender_id, recipient_id").or_(
-            f"sender_id.eq.{user_id},recipient_id.eq.{user_id}").eq("status", True).execute().data
-
-        friend_ids = set()
-
-        for pair in friend_pairs:
-            if pair["sender_id"] == user_id:
-                friend_ids.add(pair["recipient_id"])
-            else:
-                friend_ids.add(pair["sender_id"])
+        friend_ids = await friend_graph.friends(user_id)
         if not friend_ids:
-            return {"events": []}
+            return {"events": [], "next_cursor": None}
 
-        events = supabase_client.table("events").select(
-            "id, title, description, location, start_timestamptz, end_timestamptz, tags, image, participants, organizer:sponsor_id(id, first_name, last_name, avatar_url)").limit(
-            50).execute().data
+        feed_page, last = await participation_index.feed(friend_ids, page.limit, page.key(float, int))
+        if not feed_page:
+            return {"events": [], "next_cursor": None}
 
-        filtered_events = []
-        for event in events:
-
-            participants = event.get("participants") or []
+        rows, friend_cards = await asyncio.gather(
+            supabase_client.table("events").select(
+                "id, title, description, location, start_timestamptz, end_timestamptz, tags, image, participants, participants_count, organizer:sponsor_id(id, first_name, last_name, avatar_url)"
+            ).in_("id", [event_id for event_id, _ in feed_page]).execute(),
+            loader.load_many({friend for _, friends in feed_page for friend in friends}),
+        )
+        events_by_id = {event["id"]: event for event in rows.data}
+        cards = {card["id"]: card for card in friend_cards}
 
-            participating_friends = list(set(participants) & friend_ids)
-            if participating_friends:
-                friends_info = (supabase_client.table("users").select("id, first_name, last_name, avatar_url")
-                                .in_("id", participating_friends).execute().data)
-                event["friends_participants"] = friends_info
-                filtered_events.append(event)
-        return {"events": filtered_events[:20]}
+        filtered_events = []
+        for event_id, friends in feed_page:
+            event = events_by_id.get(event_id)
+            if event is None:
+                continue
+            event["friends_participants"] = [cards[friend] for friend in friends if friend in cards]
+            filtered_events.append(event)
+        return {"events": filtered_events, "next_cursor": encode_cursor(*last) if last else None}
 
     elif filter_type == "groups":
-        return {"error": "Фильтр по группам ещё не реализован"}
+        memberships = (await supabase_client.table("group_members").select("group_id")
+                       .eq("user_id", user_id).execute()).data
+        if not memberships:
+            return {"events": [], "next_cursor": None}
+
+        feed_page, last = await group_timeline.feed([row["group_id"] for row in memberships], page.limit, page.key(float, int))
+        events = await events_in_order([event_id for event_id, _ in feed_page])
+        return {"events": events, "next_cursor": encode_cursor(*last) if last else None}
 
     else:
         raise HTTPException(status_code=400, detail="Unknown filter type")
 
 
-@events_router.get("/{event_id}")
-def get_event(event_id: int, user_id: int = Depends(get_current_user_id)):
-    try:
-        event = supabase_client.table("events").select("*",
-                                                       "organizer:sponsor_id(id, first_name, last_name, avatar_url)").eq(
-            "id", event_id).execute().data[0]
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
+EVENT_COLUMNS = ("*", "organizer:sponsor_id(id, first_name, last_name, avatar_url)")
+GROUP_FEED_COLUMNS = ("id, title, description, location, start_timestamptz, end_timestamptz, tags, image, "
+                      "participants_count, group_id",
+                      "organizer:sponsor_id(id, first_name, last_name, avatar_url)",
+                      "group:group_id(id, name, avatar_url)")
+
 
-        return {'event': event}
+async def events_in_order(event_ids: list[int]) -> list[dict]:
+    """Мероприятия ленты групп одним запросом в порядке event_ids; удалённые пропускаются"""
+    if not event_ids:
+        return []
+    rows = (await supabase_client.table("events").select(*GROUP_FEED_COLUMNS).in_("id", event_ids).execute()).data
+    events_by_id = {event["id"]: event for event in rows}
+    return [events_by_id[event_id] for event_id in event_ids if event_id in events_by_id]
+
+
+async def load_event(event_id: int) -> dict:
+    try:
+        event = (await supabase_client.table("events").select(*EVENT_COLUMNS).eq("id", event_id).execute()).data
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
 
+    return {'event': event[0]}
 
-@events_router.get('/events/{event_id}/participants')
-def get_event_participants(event_id: int, user_id: int = Depends(get_current_user_id)):
-    try:
-        response = supabase_client.table('events').select('participants').eq('id', event_id).single().execute()
-        event = response.data
 
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
+async def load_events(keys: list[tuple]) -> dict[tuple, dict]:
+    """Пакетный load_event для EntityCache.get_many: одним запросом in_"""
+    rows = (await supabase_client.table("events").select(*EVENT_COLUMNS)
+            .in_("id", [event_id for _, event_id in keys]).execute()).data
+    return {("event", row["id"]): {'event': row} for row in rows}
 
-        return {"participants": event.get("participants", [])}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+@events_router.get("/search")
+async def search_events(
+        city: Optional[str] = Query(None),
+        start_from: Optional[datetime] = Query(None),
+        start_to: Optional[datetime] = Query(None),
+        tags: Optional[List[str]] = Query(None),
+        page: PageParams = Depends(),
+        user_id: int = Depends(get_current_user_id)
+):
+    """Предстоящие мероприятия по городу, интервалу начала и тэгам (любой из), по возрастанию начала"""
+    await event_index.ensure_loaded()
+    event_ids, last = event_index.find(
+        page.limit,
+        city=city,
+        start_from=start_from.timestamp() if start_from else None,
+        start_to=start_to.timestamp() if start_to else None,
+        tags=tags,
+        after=page.key(float, int),
+    )
+    if not event_ids:
+        return {"events": [], "next_cursor": None}
+
+    rows = (await supabase_client.table("events")
+            .select("id, title, description, location, start_timestamptz, end_timestamptz, tags, image, participants_count")
+            .in_("id", event_ids)
+            .execute()).data
+    events_by_id = {event["id"]: event for event in rows}
+    events = [events_by_id[event_id] for event_id in event_ids if event_id in events_by_id]
+    return {"events": events, "next_cursor": encode_cursor(*last) if last else None}
+
+
+@events_router.get("/feed")
+async def get_home_feed(request: Request, page: PageParams = Depends(), user_id: int = Depends(get_current_user_id)):
+    """Домашняя лента: рекомендации, мероприятия друзей и групп по возрастанию начала.
+
+    Страница берётся из материализованной ленты (api/utils/home_feed.py),
+    поэтому тёплое чтение — один запрос строк мероприятий. Тело сериализуется
+    сразу, без jsonable_encoder, и отдаётся с ETag.
+    """
+    feed_page, last = await home_feed.page(user_id, page.limit, page.key(float, int))
+    sources = dict(feed_page)
+    events = await events_in_order(list(sources))
+    for event in events:
+        event["reasons"] = describe_sources(sources[event["id"]])
+    body = serialize({"events": events, "next_cursor": encode_cursor(*last) if last else None})
+    return cached_response(request, body, make_etag(body))
+
+
+@events_router.get("/group/{group_id}")
+@query_budget(3)
+async def get_group_events(group_id: int, page: PageParams = Depends(),
+                           access: GroupAccess = Depends(get_group_access)):
+    """Предстоящие мероприятия группы по возрастанию начала"""
+    feed_page, last = await group_timeline.feed([group_id], page.limit, page.key(float, int))
+    events = await events_in_order([event_id for event_id, _ in feed_page])
+    return {"events": events, "next_cursor": encode_cursor(*last) if last else None}
+
+
+@events_router.get("/batch")
+@query_budget(1)
+async def get_events_batch(request: Request, batch: BatchIds = Depends(), user_id: int = Depends(get_current_user_id)):
+    """Несколько мероприятий в телах GET /events/{event_id}"""
+    found = await entity_cache.get_many([("event", event_id) for event_id in batch.ids], load_events)
+    return batch_response(request, batch.ids, {key[1]: data for key, data in found.items()}, "Event not found")
+
+
+@events_router.get("/{event_id}")
+@query_budget(1)
+async def get_event(event_id: int, request: Request, user_id: int = Depends(get_current_user_id)):
+    return await entity_cache.response(request, ("event", event_id), lambda: load_event(event_id))
+
+
+@events_router.get('/events/{event_id}/participants')
+@query_budget(1)
+async def get_event_participants(
+        event_id: int,
+        page: PageParams = Depends(),
+        user_id: int = Depends(get_current_user_id)
+):
+    participants = (await keyset(supabase_client.rpc("event_participants", {"p_event_id": event_id}), page)
+                    .execute()).data
+    participants, next_cursor = page_of(participants, page)
+    return {"participants": participants, "next_cursor": next_cursor}
 
 
 @events_router.delete('/{event_id}/participants')
-def leave_event_participants(event_id: int, user_id: int = Depends(get_current_user_id)):
+async def leave_event_participants(event_id: int, user_id: int = Depends(get_current_user_id)):
     try:
-        response = supabase_client.table('events').select('participants').eq('id', event_id).single().execute()
-        event = response.data
+        result = (await supabase_client.rpc("leave_event", {"p_event_id": event_id, "p_user_id": user_id})
+                  .execute()).data
 
-        if not event:
+        if not result:
             raise HTTPException(status_code=404, detail="Event not found")
 
-        participants = event.get('participants') or []
-
-        if user_id not in participants:
+        if not result[0]["left_event"]:
             raise HTTPException(status_code=409, detail="You are already left")
 
-        updated_participants = [uid for uid in participants if uid != user_id]
-
-        supabase_client.table('events').update({'participants': updated_participants}).eq('id', event_id).execute()
+        participation_index.remove(user_id, event_id)
+        home_feed.participant_removed(event_id, user_id)
+        entity_cache.invalidate_many([("event", event_id), ("user", user_id)])
+        chat_hub.unfollow("event", event_id, [user_id])
+        notification_broker.publish({result[0]["sponsor_id"]} - {user_id}, "participant_left", {
+            "event_id": event_id, "user_id": user_id, "participants_count": result[0]["participants_count"]})
 
-        return {"message": "success"}
+        return {"message": "success", "participants_count": result[0]["participants_count"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@events_router.post('/{event_id}/participants')
-def join_event_participants(event_id: int, user_id: int = Depends(get_current_user_id)):
-    try:
-        response = supabase_client.table('events').select('participants').eq('id', event_id).single().execute()
-        event = response.data
+async def _join_event(event_id: int, user_ids: list[int], actor_id: int) -> dict:
+    """Атомарное добавление участников, возвращает строку join_event.
 
-        if not event:
-            raise HTTPException(status_code=404, detail="Event not found")
+    Организатор и добавленные другим пользователем получают participant_joined.
+    """
+    result = (await supabase_client.rpc("join_event", {"p_event_id": event_id, "p_user_ids": user_ids})
+              .execute()).data
 
-        participants = event.get('participants') or []
+    if not result:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    event = result[0]
+    entity_cache.invalidate(("event", event_id))
+    entity_cache.invalidate_many(("user", joined_id) for joined_id in event["joined"])
+    for joined_id in event["joined"]:
+        participation_index.add(joined_id, event_id, event['start_timestamptz'], event['end_timestamptz'])
+        home_feed.participant_added(event_id, joined_id, event['start_timestamptz'], event['end_timestamptz'])
+    await chat_hub.follow("event", event_id, event["joined"])
+    if event["joined"]:
+        notification_broker.publish({event["sponsor_id"], *event["joined"]} - {actor_id}, "participant_joined", {
+            "event_id": event_id, "user_ids": event["joined"], "participants_count": event["participants_count"]})
+    return event
+
+
+@events_router.post('/{event_id}/participants')
+async def join_event_participants(event_id: int, user_id: int = Depends(get_current_user_id)):
+    try:
+        event = await _join_event(event_id, [user_id], user_id)
 
-        if user_id in participants:
+        if not event["joined"]:
             raise HTTPException(status_code=409, detail="You are already a participant")
 
-        participants.append(user_id)
+        return {"message": "success", "participants_count": event["participants_count"]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        supabase_client.table('events').update({'participants': participants}).eq('id', event_id).execute()
+@events_router.post('/{event_id}/participants/bulk')
+async def join_event_participants_bulk(
+        event_id: int,
+        request: BulkJoinRequest,
+        user_id: int = Depends(get_current_user_id)
+):
+    """Записывает на мероприятие себя и/или друзей одним запросом (например, поход компанией)"""
+    allowed = await friend_graph.friends(user_id) | {user_id}
+    if not set(request.user_ids) <= allowed:
+        raise HTTPException(status_code=403, detail="You can only add yourself and your friends")
 
-        return {"message": "success"}
+    try:
+        event = await _join_event(event_id, request.user_ids, user_id)
+        return {"joined": event["joined"], "participants_count": event["participants_count"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @events_router.patch("/{event_id}")
-def update_event(event_id: int, updated_data: dict, user_id: int = Depends(get_current_user_id)):
-    event = supabase_client.table("events").select("sponsor_id").eq("id", event_id).single().execute().data
+async def update_event(event_id: int, updated_data: EventUpdateRequest, user_id: int = Depends(get_current_user_id)):
+    event = (await supabase_client.table("events").select(
+        "sponsor_id, participants, tags, start_timestamptz, end_timestamptz, group_id").eq("id", event_id)
+             .single().execute()).data
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     if event["sponsor_id"] != user_id:
         raise HTTPException(status_code=403, detail="You are not the organizer of this event")
-    update_fields = {k: v for k, v in updated_data.items() if v is not None}
-    supabase_client.table("events").update(update_fields).eq("id", event_id).execute()
+    if to_timestamp(updated_data.start_timestamptz or event["start_timestamptz"]) >= \
+            to_timestamp(updated_data.end_timestamptz or event["end_timestamptz"]):
+        raise HTTPException(status_code=400, detail="Start time must be before end time")
+    update_fields = updated_data.model_dump(mode="json", exclude_none=True)
+    updated = (await supabase_client.table("events").update(update_fields).eq("id", event_id).execute()).data
+    entity_cache.invalidate(("event", event_id))
+    notification_broker.publish(set(event["participants"] or ()) - {user_id}, "event_updated",
+                                {"event_id": event_id, "changes": update_fields})
+    event.update(update_fields)
+    if "start_timestamptz" in update_fields or "end_timestamptz" in update_fields:
+        participation_index.reschedule(event_id, event["participants"],
+                                       event["start_timestamptz"], event["end_timestamptz"])
+        if event["group_id"] is not None:
+            group_timeline.add(event["group_id"], event_id, event["start_timestamptz"], event["end_timestamptz"])
+        home_feed.event_rescheduled(event_id, event["start_timestamptz"], event["end_timestamptz"],
+                                    event["participants"], event["group_id"])
+    if update_fields.keys() & {"tags", "start_timestamptz", "end_timestamptz"}:
+        recommendation_engine.upsert_event(event_id, event["tags"], event["start_timestamptz"],
+                                           event["end_timestamptz"])
+    if updated and update_fields.keys() & {"title", "description", "tags"}:
+        search_index.upsert("events", updated[0])
+    if updated and update_fields.keys() & {"location", "tags", "start_timestamptz", "end_timestamptz"}:
+        event_index.upsert(updated[0])
     return {"msg": "Event updated successfully"}
 
 
 @events_router.delete("/{event_id}")
-def delete_event(event_id: int, user_id: int = Depends(get_current_user_id)):
+async def delete_event(event_id: int, user_id: int = Depends(get_current_user_id)):
     try:
-        event = supabase_client.table("events").select("sponsor_id").eq("id", event_id).single().execute().data
+        event = (await supabase_client.table("events").select("sponsor_id, participants, group_id")
+                 .eq("id", event_id).single().execute()).data
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         if event["sponsor_id"] != user_id:
             raise HTTPException(status_code=403, detail="You are not the organizer of this event")
-        supabase_client.table("events").delete().eq("id", event_id).execute()
+        await supabase_client.table("events").delete().eq("id", event_id).execute()
+        entity_cache.invalidate(("event", event_id))
+        entity_cache.invalidate_many(("user", member_id) for member_id in {user_id, *(event["participants"] or ())})
+        participation_index.remove_event(event_id, event["participants"])
+        if event["group_id"] is not None:
+            group_timeline.remove(event["group_id"], event_id)
+        home_feed.event_removed(event_id)
+        recommendation_engine.remove_event(event_id)
+        search_index.remove("events", event_id)
+        event_index.remove(event_id)
+        chat_hub.close_room(kind="event", ref_id=event_id)
         return {"msg": "Event deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @events_router.get("/user/{target_id}/created")
-def get_my_created_events(target_id: int, user_id: int = Depends(get_current_user_id)):
+async def get_my_created_events(
+        target_id: int,
+        page: PageParams = Depends(),
+        user_id: int = Depends(get_current_user_id)
+):
     try:
-        events = (
-            supabase_client.table("events").select("*", "organizer:sponsor_id(id, first_name, last_name, avatar_url)")
-            .eq("sponsor_id", target_id).eq("sponsor_id", target_id).execute().data)
+        events = (await keyset(supabase_client.table("events")
+                               .select("*", "organizer:sponsor_id(id, first_name, last_name, avatar_url)")
+                               .eq("sponsor_id", target_id), page).execute()).data
 
-        return {"events": events}
+        events, next_cursor = page_of(events, page)
+        return {"events": events, "next_cursor": next_cursor}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -245,11 +473,13 @@ def get_my_created_events(target_id: int, user_id: int = Depends(get_current_use
 @events_router.get("/user/{target_id}/participants")
 async def get_participating_events(
         target_id: int,
+        page: PageParams = Depends(),
         user_id: int = Depends(get_current_user_id),
 ):
-    response = supabase_client.table("events") \
-        .select("*", "organizer:sponsor_id(id, first_name, last_name, avatar_url)") \
-        .contains('participants', [str(target_id)]) \
-        .execute().data
+    response = (await keyset(supabase_client.table("events")
+                             .select("*", "organizer:sponsor_id(id, first_name, last_name, avatar_url)")
+                             .contains('participants', [str(target_id)]), page)
+                .execute()).data
 
-    return {"events": response}
+    events, next_cursor = page_of(response, page)
+    return {"events": events, "next_cursor": next_cursor}
@@ -1,4 +1,11 @@
+from api.utils.friend_graph import friend_graph
 from api.utils.functions import get_current_user_id
+from api.utils.home_feed import home_feed
+from api.utils.http_cache import entity_cache
+from api.utils.loaders import UserCardLoader, get_user_loader
+from api.utils.notifications import notification_broker
+from api.utils.pagination import PageParams, page_of_ids
+from api.utils.query_trace import query_budget
 from api.utils.supabase_client import supabase_client
 from fastapi import APIRouter, Depends, HTTPException
 
@@ -9,107 +16,116 @@ friends_router = APIRouter(
 
 
 @friends_router.get("/requests")
-def get_pending_requests(user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("friends").select("*").eq("recipient_id", user_id).eq("status",
-                                                                                           False).execute().data
-
-    pending_info = []
-    for record in response:
-        sender_id = record["sender_id"]
-        user_data = supabase_client.table("users").select("id, first_name, last_name, avatar_url").eq("id",
-                                                                                                  sender_id).execute().data
-        if user_data:
-            pending_info.append(user_data[0])
+@query_budget(2)
+async def get_pending_requests(
+        user_id: int = Depends(get_current_user_id),
+        loader: UserCardLoader = Depends(get_user_loader)
+):
+    response = (await supabase_client.table("friends").select("*").eq("recipient_id", user_id)
+                .eq("status", False).execute()).data
+
+    pending_info = await loader.load_many(record["sender_id"] for record in response)
     return {'requests': pending_info}
 
 
 @friends_router.get("/{target_id}")
-def get_friends(target_id: int, current_user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("friends").select("*").or_(
-        f"sender_id.eq.{target_id},recipient_id.eq.{target_id}"
-    ).eq("status", True).execute().data
-
-    if not response:
-        return {"friends": []}
-
-    friend_ids = []
-    for record in response:
-        if record["sender_id"] == target_id:
-            friend_ids.append(record["recipient_id"])
-        else:
-            friend_ids.append(record["sender_id"])
+async def get_friends(
+        target_id: int,
+        page: PageParams = Depends(),
+        current_user_id: int = Depends(get_current_user_id),
+        loader: UserCardLoader = Depends(get_user_loader)
+):
+    friend_ids, next_cursor = page_of_ids(await friend_graph.friends(target_id), page)
 
     if not friend_ids:
-        return {"friends": []}
+        return {"friends": [], "next_cursor": None}
 
-    users_response = supabase_client.table("users").select(
-        "id, first_name, last_name, avatar_url"
-    ).in_("id", friend_ids).execute().data
+    users_response = await loader.load_many(friend_ids)
 
-    return {"friends": users_response}
+    return {"friends": users_response, "next_cursor": next_cursor}
 
 
 @friends_router.post("/requests/{target_id}")
-def send_friend_request(target_id: int, user_id: int = Depends(get_current_user_id)):
+async def send_friend_request(
+        target_id: int,
+        user_id: int = Depends(get_current_user_id),
+        loader: UserCardLoader = Depends(get_user_loader)
+):
     if user_id == target_id:
         raise HTTPException(status_code=400, detail="Cannot send friend request to yourself")
 
-    existing_request = supabase_client.table("friends").select("*").match({
+    existing_request = (await supabase_client.table("friends").select("*").match({
         "sender_id": user_id,
         "recipient_id": target_id
-    }).execute().data
+    }).execute()).data
 
     if existing_request:
         raise HTTPException(status_code=400, detail="Friend request already sent or user is already a friend")
 
-    supabase_client.table("friends").insert({
+    await supabase_client.table("friends").insert({
         "sender_id": user_id,
         "recipient_id": target_id,
         "status": False
     }).execute()
+    friend_graph.add_request(user_id, target_id)
+    notification_broker.publish([target_id], "friend_request", {"user": await loader.load(user_id)})
 
     return {"status": "successfully"}
 
 
 @friends_router.patch("/requests/{sender_id}")
-def accept_friend_request(sender_id: int, user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("friends").select("*").eq("sender_id", sender_id).eq("recipient_id", user_id).eq(
-        "status", False).execute().data
+async def accept_friend_request(
+        sender_id: int,
+        user_id: int = Depends(get_current_user_id),
+        loader: UserCardLoader = Depends(get_user_loader)
+):
+    response = (await supabase_client.table("friends").select("*").eq("sender_id", sender_id).eq("recipient_id", user_id).eq(
+        "status", False).execute()).data
 
     if not response:
         raise HTTPException(status_code=404, detail="Friend request not found")
 
-    supabase_client.table("friends").update({"status": True}).eq("sender_id", sender_id).eq("recipient_id",
+    await supabase_client.table("friends").update({"status": True}).eq("sender_id", sender_id).eq("recipient_id",
                                                                                             user_id).execute()
+    friend_graph.accept_request(sender_id, user_id)
+    entity_cache.invalidate_many([("user", sender_id), ("user", user_id)])
+    home_feed.invalidate(sender_id)
+    home_feed.invalidate(user_id)
+    notification_broker.publish([sender_id], "friend_accepted", {"user": await loader.load(user_id)})
 
     return {"status": "accepted"}
 
 
 @friends_router.delete("/requests/{sender_id}")
-def reject_friend_request(sender_id: int, user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("friends").select("*").eq("sender_id", sender_id).eq("recipient_id", user_id).eq(
-        "status", False).execute().data
+async def reject_friend_request(sender_id: int, user_id: int = Depends(get_current_user_id)):
+    response = (await supabase_client.table("friends").select("*").eq("sender_id", sender_id).eq("recipient_id", user_id).eq(
+        "status", False).execute()).data
 
     if not response:
         raise HTTPException(status_code=404, detail="Friend request not found")
 
-    supabase_client.table("friends").delete().eq("sender_id", sender_id).eq("recipient_id", user_id).execute()
+    await supabase_client.table("friends").delete().eq("sender_id", sender_id).eq("recipient_id", user_id).execute()
+    friend_graph.remove_request(sender_id, user_id)
 
     return {"msg": "Friend request rejected"}
 
 
 @friends_router.delete("/{friend_id}")
-def remove_friend(friend_id: int, user_id: int = Depends(get_current_user_id)):
-    response = supabase_client.table("friends").select("*").or_(
+async def remove_friend(friend_id: int, user_id: int = Depends(get_current_user_id)):
+    response = (await supabase_client.table("friends").select("*").or_(
         f"and(sender_id.eq.{user_id},recipient_id.eq.{friend_id}),and(sender_id.eq.{friend_id},recipient_id.eq.{user_id})"
-    ).eq("status", True).execute().data
+    ).eq("status", True).execute()).data
 
     if not response:
         raise HTTPException(status_code=404, detail="Friend relationship not found")
 
-    supabase_client.table("friends").delete().or_(
+    await supabase_client.table("friends").delete().or_(
         f"and(sender_id.eq.{user_id},recipient_id.eq.{friend_id}),and(sender_id.eq.{friend_id},recipient_id.eq.{user_id})"
     ).execute()
+    friend_graph.remove_friendship(user_id, friend_id)
+    entity_cache.invalidate_many([("user", user_id), ("user", friend_id)])
+    home_feed.invalidate(user_id)
+    home_feed.invalidate(friend_id)
 
     return {"msg": "Friend removed"}
 
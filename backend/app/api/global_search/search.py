@@ -1,5 +1,11 @@
+import asyncio
+from typing import List, Literal, Optional
+
 from api.utils.functions import get_current_user_id
+from api.utils.pagination import PageParams, keyset, page_of
+from api.utils.search_index import search_index
 from api.utils.supabase_client import supabase_client
+from config import SEARCH_LIMIT_MAX
 from fastapi import APIRouter, Depends, Query
 
 search_router = APIRouter(
@@ -7,15 +13,47 @@ search_router = APIRouter(
     tags=['search']
 )
 
+RESULT_FIELDS = {
+    "users": "id, first_name, last_name, avatar_url",
+    "groups": "id, name, description, avatar_url",
+    "events": "id, title, description, location, start_timestamptz, end_timestamptz, tags, image",
+}
+
+
+@search_router.get("")
+async def search(
+        query: str = Query(..., min_length=1),
+        types: Optional[List[Literal["users", "groups", "events"]]] = Query(None),
+        limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+        _: int = Depends(get_current_user_id)):
+    """Поиск по индексу: результаты по релевантности и число совпадений каждого типа"""
+    await search_index.ensure_loaded()
+    ranked, facets, facets_exact = search_index.search(query, limit, types)
+
+    ids_by_type: dict[str, list[int]] = {}
+    for kind, entity_id, _score in ranked:
+        ids_by_type.setdefault(kind, []).append(entity_id)
+    responses = await asyncio.gather(*(
+        supabase_client.table(kind).select(RESULT_FIELDS[kind]).in_("id", ids).execute()
+        for kind, ids in ids_by_type.items()
+    ))
+    rows = {(kind, row["id"]): row for kind, response in zip(ids_by_type, responses) for row in response.data}
+
+    results = [{"type": kind, "score": score, "item": rows[(kind, entity_id)]}
+               for kind, entity_id, score in ranked if (kind, entity_id) in rows]
+    return {"results": results, "facets": facets, "facets_exact": facets_exact}
+
 
 @search_router.get("/users/")
-def search_users(
+async def search_users(
         query: str = Query(..., min_length=1),
+        page: PageParams = Depends(),
         _: int = Depends(get_current_user_id)):
-    response = supabase_client.table("users").select(
+    response = (await keyset(supabase_client.table("users").select(
         "id, first_name, last_name, avatar_url"
     ).or_(
         f"first_name.ilike.{query}%,last_name.ilike.{query}%"
-    ).execute().data
+    ), page).execute()).data
 
-    return {"results": response}
+    results, next_cursor = page_of(response, page)
+    return {"results": results, "next_cursor": next_cursor}
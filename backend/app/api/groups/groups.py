@@ -1,183 +1,230 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from datetime import datetime
-from typing import List
 from api.utils.supabase_client import supabase_client
+from api.utils.batch import BatchIds, batch_response
+from api.utils.chat_hub import chat_hub
 from api.utils.functions import get_current_user_id, check_user_exists
+from api.utils.group_access import GroupAccess, get_group_access, group_access_cache
+from api.utils.group_timeline import group_timeline
+from api.utils.home_feed import home_feed
+from api.utils.http_cache import entity_cache
 from api.utils.models import GroupCreate, GroupUpdate
+from api.utils.pagination import PageParams, keyset, page_of
+from api.utils.query_trace import query_budget
+from api.utils.search_index import search_index
 
 groups_router = APIRouter(prefix="/groups", tags=["groups"])
 
 
-def check_group_exists(group_id: int):
-    group = supabase_client.table("groups").select("id, creator_id").eq("id", group_id).execute().data
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-    return group[0]
-
+@groups_router.get("/search", response_model=dict)
+async def search_groups(query: str, page: PageParams = Depends(), user_id: int = Depends(get_current_user_id)):
+    await check_user_exists(user_id)
 
-@groups_router.get("/search", response_model=List[dict])
-def search_groups(query: str, user_id: int = Depends(get_current_user_id)):
-    check_user_exists(user_id)
-
-    results = supabase_client.table("groups").select("*") \
-        .ilike("name", f"%{query}%").execute().data
-    return results
+    results = (await keyset(supabase_client.table("groups").select("*")
+                            .ilike("name", f"%{query}%"), page).execute()).data
+    results, next_cursor = page_of(results, page)
+    return {"groups": results, "next_cursor": next_cursor}
 
 
 @groups_router.post("/", response_model=dict)
-def create_group(group: GroupCreate, user_id: int = Depends(get_current_user_id)):
-    check_user_exists(user_id)
+async def create_group(group: GroupCreate, user_id: int = Depends(get_current_user_id)):
+    await check_user_exists(user_id)
 
-    new_group = supabase_client.table("groups").insert({
+    new_group = (await supabase_client.table("groups").insert({
         "name": group.name,
         "description": group.description,
         "tags": group.tags,
         "avatar_url": group.avatar_url,
         "creator_id": user_id,
         "created_at": datetime.utcnow().isoformat()
-    }).execute().data[0]
+    }).execute()).data[0]
+    search_index.upsert("groups", new_group)
 
-    supabase_client.table("group_members").insert({
+    await supabase_client.table("group_members").insert({
         "user_id": user_id,
         "group_id": new_group["id"],
         "is_admin": True
     }).execute()
+    entity_cache.invalidate(("user", user_id))
+    home_feed.invalidate(user_id)
+    await chat_hub.follow("group", new_group["id"], [user_id])
 
     return {"msg": "Group created successfully", "group_id": new_group["id"]}
 
 
-@groups_router.get("/{group_id}", response_model=dict)
-def get_group(group_id: int, user_id: int = Depends(get_current_user_id)):
-    check_user_exists(user_id)
-    check_group_exists(group_id)
+GROUP_COLUMNS = "*, users(id, first_name, last_name, avatar_url)"
+
+
+def group_info(data: dict) -> dict:
+    creator_info = data.pop("users", {})
+    data["creator"] = creator_info
+    return data
+
 
-    response = (supabase_client.table("groups")
-        .select("*, users(id, first_name, last_name, avatar_url)")
+async def load_group(group_id: int) -> dict:
+    response = await (supabase_client.table("groups")
+        .select(GROUP_COLUMNS)
         .eq("id", group_id)
-        .single()
         .execute())
 
     if not response.data:
         raise HTTPException(status_code=404, detail="Group not found")
 
-    data = response.data
-    creator_info = data.pop("users", {})
-    data["creator"] = creator_info
-    return data
+    return group_info(response.data[0])
 
 
-@groups_router.put("/{group_id}", response_model=dict)
-def update_group(group_id: int, group: GroupUpdate, user_id: int = Depends(get_current_user_id)):
-    group_data = check_group_exists(group_id)
+async def load_groups(keys: list[tuple]) -> dict[tuple, dict]:
+    """Пакетный load_group для EntityCache.get_many: одним запросом in_"""
+    rows = (await supabase_client.table("groups").select(GROUP_COLUMNS)
+            .in_("id", [group_id for _, group_id in keys]).execute()).data
+    return {("group", row["id"]): group_info(row) for row in rows}
+
+
+@groups_router.get("/batch", response_model=dict)
+@query_budget(2)
+async def get_groups_batch(request: Request, batch: BatchIds = Depends(), user_id: int = Depends(get_current_user_id)):
+    """Несколько групп в телах GET /groups/{group_id}"""
+    await check_user_exists(user_id)
 
-    member = supabase_client.table("group_members").select("is_admin") \
-        .match({"group_id": group_id, "user_id": user_id}).single().execute().data
-    if not member or not member["is_admin"]:
-        raise HTTPException(status_code=403, detail="Not authorized to edit group")
+    found = await entity_cache.get_many([("group", group_id) for group_id in batch.ids], load_groups)
+    return batch_response(request, batch.ids, {key[1]: data for key, data in found.items()}, "Group not found")
+
+
+@groups_router.get("/{group_id}", response_model=dict)
+@query_budget(2)
+async def get_group(group_id: int, request: Request, user_id: int = Depends(get_current_user_id)):
+    await check_user_exists(user_id)
+
+    return await entity_cache.response(request, ("group", group_id), lambda: load_group(group_id))
+
+
+@groups_router.put("/{group_id}", response_model=dict)
+@query_budget(2)
+async def update_group(group_id: int, group: GroupUpdate, access: GroupAccess = Depends(get_group_access)):
+    access.require_admin("Not authorized to edit group")
 
     update_data = {k: v for k, v in group.dict().items() if v is not None}
-    supabase_client.table("groups").update(update_data).eq("id", group_id).execute()
+    updated = (await supabase_client.table("groups").update(update_data).eq("id", group_id).execute()).data
+    if updated:
+        search_index.upsert("groups", updated[0])
+    entity_cache.invalidate(("group", group_id))
 
     return {"msg": "Group updated successfully"}
 
 
 @groups_router.delete("/{group_id}", response_model=dict)
-def delete_group(group_id: int, user_id: int = Depends(get_current_user_id)):
-    group_data = check_group_exists(group_id)
-
-    member = supabase_client.table("group_members").select("is_admin") \
-        .match({"group_id": group_id, "user_id": user_id}).single().execute().data
-    if not member or not member["is_admin"]:
-        raise HTTPException(status_code=403, detail="Not authorized to delete group")
-
-    supabase_client.table("groups").delete().eq("id", group_id).execute()
-    supabase_client.table("group_members").delete().eq("group_id", group_id).execute()
+@query_budget(3)
+async def delete_group(group_id: int, access: GroupAccess = Depends(get_group_access)):
+    access.require_admin("Not authorized to delete group")
+
+    # Участники удаляются первыми: их id нужны, чтобы сбросить счётчики групп в профилях
+    members = (await supabase_client.table("group_members").delete().eq("group_id", group_id).execute()).data
+    await supabase_client.table("groups").delete().eq("id", group_id).execute()
+    entity_cache.invalidate(("group", group_id))
+    entity_cache.invalidate_many(("user", member["user_id"]) for member in members)
+    group_access_cache.invalidate_group(group_id)
+    group_timeline.invalidate(group_id)
+    home_feed.invalidate_group(group_id)
+    search_index.remove("groups", group_id)
+    chat_hub.close_room(kind="group", ref_id=group_id)
 
     return {"msg": "Group deleted successfully"}
 
 
-@groups_router.get("/", response_model=List[dict])
-def get_all_groups(user_id: int = Depends(get_current_user_id)):
-    check_user_exists(user_id)
-    response = supabase_client.table("groups").select("*").execute().data
-    return response
+@groups_router.get("/", response_model=dict)
+async def get_all_groups(page: PageParams = Depends(), user_id: int = Depends(get_current_user_id)):
+    await check_user_exists(user_id)
+    response = (await keyset(supabase_client.table("groups").select("*"), page).execute()).data
+    groups, next_cursor = page_of(response, page)
+    return {"groups": groups, "next_cursor": next_cursor}
 
 
 @groups_router.post("/{group_id}/join", response_model=dict)
-def join_group(group_id: int, user_id: int = Depends(get_current_user_id)):
-    check_group_exists(group_id)
-    check_user_exists(user_id)
-
-    existing = supabase_client.table("group_members").select("id").match({
-        "group_id": group_id,
-        "user_id": user_id
-    }).execute().data
-    if existing:
+@query_budget(3)
+async def join_group(group_id: int, user_id: int = Depends(get_current_user_id),
+                     access: GroupAccess = Depends(get_group_access)):
+    if access.is_member:
         raise HTTPException(status_code=400, detail="Already a member")
+    await check_user_exists(user_id)
 
-    supabase_client.table("group_members").insert({
+    await supabase_client.table("group_members").insert({
         "group_id": group_id,
         "user_id": user_id,
         "is_admin": False
     }).execute()
+    group_access_cache.invalidate(group_id, user_id)
+    entity_cache.invalidate(("user", user_id))
+    home_feed.invalidate(user_id)
+    await chat_hub.follow("group", group_id, [user_id])
 
     return {"msg": "Successfully joined the group"}
 
 
 @groups_router.delete("/{group_id}/leave", response_model=dict)
-def leave_group(group_id: int, user_id: int = Depends(get_current_user_id)):
-    check_group_exists(group_id)
-
-    deleted = supabase_client.table("group_members").delete().match({
+@query_budget(2)
+async def leave_group(group_id: int, user_id: int = Depends(get_current_user_id),
+                      _: GroupAccess = Depends(get_group_access)):
+    # Членство проверяет само удаление: запись кэша может быть устаревшей
+    deleted = (await supabase_client.table("group_members").delete().match({
         "group_id": group_id,
         "user_id": user_id
-    }).execute().data
+    }).execute()).data
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Not a member of the group")
+    group_access_cache.invalidate(group_id, user_id)
+    entity_cache.invalidate(("user", user_id))
+    home_feed.invalidate(user_id)
+    chat_hub.unfollow("group", group_id, [user_id])
 
     return {"msg": "Left the group successfully"}
 
 
-@groups_router.get("/{group_id}/members", response_model=List[dict])
-def get_group_members(group_id: int, user_id: int = Depends(get_current_user_id)):
-    check_group_exists(group_id)
+@groups_router.get("/{group_id}/members", response_model=dict)
+@query_budget(2)
+async def get_group_members(group_id: int, page: PageParams = Depends(),
+                            _: GroupAccess = Depends(get_group_access)):
 
-    members = (supabase_client.table("group_members")
-               .select("user_id, is_admin, users(id, first_name, last_name, avatar_url)") \
-        .eq("group_id", group_id).execute().data)
-    return members
+    members = (await keyset(supabase_client.table("group_members")
+                            .select("user_id, is_admin, users(id, first_name, last_name, avatar_url)")
+                            .eq("group_id", group_id), page, key="user_id").execute()).data
+    members, next_cursor = page_of(members, page, key="user_id")
+    return {"members": members, "next_cursor": next_cursor}
 
 
 @groups_router.post("/{group_id}/members/{target_user_id}/toggle_admin", response_model=dict)
-def toggle_admin(group_id: int, target_user_id: int, user_id: int = Depends(get_current_user_id)):
-    check_group_exists(group_id)
-    check_user_exists(target_user_id)
-
-    requester = supabase_client.table("group_members").select("is_admin") \
-        .match({"group_id": group_id, "user_id": user_id}).single().execute().data
-    if not requester or not requester["is_admin"]:
-        raise HTTPException(status_code=403, detail="Only admins can manage roles")
-
-    target = supabase_client.table("group_members").select("is_admin") \
-        .match({"group_id": group_id, "user_id": target_user_id}).single().execute().data
-    if not target:
+@query_budget(3)
+async def toggle_admin(group_id: int, target_user_id: int, access: GroupAccess = Depends(get_group_access)):
+    access.require_admin("Only admins can manage roles")
+
+    target = await group_access_cache.get(group_id, target_user_id)
+    if not target.is_member:
         raise HTTPException(status_code=404, detail="Target user is not a member")
 
-    supabase_client.table("group_members").update({
-        "is_admin": not target["is_admin"]
+    # Условие на текущее значение: если флаг успели поменять, обновится 0 строк
+    updated = (await supabase_client.table("group_members").update({
+        "is_admin": not target.is_admin
     }).match({
         "group_id": group_id,
-        "user_id": target_user_id
-    }).execute()
+        "user_id": target_user_id,
+        "is_admin": target.is_admin
+    }).execute()).data
+    group_access_cache.invalidate(group_id, target_user_id)
+    if not updated:
+        raise HTTPException(status_code=409, detail="Admin status was changed concurrently, retry")
 
     return {"msg": "Admin status toggled"}
 
 
-@groups_router.get("/user/{target_user_id}", response_model=List[dict])
-def get_user_groups(target_user_id: int, user_id: int = Depends(get_current_user_id)):
-    check_user_exists(target_user_id)
+@groups_router.get("/user/{target_user_id}", response_model=dict)
+async def get_user_groups(
+        target_user_id: int,
+        page: PageParams = Depends(),
+        user_id: int = Depends(get_current_user_id)
+):
+    await check_user_exists(target_user_id)
 
-    groups = supabase_client.table("group_members").select("group_id, groups(*)") \
-        .eq("user_id", target_user_id).execute().data
-    return [g["groups"] for g in groups if g.get("groups")]
+    groups = (await keyset(supabase_client.table("group_members").select("group_id, groups(*)")
+                           .eq("user_id", target_user_id), page, key="group_id").execute()).data
+    groups, next_cursor = page_of(groups, page, key="group_id")
+    return {"groups": [g["groups"] for g in groups if g.get("groups")], "next_cursor": next_cursor}
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+
+from api.utils.auth_cache import stream_tickets
+from api.utils.functions import get_current_user_id, get_stream_user_id
+from api.utils.notifications import notification_broker
+
+notifications_router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"]
+)
+
+
+@notifications_router.post("/ticket")
+async def create_stream_ticket(user_id: int = Depends(get_current_user_id)):
+    """Одноразовый билет для GET /stream?ticket=; на каждое переподключение нужен новый"""
+    return {"ticket": stream_tickets.issue(user_id), "expires_in": stream_tickets.ttl}
+
+
+@notifications_router.get("/stream")
+async def notification_stream(
+        user_id: int = Depends(get_stream_user_id),
+        last_event_id: str | None = Header(None),
+        last_event_id_query: str | None = Query(None, alias="last_event_id"),
+):
+    """SSE-поток уведомлений: friend_request, friend_accepted, event_updated,
+    participant_joined, participant_left и reset (перечитать данные целиком).
+
+    Билет одноразовый, поэтому после обрыва клиент берёт новый и открывает
+    новый EventSource, передавая номер последнего события в ?last_event_id=
+    (новый EventSource не отправляет заголовок Last-Event-ID)."""
+    return StreamingResponse(
+        notification_broker.stream(user_id, last_event_id or last_event_id_query),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,140 @@
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+
+from config import (STREAM_TICKET_MAX, STREAM_TICKET_TTL_SECONDS, TOKEN_CACHE_SIZE, USER_EXISTS_CACHE_SIZE,
+                    USER_EXISTS_TTL_SECONDS, USER_MISSING_TTL_SECONDS)
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self),
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+
+class TokenCache(_Counters):
+    """LRU проверенных JWT: sha256 токена -> (user_id, exp).
+
+    Запись живёт не дольше срока действия самого токена, поэтому
+    повторный запрос с тем же токеном не требует декодирования и проверки подписи.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        super().__init__()
+        self.max_size = max_size
+        self._tokens: OrderedDict[bytes, tuple[int, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def get(self, token: str) -> int | None:
+        key = self._key(token)
+        entry = self._tokens.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._tokens[key]
+            self.misses += 1
+            return None
+        self._tokens.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, token: str, user_id: int, exp: float):
+        key = self._key(token)
+        self._tokens[key] = (user_id, exp)
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+class UserExistenceCache(_Counters):
+    """LRU результатов проверки существования пользователя.
+
+    Отрицательные ответы хранятся меньше положительных; удаление и
+    регистрация пользователя сбрасывают запись.
+    """
+
+    def __init__(self, max_size: int = USER_EXISTS_CACHE_SIZE, ttl: float = USER_EXISTS_TTL_SECONDS,
+                 missing_ttl: float = USER_MISSING_TTL_SECONDS):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self._users: OrderedDict[int, tuple[bool, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, user_id: int) -> bool | None:
+        entry = self._users.get(user_id)
+        if entry is not None:
+            exists, checked_at = entry
+            if time.monotonic() - checked_at < (self.ttl if exists else self.missing_ttl):
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return exists
+            del self._users[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user_id: int, exists: bool):
+        self._users[user_id] = (exists, time.monotonic())
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
+
+
+class StreamTickets:
+    """Одноразовые короткоживущие билеты для SSE: билет -> (user_id, истекает).
+
+    EventSource не умеет отправлять заголовки, а access-токен в URL оседает в
+    логах. Поэтому клиент получает билет авторизованным POST и открывает
+    поток с ?ticket=; билет годен ttl секунд и гасится при первом же
+    использовании. Билеты живут в памяти процесса, как и сами потоки.
+    """
+
+    def __init__(self, ttl: float = STREAM_TICKET_TTL_SECONDS, max_size: int = STREAM_TICKET_MAX):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._tickets: OrderedDict[bytes, tuple[int, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._tickets)
+
+    def issue(self, user_id: int) -> str:
+        now = time.monotonic()
+        # Срок у всех билетов одинаковый, поэтому истёкшие всегда в начале
+        while self._tickets and (next(iter(self._tickets.values()))[1] <= now
+                                 or len(self._tickets) >= self.max_size):
+            self._tickets.popitem(last=False)
+        ticket = secrets.token_urlsafe(32)
+        self._tickets[self._key(ticket)] = (user_id, now + self.ttl)
+        return ticket
+
+    def redeem(self, ticket: str) -> int | None:
+        entry = self._tickets.pop(self._key(ticket), None)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    @staticmethod
+    def _key(ticket: str) -> bytes:
+        return hashlib.sha256(ticket.encode()).digest()
+
+
+token_cache = TokenCache()
+user_exists_cache = UserExistenceCache()
+stream_tickets = StreamTickets()
@@ -0,0 +1,28 @@
+from fastapi import HTTPException, Query, Request, Response
+
+from api.utils.http_cache import cached_response, make_etag, serialize
+from config import BATCH_MAX_IDS
+
+
+class BatchIds:
+    """Зависимость FastAPI: id пакетного роута (?ids=1&ids=2 или ?ids=1,2) без повторов, в порядке запроса"""
+
+    def __init__(self, ids: list[str] = Query(...)):
+        try:
+            parsed = [int(value) for item in ids for value in item.split(",") if value.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ids")
+        self.ids = list(dict.fromkeys(parsed))
+        if not self.ids:
+            raise HTTPException(status_code=400, detail="No ids provided")
+        if len(self.ids) > BATCH_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"Too many ids, max {BATCH_MAX_IDS}")
+
+
+def batch_response(request: Request, ids: list[int], found: dict, detail: str) -> Response:
+    """Элементы в порядке ids: найденные — с тем же телом, что у одиночного роута, остальные — с 404 и detail"""
+    items = [{"id": item_id, "status": 200, "data": found[item_id]} if item_id in found
+             else {"id": item_id, "status": 404, "detail": detail}
+             for item_id in ids]
+    body = serialize({"items": items})
+    return cached_response(request, body, make_etag(body))
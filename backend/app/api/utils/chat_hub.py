@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+from fastapi import WebSocket
+
+from api.utils.supabase_client import supabase_client
+from config import CHAT_BATCH_MAX, CHAT_BATCH_WINDOW_MS, CHAT_SEND_QUEUE
+
+logger = logging.getLogger(__name__)
+
+ROOM_COLUMNS = {"event": "event_id", "group": "group_id"}
+
+# Цикл событий держит задачи только по слабой ссылке: без этого множества их может собрать GC
+_background: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+
+def _finished(task: asyncio.Task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Chat background task failed", exc_info=task.exception())
+
+
+class _Connection:
+    """Открытый сокет пользователя с очередью исходящих кадров.
+
+    Задача отправки существует только пока очередь не пуста, поэтому
+    простаивающее соединение ничего не стоит, кроме самого сокета.
+    """
+    __slots__ = ("websocket", "user_id", "frames", "max_frames", "closed", "_writer")
+
+    def __init__(self, websocket: WebSocket, user_id: int, max_frames: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.frames: deque[str] = deque()
+        self.max_frames = max_frames
+        self.closed = False
+        self._writer: asyncio.Task | None = None
+
+    def push(self, frame: str):
+        if self.closed:
+            return
+        if len(self.frames) >= self.max_frames:
+            # Клиент не успевает читать: отключаем, история догрузится по курсору
+            self.closed = True
+            self.frames.clear()
+            _spawn(self._close(1013))
+            return
+        self.frames.append(frame)
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write())
+
+    async def _write(self):
+        try:
+            while self.frames:
+                await self.websocket.send_text(self.frames.popleft())
+        except Exception:
+            self.closed = True
+            self.frames.clear()
+        finally:
+            self._writer = None
+
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class ChatHub:
+    """Pub/sub чатов внутри процесса.
+
+    Хаб знает комнаты только подключённых пользователей: при первом
+    подключении они загружаются одним RPC user_chats, дальше поддерживаются
+    роутами (вступление в группу, участие в мероприятии, новые чаты).
+
+    Сообщения копятся batch_window мс и сохраняются одной вставкой; пока
+    вставка идёт, следующие сообщения ждут её и уходят следующей пачкой.
+    После сохранения каждая комната получает один кадр со всеми своими
+    сообщениями пачки, сериализованный один раз на комнату.
+    """
+
+    def __init__(self, batch_window_ms: float = CHAT_BATCH_WINDOW_MS, batch_max: int = CHAT_BATCH_MAX,
+                 send_queue: int = CHAT_SEND_QUEUE):
+        self.batch_window = batch_window_ms / 1000
+        self.batch_max = batch_max
+        self.send_queue = send_queue
+        self.batches = 0
+        self.messages = 0
+        self._rooms: dict[int, set[_Connection]] = {}
+        self._room_keys: dict[int, tuple[str, int]] = {}
+        self._room_ids: dict[tuple[str, int], int] = {}
+        self._users: dict[int, set[_Connection]] = {}
+        self._user_rooms: dict[int, set[int]] = {}
+        self._loading: dict[int, asyncio.Task] = {}
+        self._pending: list[tuple[dict, str | None, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._persisting = False
+
+    async def connect(self, websocket: WebSocket, user_id: int) -> _Connection:
+        """Регистрирует соединение сразу во всех комнатах пользователя.
+
+        Комнаты загружаются до регистрации, одним запросом на пользователя;
+        регистрация и подписка на комнаты идут без await между ними, так что
+        соединение не бывает живым без своих комнат.
+        """
+        while True:
+            loading = self._loading.get(user_id)
+            if loading is None:
+                if user_id in self._user_rooms:
+                    break
+                loading = self._loading[user_id] = _spawn(self._load_rooms(user_id))
+            await asyncio.shield(loading)
+
+        connection = _Connection(websocket, user_id, self.send_queue)
+        self._users.setdefault(user_id, set()).add(connection)
+        for chat_id in self._user_rooms[user_id]:
+            self._rooms.setdefault(chat_id, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: _Connection):
+        connection.closed = True
+        user_id = connection.user_id
+        connections = self._users.get(user_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        for chat_id in self._user_rooms.get(user_id, ()):
+            self._leave_room(chat_id, connection)
+        if not connections:
+            del self._users[user_id]
+            del self._user_rooms[user_id]
+
+    def is_member(self, user_id: int, chat_id: int) -> bool:
+        """Только для подключённых пользователей"""
+        return chat_id in self._user_rooms.get(user_id, ())
+
+    def add_members(self, chat_id: int, user_ids, room: dict | None = None):
+        """Подписывает подключённых user_ids на чат; room — строка chats для комнат мероприятий и групп"""
+        added = False
+        for user_id in user_ids:
+            rooms = self._user_rooms.get(user_id)
+            if rooms is None or chat_id in rooms:
+                continue
+            rooms.add(chat_id)
+            added = True
+            connections = self._users.get(user_id)
+            if connections:
+                self._rooms.setdefault(chat_id, set()).update(connections)
+        if room is not None and (added or chat_id in self._rooms):
+            self._remember(room)
+
+    def remove_members(self, chat_id: int, user_ids):
+        for user_id in user_ids:
+            rooms = self._user_rooms.get(user_id)
+            if rooms is None or chat_id not in rooms:
+                continue
+            rooms.discard(chat_id)
+            for connection in self._users.get(user_id, ()):
+                self._leave_room(chat_id, connection)
+
+    async def follow(self, kind: str, ref_id: int, user_ids):
+        """Подписка на комнату мероприятия или группы; запрос в базу — только если кто-то из user_ids онлайн"""
+        user_ids = [user_id for user_id in user_ids if user_id in self._user_rooms]
+        if not user_ids:
+            return
+        room = await self._find_room(kind, ref_id)
+        if room is not None:
+            self.add_members(room["id"], user_ids, room)
+
+    def unfollow(self, kind: str, ref_id: int, user_ids):
+        chat_id = self._room_ids.get((kind, ref_id))
+        if chat_id is not None:
+            self.remove_members(chat_id, user_ids)
+
+    def close_room(self, chat_id: int | None = None, kind: str | None = None, ref_id: int | None = None):
+        """Забывает удалённый чат (или комнату удалённого мероприятия/группы)"""
+        if chat_id is None:
+            chat_id = self._room_ids.get((kind, ref_id))
+            if chat_id is None:
+                return
+        for connection in self._rooms.pop(chat_id, ()):
+            self._user_rooms.get(connection.user_id, set()).discard(chat_id)
+        key = self._room_keys.pop(chat_id, None)
+        if key is not None:
+            self._room_ids.pop(key, None)
+
+    def submit(self, chat_id: int, sender_id: int, body: str, client_id: str | None = None) -> asyncio.Future:
+        """Ставит сообщение в пачку; future получает сохранённую строку chat_messages"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(({"chat_id": chat_id, "sender_id": sender_id, "body": body}, client_id, future))
+        if len(self._pending) >= self.batch_max:
+            self._dispatch()
+        elif self._timer is None and not self._persisting:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_window, self._dispatch)
+        return future
+
+    async def send(self, chat_id: int, sender_id: int, body: str, client_id: str | None = None) -> dict:
+        return await self.submit(chat_id, sender_id, body, client_id)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._users),
+            "connections": sum(len(connections) for connections in self._users.values()),
+            "rooms": len(self._rooms),
+            "batches": self.batches,
+            "messages": self.messages,
+        }
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._persisting or not self._pending:
+            return
+        batch, self._pending = self._pending[:self.batch_max], self._pending[self.batch_max:]
+        self._persisting = True
+        _spawn(self._persist(batch))
+
+    async def _persist(self, batch):
+        try:
+            try:
+                rows = (await supabase_client.table("chat_messages")
+                        .insert([message for message, _, _ in batch]).execute()).data
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                # Одно сообщение в удалённый чат не должно ронять всю пачку
+                rows = await asyncio.gather(*(self._insert_one(message) for message, _, _ in batch),
+                                            return_exceptions=True)
+            self.batches += 1
+            self._deliver(batch, rows)
+        except Exception as e:
+            logger.exception("Failed to store %d chat messages", len(batch))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._persisting = False
+            if self._pending:
+                self._dispatch()
+
+    def _deliver(self, batch, rows):
+        frames: dict[int, list[dict]] = {}
+        for (_, client_id, future), row in zip(batch, rows):
+            if isinstance(row, BaseException):
+                if not future.done():
+                    future.set_exception(row)
+                continue
+            self.messages += 1
+            message = {**row, "client_id": client_id} if client_id is not None else row
+            frames.setdefault(row["chat_id"], []).append(message)
+            if not future.done():
+                future.set_result(row)
+
+        for chat_id, messages in frames.items():
+            connections = self._rooms.get(chat_id)
+            if not connections:
+                continue
+            frame = json.dumps({"type": "messages", "chat_id": chat_id, "messages": messages},
+                               ensure_ascii=False, default=str)
+            for connection in connections:
+                connection.push(frame)
+
+    @staticmethod
+    async def _insert_one(message: dict) -> dict:
+        return (await supabase_client.table("chat_messages").insert(message).execute()).data[0]
+
+    async def _load_rooms(self, user_id: int):
+        """Комнаты пользователя из базы. Пустой набор заводится до запроса,
+        чтобы вступления и выходы во время него попали в набор, а не потерялись.
+        """
+        self._user_rooms[user_id] = rooms = set()
+        try:
+            rows = (await supabase_client.rpc("user_chats", {"p_user_id": user_id}).execute()).data
+        except BaseException:
+            self._user_rooms.pop(user_id, None)
+            raise
+        finally:
+            self._loading.pop(user_id, None)
+        for row in rows:
+            self._remember(row)
+            rooms.add(row["id"])
+
+    async def _find_room(self, kind: str, ref_id: int) -> dict | None:
+        chat_id = self._room_ids.get((kind, ref_id))
+        if chat_id is not None:
+            return {"id": chat_id, ROOM_COLUMNS[kind]: ref_id}
+        rows = (await supabase_client.table("chats").select("id, event_id, group_id")
+                .eq(ROOM_COLUMNS[kind], ref_id).execute()).data
+        return rows[0] if rows else None
+
+    def _remember(self, room: dict):
+        for kind, column in ROOM_COLUMNS.items():
+            if room.get(column) is not None:
+                self._room_keys[room["id"]] = (kind, room[column])
+                self._room_ids[(kind, room[column])] = room["id"]
+
+    def _leave_room(self, chat_id: int, connection: _Connection):
+        connections = self._rooms.get(chat_id)
+        if connections is None:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self._rooms[chat_id]
+            key = self._room_keys.pop(chat_id, None)
+            if key is not None:
+                self._room_ids.pop(key, None)
+
+
+chat_hub = ChatHub()
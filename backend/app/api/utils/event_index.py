@@ -0,0 +1,180 @@
+import bisect
+import heapq
+import time
+
+from api.utils.functions import now_iso, to_timestamp
+from api.utils.memory_index import ReloadableIndex, fetch_all
+from api.utils.supabase_client import supabase_client
+from config import EVENT_INDEX_PRUNE_SECONDS, EVENT_INDEX_REFRESH_SECONDS
+
+
+def city_key(location) -> str:
+    """Город — первая часть адреса до запятой, без регистра"""
+    if not location:
+        return ""
+    return location.split(",")[0].strip().lower().replace("ё", "е")
+
+
+class _Bucket:
+    """Мероприятия, отсортированные по (start, event_id)"""
+    __slots__ = ("items",)
+
+    def __init__(self):
+        self.items: list[tuple[float, int]] = []
+
+    def add(self, start: float, event_id: int):
+        bisect.insort(self.items, (start, event_id))
+
+    def remove(self, start: float, event_id: int):
+        i = bisect.bisect_left(self.items, (start, event_id))
+        if i < len(self.items) and self.items[i] == (start, event_id):
+            del self.items[i]
+
+    def bounds(self, after: tuple[float, int], until: float) -> tuple[int, int]:
+        return (bisect.bisect_right(self.items, after),
+                bisect.bisect_right(self.items, (until, float("inf"))))
+
+
+class EventDiscoveryIndex(ReloadableIndex):
+    """Индекс предстоящих мероприятий для поиска по времени, городу и тэгам.
+
+    Мероприятия лежат в общем списке по времени начала и в таких же списках
+    по городу и по тэгу. Запрос берёт самый короткий из подходящих диапазонов
+    и проверяет остальные условия только для его элементов, поэтому время
+    ответа пропорционально результату, а не числу мероприятий. Закончившиеся
+    мероприятия удаляются при запросах не реже раза в prune_seconds.
+    """
+
+    def __init__(self, prune_seconds: float = EVENT_INDEX_PRUNE_SECONDS,
+                 refresh_seconds: float = EVENT_INDEX_REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self.prune_seconds = prune_seconds
+        self._events: dict[int, tuple[float, float, str, frozenset]] = {}
+        self._all = _Bucket()
+        self._cities: dict[str, _Bucket] = {}
+        self._tags: dict[str, _Bucket] = {}
+        self._pruned_at = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    def load(self, rows):
+        """Полная замена индекса строками events (id, location, tags, start/end_timestamptz)"""
+        self._events.clear()
+        self._all = _Bucket()
+        self._cities.clear()
+        self._tags.clear()
+        for row in rows:
+            self._add(row)
+        for bucket in (self._all, *self._cities.values(), *self._tags.values()):
+            bucket.items.sort()
+        self._loaded_at = self._pruned_at = time.monotonic()
+
+    def upsert(self, row: dict):
+        self._record(self.upsert, row)
+        self.remove(row["id"], journal=False)
+        if to_timestamp(row["end_timestamptz"]) > time.time():
+            self._add(row, sort=True)
+
+    def remove(self, event_id: int, journal: bool = True):
+        if journal:
+            self._record(self.remove, event_id)
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        start, _, city, tags = event
+        self._all.remove(start, event_id)
+        self._discard(self._cities, city, start, event_id)
+        for tag in tags:
+            self._discard(self._tags, tag, start, event_id)
+
+    def find(self, limit: int, city: str | None = None, start_from: float | None = None,
+             start_to: float | None = None, tags=None, after: tuple[float, int] | None = None):
+        """Id мероприятий по возрастанию начала и курсор (start, id) для продолжения"""
+        now = time.time()
+        if time.monotonic() - self._pruned_at > self.prune_seconds:
+            self.prune(now)
+
+        lower = (start_from if start_from is not None else float("-inf"), float("-inf"))
+        if after is not None and tuple(after) > lower:
+            lower = tuple(after)
+        until = start_to if start_to is not None else float("inf")
+
+        key = city_key(city) if city else None
+        tags = set(tags) if tags else None
+        sources = [[(self._all, *self._all.bounds(lower, until))]]
+        if key is not None:
+            bucket = self._cities.get(key)
+            if bucket is None:
+                return [], None
+            sources.append([(bucket, *bucket.bounds(lower, until))])
+        if tags is not None:
+            buckets = [self._tags[tag] for tag in tags if tag in self._tags]
+            if not buckets:
+                return [], None
+            sources.append([(bucket, *bucket.bounds(lower, until)) for bucket in buckets])
+
+        ranges = min(sources, key=lambda source: sum(stop - start for _, start, stop in source))
+        if len(ranges) == 1:
+            bucket, start, stop = ranges[0]
+            items = (bucket.items[i] for i in range(start, stop))
+        else:
+            items = heapq.merge(*(bucket.items[start:stop] for bucket, start, stop in ranges))
+
+        page = []
+        last = page_last = None
+        for item in items:
+            if item == last:
+                continue
+            last = item
+            _, event_end, event_city, event_tags = self._events[item[1]]
+            if event_end <= now:
+                continue
+            if key is not None and event_city != key:
+                continue
+            if tags is not None and not tags & event_tags:
+                continue
+            if len(page) == limit:
+                return page, page_last
+            page.append(item[1])
+            page_last = item
+        return page, None
+
+    def prune(self, now: float | None = None):
+        """Убирает закончившиеся мероприятия; они все начались раньше now"""
+        now = now or time.time()
+        stop = bisect.bisect_right(self._all.items, (now, float("inf")))
+        for _, event_id in self._all.items[:stop]:
+            if self._events[event_id][1] <= now:
+                self.remove(event_id, journal=False)
+        self._pruned_at = time.monotonic()
+
+    async def _fetch(self) -> list[dict]:
+        """Предстоящие мероприятия (id, location, tags, start/end_timestamptz)"""
+        threshold = now_iso()
+        return await fetch_all(lambda: supabase_client.table("events")
+                               .select("id, location, tags, start_timestamptz, end_timestamptz")
+                               .gt("end_timestamptz", threshold))
+
+    def _add(self, row: dict, sort: bool = False):
+        start, end = to_timestamp(row["start_timestamptz"]), to_timestamp(row["end_timestamptz"])
+        city = city_key(row.get("location"))
+        tags = frozenset(row.get("tags") or ())
+        self._events[row["id"]] = (start, end, city, tags)
+        for bucket in (self._all, self._cities.setdefault(city, _Bucket()),
+                       *(self._tags.setdefault(tag, _Bucket()) for tag in tags)):
+            if sort:
+                bucket.add(start, row["id"])
+            else:
+                bucket.items.append((start, row["id"]))
+
+    @staticmethod
+    def _discard(buckets: dict, key: str, start: float, event_id: int):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.remove(start, event_id)
+            if not bucket.items:
+                del buckets[key]
+
+
+event_index = EventDiscoveryIndex()
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from api.utils.memory_index import fetch_all
+from api.utils.supabase_client import supabase_client
+from config import FRIEND_GRAPH_MAX_USERS, FRIEND_GRAPH_TTL_SECONDS
+
+
+@dataclass
+class _Adjacency:
+    friends: set[int] = field(default_factory=set)
+    incoming: set[int] = field(default_factory=set)
+    outgoing: set[int] = field(default_factory=set)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class FriendGraph:
+    """Кэш графа дружбы: для каждого пользователя хранятся множества друзей,
+    входящих и исходящих заявок.
+
+    Пользователь загружается из таблицы friends одним запросом при первом
+    обращении, дальше ответы идут из памяти за O(1). Роуты друзей обновляют
+    граф инкрементально. Число пользователей в памяти ограничено (LRU), а TTL
+    ограничивает устаревание данных, изменённых другими воркерами.
+    """
+
+    def __init__(self, max_users: int = FRIEND_GRAPH_MAX_USERS, ttl: float = FRIEND_GRAPH_TTL_SECONDS):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: OrderedDict[int, _Adjacency] = OrderedDict()
+        self._loading: dict[int, asyncio.Task] = {}
+        self._stale: set[int] = set()
+        self._journal: list | None = None
+
+    async def friends(self, user_id: int) -> set[int]:
+        return (await self._get(user_id)).friends
+
+    async def friends_count(self, user_id: int) -> int:
+        return len((await self._get(user_id)).friends)
+
+    async def status(self, user_id: int, other_id: int) -> str:
+        """Статус дружбы с точки зрения user_id, в терминах get_profile"""
+        adjacency = await self._get(user_id)
+        if other_id in adjacency.friends:
+            return "in_friends"
+        if other_id in adjacency.incoming:
+            return "application_received"
+        if other_id in adjacency.outgoing:
+            return "application_sent"
+        return "not_in_friends"
+
+    def add_request(self, sender_id: int, recipient_id: int):
+        self._record(self.add_request, sender_id, recipient_id)
+        self._update(sender_id, lambda a: a.outgoing.add(recipient_id))
+        self._update(recipient_id, lambda a: a.incoming.add(sender_id))
+
+    def accept_request(self, sender_id: int, recipient_id: int):
+        self._record(self.accept_request, sender_id, recipient_id)
+        self._update(sender_id, lambda a: (a.outgoing.discard(recipient_id), a.friends.add(recipient_id)))
+        self._update(recipient_id, lambda a: (a.incoming.discard(sender_id), a.friends.add(sender_id)))
+
+    def remove_request(self, sender_id: int, recipient_id: int):
+        self._record(self.remove_request, sender_id, recipient_id)
+        self._update(sender_id, lambda a: a.outgoing.discard(recipient_id))
+        self._update(recipient_id, lambda a: a.incoming.discard(sender_id))
+
+    def remove_friendship(self, user_id: int, friend_id: int):
+        self._record(self.remove_friendship, user_id, friend_id)
+        for first, second in ((user_id, friend_id), (friend_id, user_id)):
+            self._update(first, lambda a, other=second: (a.friends.discard(other),
+                                                         a.incoming.discard(other),
+                                                         a.outgoing.discard(other)))
+
+    def invalidate(self, user_id: int):
+        self._record(self.invalidate, user_id)
+        adjacency = self._users.pop(user_id, None)
+        if adjacency is not None:
+            for other in adjacency.friends | adjacency.incoming | adjacency.outgoing:
+                self._update(other, lambda a: (a.friends.discard(user_id),
+                                               a.incoming.discard(user_id),
+                                               a.outgoing.discard(user_id)))
+        if user_id in self._loading:
+            self._stale.add(user_id)
+
+    async def rebuild(self, page_size: int = 1000):
+        """Полная пересборка графа из таблицы friends постранично.
+
+        Изменения во время загрузки доигрываются после неё, как в
+        ReloadableIndex. Если пользователей больше max_users, остаются
+        недавно использованные, а место сверх них занимают остальные.
+        """
+        self._journal = []
+        try:
+            rows = await fetch_all(lambda: supabase_client.table("friends").select("sender_id, recipient_id, status"),
+                                   page_size)
+        except Exception:
+            self._journal = None
+            raise
+        journal, self._journal = self._journal, None
+
+        users: dict[int, _Adjacency] = {user_id: _Adjacency() for user_id in self._users}
+        for row in rows:
+            self._apply_row(users.setdefault(row["sender_id"], _Adjacency()), row["sender_id"], row)
+            self._apply_row(users.setdefault(row["recipient_id"], _Adjacency()), row["recipient_id"], row)
+
+        # Порядок LRU: сначала не бывшие в памяти, затем бывшие — от давно к недавно использованным
+        ordered = OrderedDict((user_id, adjacency) for user_id, adjacency in users.items()
+                              if user_id not in self._users)
+        for user_id in self._users:
+            ordered[user_id] = users[user_id]
+        while len(ordered) > self.max_users:
+            ordered.popitem(last=False)
+
+        self._users = ordered
+        self._stale.update(self._loading)
+        for operation, args in journal:
+            operation(*args)
+
+    async def _get(self, user_id: int) -> _Adjacency:
+        adjacency = self._users.get(user_id)
+        if adjacency is not None and time.monotonic() - adjacency.loaded_at < self.ttl:
+            self._users.move_to_end(user_id)
+            return adjacency
+
+        task = self._loading.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._load(user_id))
+            self._loading[user_id] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, user_id: int) -> _Adjacency:
+        try:
+            rows = (await supabase_client.table("friends").select("sender_id, recipient_id, status").or_(
+                f"sender_id.eq.{user_id},recipient_id.eq.{user_id}"
+            ).execute()).data
+        except BaseException:
+            self._stale.discard(user_id)
+            raise
+        finally:
+            self._loading.pop(user_id, None)
+
+        adjacency = _Adjacency()
+        for row in rows:
+            self._apply_row(adjacency, user_id, row)
+
+        if user_id in self._stale:
+            self._stale.discard(user_id)
+            return adjacency
+
+        self._users[user_id] = adjacency
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return adjacency
+
+    @staticmethod
+    def _apply_row(adjacency: _Adjacency, user_id: int, row: dict):
+        if row["sender_id"] == user_id:
+            other = row["recipient_id"]
+            (adjacency.friends if row["status"] else adjacency.outgoing).add(other)
+        else:
+            other = row["sender_id"]
+            (adjacency.friends if row["status"] else adjacency.incoming).add(other)
+
+    def _record(self, operation, *args):
+        """Запоминает изменение, если идёт пересборка"""
+        if self._journal is not None:
+            self._journal.append((operation, args))
+
+    def _update(self, user_id: int, change):
+        adjacency = self._users.get(user_id)
+        if adjacency is not None:
+            change(adjacency)
+        if user_id in self._loading:
+            self._stale.add(user_id)
+
+
+friend_graph = FriendGraph()
@@ -1,8 +1,8 @@
-import hashlib
-from datetime import datetime, timedelta
-from fastapi import HTTPException, status, Depends
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
+from api.utils.auth_cache import stream_tickets, token_cache, user_exists_cache
 from api.utils.supabase_client import supabase_client
 import uuid
 
@@ -18,10 +18,6 @@ def normalize_phone_number(phone_number: str) -> str:
     return phone_number
 
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
-
-
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -30,12 +26,37 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user_id(
+async def get_current_user_id(
         credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> int:
-    token = credentials.credentials
+    return user_id_from_token(credentials.credentials)
+
+
+async def get_stream_user_id(
+        credentials: HTTPAuthorizationCredentials | None = Depends(optional_security),
+        ticket: str | None = Query(None),
+) -> int:
+    """Как get_current_user_id, но вместо заголовка можно передать ?ticket= из POST /notifications/ticket —
+    EventSource не отправляет заголовки"""
+    if credentials is not None:
+        return user_id_from_token(credentials.credentials)
+    if ticket:
+        user_id = stream_tickets.redeem(ticket)
+        if user_id is not None:
+            return user_id
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired ticket")
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+
+def user_id_from_token(token: str) -> int:
+    """id пользователя из access-токена; для WebSocket, где нет заголовка Authorization"""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
@@ -44,6 +65,8 @@ def get_current_user_id(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token payload",
             )
+        if "exp" in payload:
+            token_cache.put(token, int(user_id), payload["exp"])
         return int(user_id)
 
     except JWTError as e:
@@ -53,11 +76,28 @@ def get_current_user_id(
         )
 
 
-def check_user_exists(user_id: int):
-    response = supabase_client.table("users").select("id").eq("id", user_id).execute()
-    if not response.data:
+async def check_user_exists(user_id: int):
+    exists = user_exists_cache.get(user_id)
+    if exists is None:
+        response = await supabase_client.table("users").select("id").eq("id", user_id).execute()
+        exists = bool(response.data)
+        user_exists_cache.put(user_id, exists)
+    if not exists:
         raise HTTPException(status_code=404, detail="User not found")
 
+
+def now_iso() -> str:
+    """Текущее время UTC в формате для фильтров по timestamptz"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def to_timestamp(value) -> float:
+    """Перевод timestamptz (строка ISO или datetime) в unix-время"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
 def generate_unique_filename(user_id: str, original_filename: str) -> str:
     """Генерация уникального имени файла"""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -65,9 +105,9 @@ def generate_unique_filename(user_id: str, original_filename: str) -> str:
     file_ext = original_filename.split(".")[-1]
     return f"{user_id}_{timestamp}_{unique_id}.{file_ext}"
 
-def get_avatar(user_id):
+async def get_avatar(user_id):
     """Эндпоинт для получения ссылки на аватар по user_id"""
-    user_data = supabase_client.table('users').select("avatar_url").eq("id", user_id).execute()
+    user_data = await supabase_client.table('users').select("avatar_url").eq("id", user_id).execute()
 
     if not user_data.data or not user_data.data[0].get("avatar_url"):
         return None
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException
+
+from api.utils.functions import get_current_user_id
+from api.utils.supabase_client import supabase_client
+from config import GROUP_ACCESS_CACHE_SIZE, GROUP_ACCESS_TTL_SECONDS
+
+
+@dataclass(frozen=True)
+class GroupAccess:
+    """Группа и членство в ней пользователя запроса"""
+    group_id: int
+    user_id: int
+    creator_id: int
+    is_member: bool
+    is_admin: bool
+
+    def require_admin(self, detail: str):
+        if not self.is_admin:
+            raise HTTPException(status_code=403, detail=detail)
+
+
+class GroupAccessCache:
+    """Короткоживущий LRU (группа, пользователь) -> GroupAccess.
+
+    Группа и членство загружаются одним запросом к groups со встроенной
+    выборкой group_members по пользователю. Вступление, выход и смена
+    админа сбрасывают запись пользователя, удаление группы — все записи
+    группы. Загрузка, начатая до сброса, в кэш не попадает. TTL ограничивает
+    устаревание от изменений в других воркерах.
+    """
+
+    def __init__(self, max_size: int = GROUP_ACCESS_CACHE_SIZE, ttl: float = GROUP_ACCESS_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # (группа, пользователь) -> (доступ, время загрузки, поколение группы)
+        self._entries: OrderedDict[tuple[int, int], tuple[GroupAccess, float, int]] = OrderedDict()
+        self._loading: dict[tuple[int, int], asyncio.Task] = {}
+        self._generations: dict[tuple[int, int], int] = {}
+        self._group_generations: dict[int, int] = {}
+
+    async def get(self, group_id: int, user_id: int) -> GroupAccess:
+        key = (group_id, user_id)
+        entry = self._entries.get(key)
+        if (entry is not None and time.monotonic() - entry[1] < self.ttl
+                and entry[2] == self._group_generations.get(group_id, 0)):
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(group_id, user_id))
+            self._loading[key] = task
+        return await asyncio.shield(task)
+
+    def invalidate(self, group_id: int, user_id: int):
+        key = (group_id, user_id)
+        self._entries.pop(key, None)
+        if key in self._loading:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_group(self, group_id: int):
+        # Записи группы не ищутся перебором: они отбрасываются при чтении по номеру поколения
+        self._group_generations[group_id] = self._group_generations.get(group_id, 0) + 1
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    async def _load(self, group_id: int, user_id: int) -> GroupAccess:
+        key = (group_id, user_id)
+        generation = self._generations.get(key, 0)
+        group_generation = self._group_generations.get(group_id, 0)
+        try:
+            rows = (await supabase_client.table("groups")
+                    .select("id, creator_id, group_members(is_admin)")
+                    .eq("id", group_id).eq("group_members.user_id", user_id)
+                    .execute()).data
+        finally:
+            self._loading.pop(key, None)
+        if not rows:
+            raise HTTPException(status_code=404, detail="Group not found")
+
+        membership = rows[0]["group_members"]
+        access = GroupAccess(group_id, user_id, rows[0]["creator_id"], bool(membership),
+                             bool(membership) and membership[0]["is_admin"])
+        if (self._generations.pop(key, 0) != generation
+                or self._group_generations.get(group_id, 0) != group_generation):
+            return access
+        self._entries[key] = (access, time.monotonic(), group_generation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return access
+
+
+group_access_cache = GroupAccessCache()
+
+
+async def get_group_access(group_id: int, user_id: int = Depends(get_current_user_id)) -> GroupAccess:
+    """Зависимость FastAPI: доступ пользователя запроса к группе из пути; 404, если группы нет"""
+    return await group_access_cache.get(group_id, user_id)
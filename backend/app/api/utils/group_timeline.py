@@ -0,0 +1,34 @@
+from api.utils.functions import now_iso, to_timestamp
+from api.utils.memory_index import fetch_all
+from api.utils.participation_index import ParticipationIndex, _Schedule
+from api.utils.supabase_client import supabase_client
+from config import GROUP_TIMELINE_MAX_GROUPS, GROUP_TIMELINE_TTL_SECONDS
+
+
+class GroupTimelineIndex(ParticipationIndex):
+    """Ленты групп: группа -> её предстоящие мероприятия по времени начала.
+
+    Устроена как ParticipationIndex, только ключ — группа, от имени которой
+    опубликовано мероприятие (events.group_id). Ленты отсутствующих в памяти
+    групп загружаются постранично по индексу (group_id, start), лента
+    групп пользователя — k-путевое слияние лент его групп в feed().
+    """
+
+    def __init__(self, max_groups: int = GROUP_TIMELINE_MAX_GROUPS, ttl: float = GROUP_TIMELINE_TTL_SECONDS):
+        super().__init__(max_groups, ttl)
+
+    async def _fetch(self, group_ids: list[int]) -> dict[int, _Schedule]:
+        threshold = now_iso()
+        rows = await fetch_all(lambda: supabase_client.table("events")
+                               .select("id, group_id, start_timestamptz, end_timestamptz")
+                               .in_("group_id", group_ids)
+                               .gt("end_timestamptz", threshold), self.page_size)
+
+        loaded = {group_id: _Schedule() for group_id in group_ids}
+        for row in rows:
+            loaded[row["group_id"]].items.append(
+                (to_timestamp(row["start_timestamptz"]), row["id"], to_timestamp(row["end_timestamptz"])))
+        return loaded
+
+
+group_timeline = GroupTimelineIndex()
@@ -0,0 +1,324 @@
+import asyncio
+import bisect
+import time
+from collections import OrderedDict
+
+from api.utils.friend_graph import friend_graph
+from api.utils.functions import to_timestamp
+from api.utils.group_timeline import group_timeline
+from api.utils.participation_index import participation_index
+from api.utils.recommendations import recommendation_engine
+from api.utils.supabase_client import supabase_client
+from config import HOME_FEED_FANOUT_LIMIT, HOME_FEED_MAX_USERS, HOME_FEED_SIZE, HOME_FEED_TTL_SECONDS
+
+RECOMMENDED = ("recommended", 0)
+
+
+def describe_sources(sources) -> dict:
+    """Почему мероприятие в ленте: участвующие друзья, группы-публикаторы, рекомендация"""
+    return {"friends": sorted(ref for kind, ref in sources if kind == "friend"),
+            "groups": sorted(ref for kind, ref in sources if kind == "group"),
+            "recommended": RECOMMENDED in sources}
+
+
+class _Feed:
+    """Окно ближайших мероприятий ленты пользователя по (start, event_id)"""
+    __slots__ = ("items", "events", "friends", "groups", "horizon", "built_at")
+
+    def __init__(self, friends: set[int], groups: set[int]):
+        self.items: list[tuple[float, int]] = []
+        # event_id -> [start, end, источники: ("friend", id), ("group", id), RECOMMENDED]
+        self.events: dict[int, list] = {}
+        self.friends = friends
+        self.groups = groups
+        # Последний элемент обрезанного окна: дальше него лента в памяти неполна
+        self.horizon: tuple[float, int] | None = None
+        self.built_at = time.monotonic()
+
+
+class HomeFeed:
+    """Материализованная домашняя лента: рекомендации, мероприятия друзей и групп.
+
+    Лента собирается при первом чтении из индексов в памяти (participation_index,
+    group_timeline, recommendation_engine) и хранится как окно из size
+    ближайших мероприятий по времени начала. Дальше она поддерживается fan-out
+    при записи: создание, перенос и удаление мероприятия, запись и выход
+    участника правят ленты в памяти, которые следят за источником — другом
+    или группой. Если таких лент больше fanout_limit, источник становится
+    популярным: его новые мероприятия не раскладываются по лентам, а
+    подмешиваются при чтении из его ленты в индексе. Когда лент остаётся не
+    больше fanout_limit // 2, флаг снимается, а оставшиеся ленты
+    пересобираются: в них нет пропущенных мероприятий. Страницы за окном тоже
+    собираются при чтении. Рекомендации обновляются при пересборке (TTL).
+    """
+
+    def __init__(self, size: int = HOME_FEED_SIZE, max_users: int = HOME_FEED_MAX_USERS,
+                 ttl: float = HOME_FEED_TTL_SECONDS, fanout_limit: int = HOME_FEED_FANOUT_LIMIT):
+        self.size = size
+        self.max_users = max_users
+        self.ttl = ttl
+        self.fanout_limit = fanout_limit
+        self.deliveries = 0
+        self.skipped = 0
+        self._feeds: OrderedDict[int, _Feed] = OrderedDict()
+        # Источник -> пользователи, чьи ленты в памяти за ним следят
+        self._followers: dict[tuple[str, int], set[int]] = {}
+        # Мероприятие -> пользователи, в чьих окнах оно есть
+        self._holders: dict[int, set[int]] = {}
+        self._hot_users: set[int] = set()
+        self._hot_groups: set[int] = set()
+        self._building: dict[int, asyncio.Task] = {}
+        self._generations: dict[int, int] = {}
+
+    async def page(self, user_id: int, limit: int, cursor: tuple[float, int] | None = None):
+        """Страница [(event_id, источники)] по времени начала и курсор (start, event_id) продолжения"""
+        feed = await self._get(user_id)
+        after = tuple(cursor) if cursor is not None else None
+        now = time.time()
+
+        items = None
+        if feed.horizon is None or after is None or after < feed.horizon:
+            items = self._window(user_id, feed, after, limit + 1, now)
+            hot_friends, hot_groups = feed.friends & self._hot_users, feed.groups & self._hot_groups
+            if hot_friends or hot_groups:
+                extra, _ = await self._collect(hot_friends, hot_groups, (), limit + 1, after)
+                items = self._merge(items, extra, feed.horizon)
+        if not items:
+            # За окном (или окно исчерпано): страница собирается при чтении и не сохраняется
+            if feed.horizon is None:
+                return [], None
+            ranked = recommendation_engine.cached(user_id) or ()
+            items, horizon = await self._collect(feed.friends, feed.groups, ranked, limit + 1, after)
+        else:
+            horizon = feed.horizon
+
+        page = items[:limit]
+        if len(items) > limit or (horizon is not None and page):
+            return [(event_id, sources) for _, event_id, _, sources in page], page[-1][:2]
+        return [(event_id, sources) for _, event_id, _, sources in page], None
+
+    def event_added(self, event_id: int, start, end, sponsor_id: int, group_id: int | None = None):
+        """Новое мероприятие: в ленты друзей организатора (он участник) и участников группы"""
+        start, end = to_timestamp(start), to_timestamp(end)
+        self._fan_out(("friend", sponsor_id), event_id, start, end)
+        if group_id is not None:
+            self._fan_out(("group", group_id), event_id, start, end)
+
+    def participant_added(self, event_id: int, user_id: int, start, end):
+        self._fan_out(("friend", user_id), event_id, to_timestamp(start), to_timestamp(end))
+
+    def participant_removed(self, event_id: int, user_id: int):
+        for holder in list(self._holders.get(event_id, ())):
+            feed = self._feeds[holder]
+            sources = feed.events[event_id][2]
+            sources.discard(("friend", user_id))
+            if not sources:
+                self._drop(holder, feed, event_id)
+
+    def event_rescheduled(self, event_id: int, start, end, participants, group_id: int | None = None):
+        start, end = to_timestamp(start), to_timestamp(end)
+        for holder in list(self._holders.get(event_id, ())):
+            feed = self._feeds[holder]
+            sources = feed.events[event_id][2]
+            self._drop(holder, feed, event_id)
+            for source in sources:
+                self._insert(holder, feed, event_id, start, end, source)
+        # Перенос внутрь окна тех, у кого мероприятия ещё не было
+        for participant in participants or ():
+            self._fan_out(("friend", participant), event_id, start, end)
+        if group_id is not None:
+            self._fan_out(("group", group_id), event_id, start, end)
+
+    def event_removed(self, event_id: int):
+        for holder in list(self._holders.get(event_id, ())):
+            self._drop(holder, self._feeds[holder], event_id)
+
+    def invalidate(self, user_id: int):
+        """Сменились друзья, группы или тэги пользователя: лента пересоберётся при чтении"""
+        feed = self._feeds.pop(user_id, None)
+        if feed is not None:
+            self._forget(user_id, feed)
+        if user_id in self._building:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def invalidate_group(self, group_id: int):
+        for user_id in list(self._followers.get(("group", group_id), ())):
+            self.invalidate(user_id)
+
+    def stats(self) -> dict:
+        return {"feeds": len(self._feeds), "deliveries": self.deliveries, "skipped": self.skipped,
+                "hot_users": len(self._hot_users), "hot_groups": len(self._hot_groups)}
+
+    async def _get(self, user_id: int) -> _Feed:
+        feed = self._feeds.get(user_id)
+        if feed is not None and time.monotonic() - feed.built_at < self.ttl:
+            self._feeds.move_to_end(user_id)
+            return feed
+
+        task = self._building.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._build(user_id))
+            self._building[user_id] = task
+        return await asyncio.shield(task)
+
+    async def _build(self, user_id: int) -> _Feed:
+        generation = self._generations.get(user_id, 0)
+        try:
+            friends = set(await friend_graph.friends(user_id))
+            rows = (await supabase_client.table("users").select("tags, group_members(group_id)")
+                    .eq("id", user_id).execute()).data
+            groups = {membership["group_id"] for membership in rows[0]["group_members"]} if rows else set()
+            tags = (rows[0]["tags"] if rows else None) or []
+            if tags:
+                await recommendation_engine.ensure_loaded()
+            # Все загрузки — до снимка: дальше индексы читаются без await, и fan-out не может вклиниться
+            await participation_index.timeline(friends, 0)
+            await group_timeline.timeline(groups, 0)
+            ranked = (recommendation_engine.cached(user_id) or recommendation_engine.recommend(user_id, tags)
+                      if tags else ())
+            items, horizon = await self._collect(friends, groups, ranked, self.size, None)
+        finally:
+            self._building.pop(user_id, None)
+
+        feed = _Feed(friends, groups)
+        feed.horizon = horizon
+        for start, event_id, end, sources in items:
+            feed.items.append((start, event_id))
+            feed.events[event_id] = [start, end, sources]
+        if self._generations.pop(user_id, 0) != generation:
+            return feed
+
+        old = self._feeds.pop(user_id, None)
+        if old is not None:
+            self._forget(user_id, old)
+        self._feeds[user_id] = feed
+        for event_id in feed.events:
+            self._holders.setdefault(event_id, set()).add(user_id)
+        for source in (*(("friend", friend) for friend in friends), *(("group", group) for group in groups)):
+            self._followers.setdefault(source, set()).add(user_id)
+        while len(self._feeds) > self.max_users:
+            evicted, evicted_feed = self._feeds.popitem(last=False)
+            self._forget(evicted, evicted_feed)
+        return feed
+
+    @staticmethod
+    async def _collect(friends, groups, ranked, limit: int, after: tuple[float, int] | None):
+        """Слияние источников после курсора: ([(start, event_id, end, источники)], horizon).
+
+        horizon — ключ, до которого результат полон, если какой-то источник обрезан по limit.
+        """
+        friend_page, friend_more = await participation_index.timeline(friends, limit, after)
+        group_page, group_more = await group_timeline.timeline(groups, limit, after)
+        now = time.time()
+
+        merged: dict[int, tuple[float, int, float, set]] = {}
+        for start, event_id, end, ids in friend_page:
+            merged[event_id] = (start, event_id, end, {("friend", friend) for friend in ids})
+        for start, event_id, end, ids in group_page:
+            merged.setdefault(event_id, (start, event_id, end, set()))[3].update(("group", group) for group in ids)
+        for start, event_id, end in recommendation_engine.schedule(ranked):
+            if end > now and (after is None or (start, event_id) > after):
+                merged.setdefault(event_id, (start, event_id, end, set()))[3].add(RECOMMENDED)
+
+        items = sorted(merged.values(), key=lambda item: item[:2])
+        bounds = [tuple(more) for more in (friend_more, group_more) if more is not None]
+        if len(items) > limit:
+            bounds.append(items[limit - 1][:2])
+        if not bounds:
+            return items, None
+        horizon = min(bounds)
+        return [item for item in items if item[:2] <= horizon], horizon
+
+    def _window(self, user_id: int, feed: _Feed, after: tuple[float, int] | None, limit: int, now: float) -> list:
+        """До limit элементов окна после курсора; закончившиеся мероприятия по пути удаляются"""
+        start = bisect.bisect_right(feed.items, after) if after is not None else 0
+        items, expired = [], []
+        for i in range(start, len(feed.items)):
+            event_id = feed.items[i][1]
+            event_start, end, sources = feed.events[event_id]
+            if end <= now:
+                expired.append(event_id)
+                continue
+            items.append((event_start, event_id, end, sources))
+            if len(items) == limit:
+                break
+        for event_id in expired:
+            self._drop(user_id, feed, event_id)
+        return items
+
+    @staticmethod
+    def _merge(items: list, extra: list, horizon: tuple[float, int] | None) -> list:
+        merged = {item[1]: item for item in items}
+        for start, event_id, end, sources in extra:
+            if horizon is not None and (start, event_id) > horizon:
+                continue
+            if event_id in merged:
+                merged[event_id] = (start, event_id, end, merged[event_id][3] | sources)
+            else:
+                merged[event_id] = (start, event_id, end, sources)
+        return sorted(merged.values(), key=lambda item: item[:2])
+
+    def _fan_out(self, source: tuple[str, int], event_id: int, start: float, end: float):
+        followers = self._followers.get(source)
+        if not followers:
+            return
+        if len(followers) > self.fanout_limit:
+            # Популярный источник: читатели подмешивают его ленту из индекса сами
+            (self._hot_users if source[0] == "friend" else self._hot_groups).add(source[1])
+            self.skipped += 1
+            return
+        for user_id in followers:
+            self._insert(user_id, self._feeds[user_id], event_id, start, end, source)
+        self.deliveries += len(followers)
+
+    def _insert(self, user_id: int, feed: _Feed, event_id: int, start: float, end: float, source: tuple[str, int]):
+        entry = feed.events.get(event_id)
+        if entry is not None:
+            entry[2].add(source)
+            return
+        key = (start, event_id)
+        if feed.horizon is not None and key > feed.horizon:
+            return
+        bisect.insort(feed.items, key)
+        feed.events[event_id] = [start, end, {source}]
+        self._holders.setdefault(event_id, set()).add(user_id)
+        if len(feed.items) > self.size:
+            self._drop(user_id, feed, feed.items[-1][1])
+            feed.horizon = feed.items[-1]
+
+    def _drop(self, user_id: int, feed: _Feed, event_id: int):
+        start = feed.events.pop(event_id)[0]
+        i = bisect.bisect_left(feed.items, (start, event_id))
+        del feed.items[i]
+        holders = self._holders.get(event_id)
+        if holders is not None:
+            holders.discard(user_id)
+            if not holders:
+                del self._holders[event_id]
+
+    def _forget(self, user_id: int, feed: _Feed):
+        for event_id in feed.events:
+            holders = self._holders.get(event_id)
+            if holders is not None:
+                holders.discard(user_id)
+                if not holders:
+                    del self._holders[event_id]
+        cooled = []
+        for source in (*(("friend", friend) for friend in feed.friends), *(("group", group) for group in feed.groups)):
+            followers = self._followers.get(source)
+            if followers is not None:
+                followers.discard(user_id)
+                if not followers:
+                    del self._followers[source]
+            hot = self._hot_users if source[0] == "friend" else self._hot_groups
+            # Гистерезис: источник на границе лимита не переключается туда-обратно
+            if source[1] in hot and len(followers or ()) <= self.fanout_limit // 2:
+                hot.discard(source[1])
+                cooled.append(followers or ())
+        # Пока источник был популярным, его мероприятия в эти ленты не раскладывались
+        for followers in cooled:
+            for follower in list(followers):
+                self.invalidate(follower)
+
+
+home_feed = HomeFeed()
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, Response
+
+from config import LOOKUP_CACHE_TTL_SECONDS, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_SECONDS
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def serialize(data) -> bytes:
+    """JSON так же, как его отдаёт JSONResponse"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag по содержимому ответа"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (value.strip().removeprefix("W/") for value in header.split(","))
+
+
+def cached_response(request: Request, body: bytes, etag: str) -> Response:
+    """200 с готовым телом или 304, если у клиента та же версия"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class StaticLookup:
+    """Почти неизменяемый справочник (тэги и т.п.) в памяти процесса.
+
+    loader загружает данные; они один раз сериализуются в тело ответа с ETag
+    и отдаются без обращения к Supabase, пока не истечёт TTL или не будет
+    вызван invalidate(). Одновременные промахи дожидаются одной загрузки.
+    """
+
+    def __init__(self, loader, ttl: float = LOOKUP_CACHE_TTL_SECONDS):
+        self.loader = loader
+        self.ttl = ttl
+        self.data = None
+        self.body: bytes | None = None
+        self.etag: str | None = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        await self._ensure_loaded()
+        return self.data
+
+    async def response(self, request: Request) -> Response:
+        await self._ensure_loaded()
+        return cached_response(request, self.body, self.etag)
+
+    def invalidate(self):
+        self._version += 1
+        self.body = None
+
+    async def _ensure_loaded(self):
+        if self._fresh():
+            return
+        async with self._lock:
+            if self._fresh():
+                return
+            version = self._version
+            data = await self.loader()
+            body = serialize(data)
+            self.data, self.body, self.etag = data, body, make_etag(body)
+            self._loaded_at = time.monotonic()
+            if version != self._version:
+                # Инвалидация во время загрузки: отдаём результат, но при следующем запросе перечитываем
+                self._loaded_at = 0.0
+
+    def _fresh(self) -> bool:
+        return self.body is not None and time.monotonic() - self._loaded_at < self.ttl
+
+
+@dataclass
+class _Entity:
+    data: object
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+class EntityCache:
+    """Read-through LRU для чтения отдельных сущностей (мероприятие, группа, профиль).
+
+    Ключ — кортеж вида ("event", id). Мутации сбрасывают запись через
+    invalidate(); загрузка, начатая до сброса, в кэш уже не попадает.
+    TTL ограничивает устаревание от изменений в других воркерах.
+    """
+
+    def __init__(self, max_size: int = ENTITY_CACHE_SIZE, ttl: float = ENTITY_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, _Entity] = OrderedDict()
+        self._loading: dict[tuple, asyncio.Task] = {}
+        self._generations: dict[tuple, int] = {}
+
+    async def get(self, key: tuple, loader):
+        return (await self._get(key, loader)).data
+
+    async def response(self, request: Request, key: tuple, loader) -> Response:
+        """Готовый ответ из кэша; loader вызывается только при промахе"""
+        entity = await self._get(key, loader)
+        return cached_response(request, entity.body, entity.etag)
+
+    async def get_many(self, keys, loader) -> dict[tuple, object]:
+        """Данные по нескольким ключам; все промахи загружаются одним вызовом loader(ключи) -> {ключ: данные}.
+
+        Ключей, которых нет ни в кэше, ни в результате loader, в ответе нет.
+        Ключи, уже загружаемые по одному, дожидаются этих загрузок.
+        """
+        found, waiting, missing = {}, {}, []
+        now = time.monotonic()
+        for key in dict.fromkeys(keys):
+            entity = self._entries.get(key)
+            if entity is not None and now - entity.loaded_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = entity.data
+                continue
+            self.misses += 1
+            if key in self._loading:
+                waiting[key] = self._loading[key]
+            else:
+                missing.append(key)
+
+        if missing:
+            batch = asyncio.create_task(self._load_many(missing, loader))
+            for key in missing:
+                self._loading[key] = waiting[key] = asyncio.create_task(self._pick(batch, key))
+
+        for key, task in waiting.items():
+            try:
+                entity = await asyncio.shield(task)
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+                entity = None
+            if entity is not None:
+                found[key] = entity.data
+        return found
+
+    def invalidate(self, key: tuple):
+        self._entries.pop(key, None)
+        if key in self._loading:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_many(self, keys):
+        for key in keys:
+            self.invalidate(key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    async def _get(self, key: tuple, loader) -> _Entity:
+        entity = self._entries.get(key)
+        if entity is not None and time.monotonic() - entity.loaded_at < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entity
+
+        self.misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._loading[key] = task
+        entity = await asyncio.shield(task)
+        if entity is None:
+            # Пакетная загрузка ключ не нашла: свой loader ответит как одиночный роут (обычно 404)
+            entity = self._entity(await loader())
+        return entity
+
+    async def _load(self, key: tuple, loader) -> _Entity:
+        generation = self._generations.get(key, 0)
+        try:
+            data = await loader()
+        finally:
+            self._loading.pop(key, None)
+        entity = self._entity(data)
+
+        if self._generations.pop(key, 0) == generation:
+            self._store(key, entity)
+        return entity
+
+    async def _load_many(self, keys: list[tuple], loader) -> dict[tuple, _Entity]:
+        generations = {key: self._generations.get(key, 0) for key in keys}
+        try:
+            loaded = await loader(keys)
+        finally:
+            for key in keys:
+                self._loading.pop(key, None)
+
+        entities = {}
+        for key in keys:
+            current = self._generations.pop(key, 0)
+            if key not in loaded:
+                continue
+            entities[key] = entity = self._entity(loaded[key])
+            if current == generations[key]:
+                self._store(key, entity)
+        return entities
+
+    @staticmethod
+    async def _pick(batch: asyncio.Task, key: tuple) -> _Entity | None:
+        return (await asyncio.shield(batch)).get(key)
+
+    @staticmethod
+    def _entity(data) -> _Entity:
+        body = serialize(data)
+        return _Entity(data, body, make_etag(body), time.monotonic())
+
+    def _store(self, key: tuple, entity: _Entity):
+        self._entries[key] = entity
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+entity_cache = EntityCache()
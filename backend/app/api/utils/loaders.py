@@ -0,0 +1,55 @@
+import asyncio
+
+from api.utils.supabase_client import supabase_client
+
+USER_CARD_FIELDS = "id, first_name, last_name, avatar_url"
+
+
+class UserCardLoader:
+    """Загрузчик карточек пользователей в стиле DataLoader.
+
+    Все id, запрошенные через load() в пределах одного шага event loop,
+    собираются в пачку и загружаются одним запросом in_("id", ...).
+    Результаты кэшируются до конца запроса.
+    """
+
+    def __init__(self):
+        self._cache: dict[int, asyncio.Future] = {}
+        self._batch: list[int] = []
+        self._dispatch_task: asyncio.Task | None = None
+
+    def load(self, user_id: int) -> asyncio.Future:
+        if user_id in self._cache:
+            return self._cache[user_id]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[user_id] = future
+        self._batch.append(user_id)
+        if len(self._batch) == 1:
+            self._dispatch_task = loop.create_task(self._dispatch())
+        return future
+
+    async def load_many(self, user_ids) -> list[dict]:
+        """Карточки в порядке user_ids, несуществующие пользователи пропускаются"""
+        cards = await asyncio.gather(*(self.load(user_id) for user_id in user_ids))
+        return [card for card in cards if card]
+
+    async def _dispatch(self):
+        batch, self._batch = self._batch, []
+        try:
+            rows = (await supabase_client.table("users").select(USER_CARD_FIELDS)
+                    .in_("id", batch).execute()).data
+        except Exception as e:
+            for user_id in batch:
+                self._cache.pop(user_id).set_exception(e)
+            return
+
+        cards = {row["id"]: row for row in rows}
+        for user_id in batch:
+            self._cache[user_id].set_result(cards.get(user_id))
+
+
+def get_user_loader() -> UserCardLoader:
+    """Зависимость FastAPI: новый загрузчик на каждый запрос"""
+    return UserCardLoader()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+
+async def fetch_all(query, page_size: int = 1000) -> list[dict]:
+    """Все строки запроса query() страницами по page_size в порядке id"""
+    rows = []
+    offset = 0
+    while True:
+        page = (await query().order("id").range(offset, offset + page_size - 1).execute()).data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        offset += page_size
+
+
+class ReloadableIndex(ABC):
+    """Основа индексов в памяти, которые целиком перечитываются из базы.
+
+    Индекс загружается при первом ensure_loaded() и раз в refresh_seconds
+    перестраивается в фоне. Наследник задаёт _fetch() — все строки — и
+    load(rows) — полную замену содержимого с записью _loaded_at. Изменения,
+    пришедшие во время загрузки, наследник отмечает через _record() и они
+    доигрываются поверх загруженного.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._journal: list | None = None
+
+    @abstractmethod
+    def load(self, rows):
+        """Заменяет содержимое индекса строками rows"""
+
+    async def ensure_loaded(self):
+        if self._loaded_at is None:
+            async with self._lock:
+                if self._loaded_at is None:
+                    await self.rebuild()
+        elif time.monotonic() - self._loaded_at > self.refresh_seconds and (
+                self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self.rebuild())
+            self._refresh_task.add_done_callback(self._refreshed)
+
+    async def rebuild(self):
+        """Перечитывает данные; изменения во время загрузки доигрываются после неё"""
+        self._journal = []
+        try:
+            rows = await self._fetch()
+        except Exception:
+            self._journal = None
+            raise
+
+        journal, self._journal = self._journal, None
+        self.load(rows)
+        for operation, args in journal:
+            operation(*args)
+
+    @abstractmethod
+    async def _fetch(self) -> list:
+        """Все строки индекса из базы"""
+
+    def _refreshed(self, task: asyncio.Task):
+        if self._refresh_task is task:
+            self._refresh_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background rebuild of %s failed", type(self).__name__, exc_info=task.exception())
+
+    def _record(self, operation, *args):
+        """Запоминает изменение, если идёт перестройка"""
+        if self._journal is not None:
+            self._journal.append((operation, args))
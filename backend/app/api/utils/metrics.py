@@ -0,0 +1,183 @@
+import bisect
+import contextvars
+import time
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# [число обращений к Supabase, суммарное время] текущего HTTP-запроса
+_backend_usage: contextvars.ContextVar[list | None] = contextvars.ContextVar("backend_usage", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class _RouteStats:
+    __slots__ = ("duration", "statuses", "backend_calls", "backend_seconds")
+
+    def __init__(self):
+        self.duration = _Histogram()
+        self.statuses: dict[int, int] = {}
+        self.backend_calls = 0
+        self.backend_seconds = 0.0
+
+
+class Metrics:
+    """Счётчики HTTP-роутов и обращений к Supabase в памяти процесса.
+
+    Роут — шаблон пути FastAPI ("/events/{event_id}"), а не сам путь, чтобы
+    число серий не росло с числом id. Все обновления — несколько операций
+    со словарями без блокировок: код выполняется в одном event loop.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self._routes: dict[tuple[str, str], _RouteStats] = {}
+        self._backend: dict[str, list] = {}
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, usage: list):
+        stats = self._routes.get((method, route))
+        if stats is None:
+            stats = self._routes[(method, route)] = _RouteStats()
+        stats.duration.observe(seconds)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.backend_calls += usage[0]
+        stats.backend_seconds += usage[1]
+
+    def observe_backend(self, target: str, seconds: float):
+        totals = self._backend.get(target)
+        if totals is None:
+            totals = self._backend[target] = [0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+        usage = _backend_usage.get()
+        if usage is not None:
+            usage[0] += 1
+            usage[1] += seconds
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines = [
+            "# HELP http_request_duration_seconds Время обработки запроса по роутам",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), stats in self._routes.items():
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip((*BUCKETS, "+Inf"), stats.duration.counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.duration.sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += ["# HELP http_requests_total Ответы по роутам и кодам", "# TYPE http_requests_total counter"]
+        for (method, route), stats in self._routes.items():
+            for status, count in stats.statuses.items():
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+
+        lines += ["# HELP http_requests_in_flight Запросы в обработке", "# TYPE http_requests_in_flight gauge",
+                  f"http_requests_in_flight {self.in_flight}"]
+
+        lines += ["# HELP http_route_backend_calls_total Обращения к Supabase из роута",
+                  "# TYPE http_route_backend_calls_total counter"]
+        for (method, route), stats in self._routes.items():
+            lines.append(f'http_route_backend_calls_total{{method="{method}",route="{_escape(route)}"}} '
+                         f"{stats.backend_calls}")
+        lines += ["# HELP http_route_backend_seconds_total Время ожидания Supabase в роуте",
+                  "# TYPE http_route_backend_seconds_total counter"]
+        for (method, route), stats in self._routes.items():
+            lines.append(f'http_route_backend_seconds_total{{method="{method}",route="{_escape(route)}"}} '
+                         f"{stats.backend_seconds:.6f}")
+
+        lines += ["# HELP backend_calls_total Обращения к Supabase по таблицам и функциям",
+                  "# TYPE backend_calls_total counter"]
+        lines += [f'backend_calls_total{{target="{_escape(target)}"}} {calls}'
+                  for target, (calls, _) in self._backend.items()]
+        lines += ["# HELP backend_call_seconds_total Время обращений к Supabase",
+                  "# TYPE backend_call_seconds_total counter"]
+        lines += [f'backend_call_seconds_total{{target="{_escape(target)}"}} {seconds:.6f}'
+                  for target, (_, seconds) in self._backend.items()]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def backend_target(path: str) -> str:
+    """/rest/v1/events -> events, /rest/v1/rpc/join_event -> rpc/join_event, /storage/v1/... -> storage"""
+    if path.startswith("/rest/v1/"):
+        return path[len("/rest/v1/"):]
+    if path.startswith("/storage/"):
+        return "storage"
+    return path
+
+
+metrics = Metrics()
+
+
+async def _mark_backend_request(request):
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+async def _observe_backend_response(response):
+    started = response.request.extensions.get("metrics_started")
+    if started is not None:
+        metrics.observe_backend(backend_target(response.request.url.path), time.perf_counter() - started)
+
+
+def instrument_client(session):
+    """Подключает учёт обращений к httpx-клиенту (сессии PostgREST или storage)"""
+    hooks = session.event_hooks
+    if _mark_backend_request not in hooks["request"]:
+        hooks["request"].append(_mark_backend_request)
+        hooks["response"].append(_observe_backend_response)
+        session.event_hooks = hooks
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время, код ответа и обращения к Supabase по роутам, заголовок Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        usage = [0, 0.0]
+        token = _backend_usage.set(usage)
+        status = 500
+        metrics.in_flight += 1
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                # Параллельные запросы (gather) могут в сумме превышать общее время
+                timing = (f'db;dur={usage[1] * 1000:.1f};desc="{usage[0]} calls", '
+                          f"app;dur={max(elapsed - usage[1] * 1000, 0):.1f}, total;dur={elapsed:.1f}")
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode()),
+                                      (b"timing-allow-origin", b"*")]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.in_flight -= 1
+            _backend_usage.reset(token)
+            route = scope.get("route")
+            metrics.observe_request(scope["method"], route.path if route is not None else "unmatched",
+                                    status, time.perf_counter() - started, usage)
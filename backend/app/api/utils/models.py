@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Literal, Optional, List
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AwareDatetime, BaseModel, EmailStr, Field
 
 
 class RegisterRequest(BaseModel):
@@ -42,6 +42,23 @@ class EventCreateRequest(BaseModel):
     start_timestamptz: datetime
     end_timestamptz: datetime
     tags: List[str]
+    # Публикация от имени группы (только для её админов)
+    group_id: Optional[int] = None
+
+
+class EventUpdateRequest(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    # Время только с часовым поясом: наивная строка читалась бы по локальному времени сервера
+    start_timestamptz: Optional[AwareDatetime] = None
+    end_timestamptz: Optional[AwareDatetime] = None
+    tags: Optional[List[str]] = None
+    image: Optional[str] = None
+
+
+class BulkJoinRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=100)
 
 
 class GroupCreate(BaseModel):
@@ -56,3 +73,23 @@ class GroupUpdate(BaseModel):
     description: Optional[str] = None
     avatar_url: Optional[str] = None
     tags: Optional[List[str]] = None
+
+
+class ChatCreateRequest(BaseModel):
+    title: Optional[str] = None
+    member_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class ChatMessageRequest(BaseModel):
+    body: str = Field(..., min_length=1, max_length=4000)
+
+
+class ChatSocketAuth(BaseModel):
+    type: Literal["auth"]
+    token: str
+
+
+class ChatSocketFrame(ChatMessageRequest):
+    type: Literal["send"]
+    chat_id: int
+    client_id: Optional[str] = Field(None, max_length=64)
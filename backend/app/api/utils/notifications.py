@@ -0,0 +1,132 @@
+import asyncio
+import itertools
+import json
+import time
+from collections import OrderedDict, deque
+
+from config import NOTIFY_BUFFER_SIZE, NOTIFY_HEARTBEAT_SECONDS, NOTIFY_MAX_USERS, NOTIFY_QUEUE_SIZE
+
+
+class _History:
+    """Последние уведомления пользователя для продолжения по Last-Event-ID"""
+    __slots__ = ("events", "truncated")
+
+    def __init__(self, size: int):
+        self.events: deque[tuple[int, bytes]] = deque(maxlen=size)
+        self.truncated = 0
+
+    def append(self, seq: int, frame: bytes):
+        if len(self.events) == self.events.maxlen:
+            self.truncated = self.events[0][0]
+        self.events.append((seq, frame))
+
+
+class _Subscriber:
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue[tuple[int, bytes]] = asyncio.Queue(size)
+        self.overflowed = False
+
+
+class NotificationBroker:
+    """Персональные уведомления пользователей в памяти процесса для SSE.
+
+    Роуты публикуют событие списку пользователей; каждое событие получает
+    номер "<эпоха>-<seq>", который клиент возвращает в Last-Event-ID при
+    переподключении. Если нужные события уже вытеснены из истории или процесс
+    перезапускался, вместо них приходит событие reset — клиенту нужно
+    перечитать данные целиком. Простаивающий поток — это очередь и таймер
+    heartbeat, без обращений к базе.
+    """
+
+    def __init__(self, buffer_size: int = NOTIFY_BUFFER_SIZE, max_users: int = NOTIFY_MAX_USERS,
+                 heartbeat: float = NOTIFY_HEARTBEAT_SECONDS, queue_size: int = NOTIFY_QUEUE_SIZE):
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self.heartbeat = heartbeat
+        self.queue_size = queue_size
+        self.published = 0
+        self.epoch = format(int(time.time()), "x")
+        self._seq = itertools.count(1)
+        self._history: OrderedDict[int, _History] = OrderedDict()
+        self._forgotten = 0
+        self._subscribers: dict[int, set[_Subscriber]] = {}
+
+    def publish(self, user_ids, event_type: str, data: dict):
+        for user_id in set(user_ids):
+            seq = next(self._seq)
+            frame = (f"id: {self.epoch}-{seq}\nevent: {event_type}\n"
+                     f"data: {json.dumps(data, ensure_ascii=False, default=str)}\n\n").encode()
+            self._remember(user_id, seq, frame)
+            self.published += 1
+            for subscriber in self._subscribers.get(user_id, ()):
+                try:
+                    subscriber.queue.put_nowait((seq, frame))
+                except asyncio.QueueFull:
+                    # Клиент не читает: поток закроется, пропущенное он получит по Last-Event-ID
+                    subscriber.overflowed = True
+
+    async def stream(self, user_id: int, last_event_id: str | None = None):
+        """Асинхронный генератор кадров text/event-stream"""
+        subscriber = _Subscriber(self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        # Пропущенное считается сразу после подписки, до первого await: всё более новое придёт в очередь
+        frames, last_seq = self._replay(user_id, last_event_id) if last_event_id else ([], 0)
+        try:
+            yield f"retry: {int(self.heartbeat * 1000)}\n\n".encode()
+            for frame in frames:
+                yield frame
+
+            while not subscriber.overflowed:
+                try:
+                    seq, frame = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if seq > last_seq:
+                    yield frame
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "streams": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "users": len(self._subscribers),
+            "published": self.published,
+        }
+
+    def _replay(self, user_id: int, last_event_id: str) -> tuple[list[bytes], int]:
+        """Пропущенные кадры после last_event_id и seq последнего из них; при невозможности — кадр reset"""
+        current = next(self._seq)
+        epoch, _, seq = last_event_id.partition("-")
+        reset = ([f"id: {self.epoch}-{current}\nevent: reset\ndata: {{}}\n\n".encode()], current)
+        if epoch != self.epoch or not seq.isdigit():
+            return reset
+
+        seq = int(seq)
+        history = self._history.get(user_id)
+        if history is None:
+            return reset if seq < self._forgotten else ([], seq)
+        if seq < history.truncated:
+            return reset
+        missed = [(event_seq, frame) for event_seq, frame in history.events if event_seq > seq]
+        return [frame for _, frame in missed], missed[-1][0] if missed else seq
+
+    def _remember(self, user_id: int, seq: int, frame: bytes):
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = _History(self.buffer_size)
+        else:
+            self._history.move_to_end(user_id)
+        history.append(seq, frame)
+        while len(self._history) > self.max_users:
+            _, evicted = self._history.popitem(last=False)
+            self._forgotten = max(self._forgotten, evicted.events[-1][0])
+
+
+notification_broker = NotificationBroker()
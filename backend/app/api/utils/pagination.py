@@ -0,0 +1,90 @@
+import base64
+import bisect
+import binascii
+import json
+import math
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+from config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+
+
+def encode_cursor(*values) -> str:
+    """Непрозрачный курсор из значений ключа последней записи страницы"""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> list | None:
+    if cursor is None:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _is_of(value, expected: type) -> bool:
+    # bool — подкласс int, а float-ключ JSON может прислать целым числом
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, expected)
+
+
+def check_cursor(values: list | None, types: tuple[type, ...]) -> tuple | None:
+    """Ключ курсора с проверкой числа и типов значений; 400 "Invalid cursor" при несовпадении"""
+    if values is None:
+        return None
+    if len(values) != len(types) or not all(_is_of(value, expected) for value, expected in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(values)
+
+
+class PageParams:
+    """Зависимость FastAPI с параметрами keyset-пагинации: limit и курсор"""
+
+    def __init__(
+            self,
+            limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+            cursor: Optional[str] = Query(None),
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor)
+
+    def key(self, *types: type) -> tuple | None:
+        """Курсор как ключ заданных типов, например key(float, int) для (начало, id)"""
+        return check_cursor(self.after, types)
+
+
+def keyset(query, page: PageParams, key: str = "id", desc: bool = False):
+    """Сортировка по уникальному ключу и выборка страницы после курсора (+1 строка для проверки продолжения)"""
+    query = query.order(key, desc=desc)
+    after = page.key(int)
+    if after is not None:
+        query = query.lt(key, after[0]) if desc else query.gt(key, after[0])
+    return query.limit(page.limit + 1)
+
+
+def page_of(rows: list, page: PageParams, key: str = "id") -> tuple[list, str | None]:
+    """Обрезает выборку keyset() до limit и строит курсор следующей страницы"""
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor(rows[-1][key])
+
+
+def page_of_ids(ids, page: PageParams) -> tuple[list, str | None]:
+    """То же для id, уже находящихся в памяти"""
+    ids = sorted(ids)
+    after = page.key(int)
+    if after is not None:
+        ids = ids[bisect.bisect_right(ids, after[0]):]
+    if len(ids) <= page.limit:
+        return ids, None
+    ids = ids[:page.limit]
+    return ids, encode_cursor(ids[-1])
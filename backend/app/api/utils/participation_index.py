@@ -0,0 +1,173 @@
+import asyncio
+import bisect
+import heapq
+import time
+from collections import OrderedDict
+
+from api.utils.functions import now_iso, to_timestamp
+from api.utils.memory_index import fetch_all
+from api.utils.supabase_client import supabase_client
+from config import PARTICIPATION_INDEX_MAX_USERS, PARTICIPATION_INDEX_TTL_SECONDS
+
+
+class _Schedule:
+    """Предстоящие мероприятия пользователя, отсортированные по (start, event_id)"""
+
+    def __init__(self):
+        self.items: list[tuple[float, int, float]] = []
+        self.loaded_at = time.monotonic()
+
+    def add(self, start: float, event_id: int, end: float):
+        self.remove(event_id)
+        bisect.insort(self.items, (start, event_id, end))
+
+    def remove(self, event_id: int):
+        self.items = [item for item in self.items if item[1] != event_id]
+
+    def after(self, cursor: tuple[float, int] | None, now: float, user_id: int):
+        """Мероприятия после курсора в виде (start, event_id, user_id, end)"""
+        start = 0
+        if cursor is not None:
+            start = bisect.bisect_right(self.items, (cursor[0], cursor[1], float("inf")))
+        return ((item[0], item[1], user_id, item[2]) for item in self.items[start:] if item[2] > now)
+
+
+class ParticipationIndex:
+    """Обратный индекс участия: пользователь -> его предстоящие мероприятия.
+
+    Расписания пользователей подгружаются пачкой (один запрос на всех
+    отсутствующих в памяти, постранично) и поддерживаются роутами
+    мероприятий. Параллельные чтения одного пользователя ждут одну загрузку,
+    а загрузка, во время которой его расписание изменилось, в индекс не
+    попадает (как в friend_graph). Прошедшие мероприятия отбрасываются при
+    чтении. Размер ограничен LRU, свежесть — TTL.
+    """
+
+    def __init__(self, max_users: int = PARTICIPATION_INDEX_MAX_USERS,
+                 ttl: float = PARTICIPATION_INDEX_TTL_SECONDS, page_size: int = 1000):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.page_size = page_size
+        self._users: OrderedDict[int, _Schedule] = OrderedDict()
+        self._loading: dict[int, asyncio.Task] = {}
+        self._stale: set[int] = set()
+
+    async def feed(self, user_ids, limit: int, cursor: tuple[float, int] | None = None):
+        """Слияние расписаний user_ids по времени начала.
+
+        Возвращает страницу [(event_id, [участвующие user_ids])] и курсор
+        (start, event_id) последнего элемента, если есть продолжение.
+        """
+        page, last = await self.timeline(user_ids, limit, cursor)
+        return [(event_id, ids) for _, event_id, _, ids in page], last
+
+    async def timeline(self, user_ids, limit: int, cursor: tuple[float, int] | None = None):
+        """То же, что feed(), но элементы страницы — (start, event_id, end, [user_ids])"""
+        schedules = await self._get_many(user_ids)
+        now = time.time()
+        merged = heapq.merge(*(
+            schedule.after(cursor, now, user_id) for user_id, schedule in schedules.items()
+        ))
+
+        page: list[tuple[float, int, float, list[int]]] = []
+        last = None
+        for start, event_id, user_id, end in merged:
+            if last is not None and last[1] == event_id:
+                page[-1][3].append(user_id)
+                continue
+            if len(page) == limit:
+                return page, last
+            page.append((start, event_id, end, [user_id]))
+            last = (start, event_id)
+        return page, None
+
+    def add(self, user_id: int, event_id: int, start, end):
+        schedule = self._users.get(user_id)
+        if schedule is not None:
+            schedule.add(to_timestamp(start), event_id, to_timestamp(end))
+        self._mark_stale(user_id)
+
+    def remove(self, user_id: int, event_id: int):
+        schedule = self._users.get(user_id)
+        if schedule is not None:
+            schedule.remove(event_id)
+        self._mark_stale(user_id)
+
+    def remove_event(self, event_id: int, participants):
+        for user_id in participants or []:
+            self.remove(user_id, event_id)
+
+    def reschedule(self, event_id: int, participants, start, end):
+        for user_id in participants or []:
+            self.add(user_id, event_id, start, end)
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
+        self._mark_stale(user_id)
+
+    async def _get_many(self, user_ids) -> dict[int, _Schedule]:
+        schedules: dict[int, _Schedule] = {}
+        missing = []
+        now = time.monotonic()
+        for user_id in user_ids:
+            schedule = self._users.get(user_id)
+            if schedule is not None and now - schedule.loaded_at < self.ttl:
+                self._users.move_to_end(user_id)
+                schedules[user_id] = schedule
+            else:
+                missing.append(user_id)
+
+        if missing:
+            tasks = {self._loading[user_id] for user_id in missing if user_id in self._loading}
+            new = [user_id for user_id in missing if user_id not in self._loading]
+            if new:
+                task = asyncio.create_task(self._load(new))
+                for user_id in new:
+                    self._loading[user_id] = task
+                tasks.add(task)
+            for loaded in await asyncio.gather(*(asyncio.shield(task) for task in tasks)):
+                schedules.update((user_id, loaded[user_id]) for user_id in missing if user_id in loaded)
+        return schedules
+
+    async def _fetch(self, user_ids: list[int]) -> dict[int, _Schedule]:
+        threshold = now_iso()
+        rows = await fetch_all(lambda: supabase_client.table("events")
+                               .select("id, start_timestamptz, end_timestamptz, participants")
+                               .overlaps("participants", [str(user_id) for user_id in user_ids])
+                               .gt("end_timestamptz", threshold), self.page_size)
+
+        loaded = {user_id: _Schedule() for user_id in user_ids}
+        for row in rows:
+            start, end = to_timestamp(row["start_timestamptz"]), to_timestamp(row["end_timestamptz"])
+            for user_id in set(row.get("participants") or []) & loaded.keys():
+                loaded[user_id].items.append((start, row["id"], end))
+        return loaded
+
+    async def _load(self, user_ids: list[int]) -> dict[int, _Schedule]:
+        try:
+            loaded = await self._fetch(user_ids)
+        except BaseException:
+            self._stale.difference_update(user_ids)
+            raise
+        finally:
+            for user_id in user_ids:
+                self._loading.pop(user_id, None)
+
+        for user_id, schedule in loaded.items():
+            schedule.items.sort()
+            if user_id in self._stale:
+                # Расписание изменилось во время загрузки: ответ отдаём, но не кэшируем
+                self._stale.discard(user_id)
+                continue
+            self._users[user_id] = schedule
+            self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return loaded
+
+    def _mark_stale(self, user_id: int):
+        if user_id in self._loading:
+            self._stale.add(user_id)
+
+
+participation_index = ParticipationIndex()
@@ -0,0 +1,96 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from config import (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P, PASSWORD_HASH_WORKERS,
+                    PASSWORD_HASH_CONCURRENCY, PASSWORD_HASH_QUEUE)
+
+_SCHEME = "scrypt"
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    """Выполняется в процессе пула"""
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r * p + 1024 * 1024, dklen=32)
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+class PasswordHasher:
+    """Хэширование паролей scrypt вне event loop.
+
+    Вычисления идут в пуле процессов, поэтому не блокируют остальные роуты.
+    Одновременно выполняется не больше concurrency хэшей, в очереди ждут не
+    больше queue_size запросов — остальные сразу получают 503. Формат хэша:
+    scrypt$n$r$p$соль$хэш; хэши со старыми параметрами и старые SHA-256
+    подлежат перехэшированию при успешном входе.
+    """
+
+    def __init__(self, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P,
+                 workers: int = PASSWORD_HASH_WORKERS, concurrency: int = PASSWORD_HASH_CONCURRENCY,
+                 queue_size: int = PASSWORD_HASH_QUEUE):
+        self.n, self.r, self.p = n, r, p
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency or self.workers
+        self.queue_size = queue_size
+        self._pool: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._waiting = 0
+
+    async def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        digest = await self._run(password, salt, self.n, self.r, self.p)
+        return f"{_SCHEME}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}"
+
+    async def verify(self, password: str, stored: str) -> tuple[bool, bool]:
+        """Возвращает (пароль верный, хэш нужно пересчитать)"""
+        if not stored:
+            return False, False
+        if not stored.startswith(_SCHEME + "$"):
+            legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+            ok = hmac.compare_digest(legacy, stored)
+            return ok, ok
+
+        try:
+            _, n, r, p, salt, expected = stored.split("$")
+            n, r, p = int(n), int(r), int(p)
+            salt, expected = base64.b64decode(salt), base64.b64decode(expected)
+        except ValueError:
+            return False, False
+        digest = await self._run(password, salt, n, r, p)
+        ok = hmac.compare_digest(digest, expected)
+        return ok, ok and (n, r, p) != (self.n, self.r, self.p)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        if self._semaphore.locked() and self._waiting >= self.queue_size:
+            raise HTTPException(status_code=503, detail="Too many login attempts, try again later")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, _scrypt, password, salt, n, r, p)
+        finally:
+            self._semaphore.release()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,188 @@
+import contextvars
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from api.utils.metrics import backend_target
+from config import QUERY_TRACE, QUERY_TRACE_BUDGET, QUERY_TRACE_REPEAT
+
+logger = logging.getLogger(__name__)
+
+# Параметры PostgREST, которые задают форму запроса, а не фильтр по значению
+SHAPE_PARAMS = {"select", "order", "limit", "offset", "columns", "on_conflict"}
+
+
+@dataclass
+class Query:
+    method: str
+    target: str
+    params: list[tuple[str, str]]
+    body: bytes
+    duration: float
+    rows: int | None
+
+    @property
+    def filters(self) -> list[str]:
+        return [f"{key}={value}" for key, value in self.params if key not in SHAPE_PARAMS]
+
+    def key(self) -> tuple:
+        """Полностью одинаковые запросы"""
+        return self.method, self.target, tuple(self.params), self.body
+
+    def shape(self) -> tuple:
+        """Запросы, отличающиеся только значениями фильтров: eq.1 и eq.2 дают одну форму"""
+        return self.method, self.target, tuple(
+            (key, value if key in SHAPE_PARAMS else value.split(".", 1)[0]) for key, value in self.params)
+
+    def describe(self) -> str:
+        return f"{self.method} {self.target}?{'&'.join(self.filters)}"
+
+
+@dataclass
+class Trace:
+    """Запросы к Supabase одного HTTP-запроса и найденные в них проблемы"""
+    queries: list[Query] = field(default_factory=list)
+    budget: int = QUERY_TRACE_BUDGET
+    repeat: int = QUERY_TRACE_REPEAT
+
+    def duplicates(self) -> list[tuple[Query, int]]:
+        counts = Counter(query.key() for query in self.queries)
+        first = {query.key(): query for query in reversed(self.queries)}
+        return [(first[key], count) for key, count in counts.items() if count > 1]
+
+    def repeated_shapes(self) -> list[tuple[Query, int]]:
+        """Одинаковые по форме запросы с разными значениями — обычно N+1 в цикле"""
+        counts = Counter(query.shape() for query in self.queries)
+        first = {query.shape(): query for query in reversed(self.queries)}
+        return [(first[shape], count) for shape, count in counts.items() if count >= self.repeat]
+
+    def redundant_filters(self) -> list[Query]:
+        """Один и тот же фильтр дважды в одном запросе"""
+        return [query for query in self.queries if len(set(query.filters)) < len(query.filters)]
+
+    def problems(self) -> list[str]:
+        problems = [f"duplicate x{count}: {query.describe()}" for query, count in self.duplicates()]
+        problems += [f"repeated x{count}: {query.describe()}" for query, count in self.repeated_shapes()]
+        problems += [f"redundant filter: {query.describe()}" for query in self.redundant_filters()]
+        if len(self.queries) > self.budget:
+            problems.append(f"budget exceeded: {len(self.queries)} > {self.budget}")
+        return problems
+
+    def report(self, method: str, route: str, status: int) -> dict:
+        return {
+            "route": f"{method} {route}",
+            "status": status,
+            "queries": [{"query": query.describe(), "ms": round(query.duration * 1000, 2), "rows": query.rows}
+                        for query in self.queries],
+            "total_ms": round(sum(query.duration for query in self.queries) * 1000, 2),
+            "problems": self.problems(),
+        }
+
+
+_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("query_trace", default=None)
+
+
+def query_budget(limit: int):
+    """Декоратор эндпоинта: сколько обращений к Supabase ему разрешено при трассировке"""
+    def decorator(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+    return decorator
+
+
+async def _mark_request(request):
+    if _trace.get() is not None:
+        request.extensions["trace_started"] = time.perf_counter()
+
+
+async def _record_response(response):
+    trace = _trace.get()
+    started = response.request.extensions.get("trace_started")
+    if trace is None or started is None:
+        return
+    duration = time.perf_counter() - started
+    await response.aread()
+    try:
+        data = response.json()
+        rows = len(data) if isinstance(data, list) else 1
+    except ValueError:
+        rows = None
+    request = response.request
+    try:
+        body = request.content
+    except httpx.RequestNotRead:
+        body = b""
+    trace.queries.append(Query(request.method, backend_target(request.url.path),
+                               request.url.params.multi_items(), body, duration, rows))
+
+
+def trace_client(session):
+    """Подключает трассировку к httpx-клиенту; запросы пишутся, только если трассировка включена"""
+    hooks = session.event_hooks
+    if _mark_request not in hooks["request"]:
+        hooks["request"].append(_mark_request)
+        hooks["response"].append(_record_response)
+        session.event_hooks = hooks
+
+
+class QueryTraceMiddleware:
+    """Отчёт о запросах к Supabase для каждого HTTP-запроса (QUERY_TRACE).
+
+    log — отчёт в лог (warning, если есть проблемы); header — ещё и
+    X-Query-Trace в ответе; strict — вдобавок при проблемах вместо ответа
+    отдаётся 500 с отчётом, чтобы тесты падали на превышении бюджета и N+1.
+    """
+
+    def __init__(self, app, mode: str = QUERY_TRACE):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _trace.set(trace)
+        state = {"status": 500, "replaced": False}
+
+        def build_report() -> dict:
+            route = scope.get("route")
+            trace.budget = getattr(getattr(route, "endpoint", None), "query_budget", trace.budget)
+            return trace.report(scope["method"], route.path if route is not None else "unmatched",
+                                state["status"])
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if self.mode in ("header", "strict"):
+                    report = build_report()
+                    summary = (f"queries={len(trace.queries)}; ms={report['total_ms']}; "
+                               f"problems={len(report['problems'])}")
+                    if self.mode == "strict" and report["problems"]:
+                        state["replaced"] = True
+                        body = json.dumps({"detail": "Query trace violations", "trace": report},
+                                          ensure_ascii=False).encode()
+                        await send({"type": "http.response.start", "status": 500, "headers": [
+                            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                            (b"x-query-trace", summary.encode())]})
+                        await send({"type": "http.response.body", "body": body})
+                        return
+                    message["headers"] = [*message.get("headers", ()), (b"x-query-trace", summary.encode())]
+            elif state["replaced"]:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            _trace.reset(token)
+            report = build_report()
+            if report["problems"]:
+                logger.warning("query trace: %s", json.dumps(report, ensure_ascii=False))
+            else:
+                logger.info("query trace: %s", json.dumps(report, ensure_ascii=False))
@@ -0,0 +1,239 @@
+import bisect
+import heapq
+import math
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from api.utils.functions import now_iso, to_timestamp
+from api.utils.memory_index import ReloadableIndex, fetch_all
+from api.utils.supabase_client import supabase_client
+from config import (RECOMMENDATIONS_TOP_K, RECOMMENDATIONS_CACHE_SIZE, RECOMMENDATIONS_CACHE_TTL_SECONDS,
+                    RECOMMENDATIONS_REFRESH_SECONDS, RECOMMENDATIONS_TIME_BOOST, RECOMMENDATIONS_TIME_DECAY_DAYS)
+
+
+class _Postings:
+    """Мероприятия одного тэга, отсортированные по времени начала"""
+    __slots__ = ("starts", "ids")
+
+    def __init__(self, items=()):
+        self.starts = array("d", (start for start, _ in items))
+        self.ids = array("q", (event_id for _, event_id in items))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, start: float, event_id: int):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ids.insert(i, event_id)
+
+    def remove(self, start: float, event_id: int):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.ids) and self.starts[i] == start:
+            if self.ids[i] == event_id:
+                del self.starts[i]
+                del self.ids[i]
+                return
+            i += 1
+
+
+@dataclass
+class _Cached:
+    tags: frozenset
+    ranked: list[int]
+    computed_at: float
+
+
+class RecommendationEngine(ReloadableIndex):
+    """Рекомендации мероприятий по тэгам пользователя.
+
+    Оценка мероприятия — сумма IDF совпавших тэгов, умноженная на буст
+    ближайшего начала: 1 + time_boost * exp(-дней_до_начала / decay_days).
+    Top-k выбирается по спискам тэгов, отсортированным по времени начала:
+    списки читаются порциями, пока k-й результат не станет не хуже верхней
+    оценки ещё не просмотренных мероприятий, поэтому обычно просматривается
+    лишь начало списков. Результаты кэшируются по пользователю и сбрасываются
+    при смене его тэгов или изменении мероприятий с общими тэгами.
+    """
+
+    def __init__(self, top_k: int = RECOMMENDATIONS_TOP_K, cache_size: int = RECOMMENDATIONS_CACHE_SIZE,
+                 cache_ttl: float = RECOMMENDATIONS_CACHE_TTL_SECONDS,
+                 refresh_seconds: float = RECOMMENDATIONS_REFRESH_SECONDS,
+                 time_boost: float = RECOMMENDATIONS_TIME_BOOST,
+                 decay_days: float = RECOMMENDATIONS_TIME_DECAY_DAYS):
+        super().__init__(refresh_seconds)
+        self.top_k = top_k
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.time_boost = time_boost
+        self.decay_seconds = decay_days * 86400
+        self._events: dict[int, tuple[float, float, tuple[str, ...]]] = {}
+        self._postings: dict[str, _Postings] = {}
+        self._cache: OrderedDict[int, _Cached] = OrderedDict()
+        self._tag_users: dict[str, set[int]] = {}
+
+    def load(self, rows):
+        """Полная замена индекса строками events (id, tags, start/end_timestamptz)"""
+        events = {}
+        postings: dict[str, list[tuple[float, int]]] = {}
+        for row in rows:
+            if not row.get("tags"):
+                continue
+            start, end = to_timestamp(row["start_timestamptz"]), to_timestamp(row["end_timestamptz"])
+            tags = tuple(set(row["tags"]))
+            events[row["id"]] = (start, end, tags)
+            for tag in tags:
+                postings.setdefault(tag, []).append((start, row["id"]))
+
+        self._events = events
+        self._postings = {tag: _Postings(sorted(items)) for tag, items in postings.items()}
+        self._cache.clear()
+        self._tag_users.clear()
+        self._loaded_at = time.monotonic()
+
+    def upsert_event(self, event_id: int, tags, start, end):
+        self._record(self.upsert_event, event_id, tags, start, end)
+        self.remove_event(event_id, journal=False)
+        if not tags:
+            return
+        start, end = to_timestamp(start), to_timestamp(end)
+        tags = tuple(set(tags))
+        self._events[event_id] = (start, end, tags)
+        for tag in tags:
+            self._postings.setdefault(tag, _Postings()).add(start, event_id)
+        self._invalidate_tags(tags)
+
+    def remove_event(self, event_id: int, journal: bool = True):
+        if journal:
+            self._record(self.remove_event, event_id)
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        start, _, tags = event
+        for tag in tags:
+            postings = self._postings.get(tag)
+            if postings is not None:
+                postings.remove(start, event_id)
+                if not postings:
+                    del self._postings[tag]
+        self._invalidate_tags(tags)
+
+    def cached(self, user_id: int) -> list[int] | None:
+        entry = self._cache.get(user_id)
+        if entry is None or time.monotonic() - entry.computed_at > self.cache_ttl:
+            return None
+        self._cache.move_to_end(user_id)
+        return entry.ranked
+
+    def recommend(self, user_id: int, user_tags) -> list[int]:
+        """Top-k id мероприятий для пользователя с сохранением в кэш"""
+        self.invalidate_user(user_id)
+        tags = frozenset(user_tags)
+        ranked = self.rank(tags, self.top_k)
+        self._cache[user_id] = _Cached(tags, ranked, time.monotonic())
+        for tag in tags:
+            self._tag_users.setdefault(tag, set()).add(user_id)
+        while len(self._cache) > self.cache_size:
+            self.invalidate_user(next(iter(self._cache)))
+        return ranked
+
+    def schedule(self, event_ids) -> list[tuple[float, int, float]]:
+        """(start, event_id, end) известных индексу мероприятий из event_ids"""
+        return [(self._events[event_id][0], event_id, self._events[event_id][1])
+                for event_id in event_ids if event_id in self._events]
+
+    def invalidate_user(self, user_id: int):
+        entry = self._cache.pop(user_id, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            users = self._tag_users.get(tag)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._tag_users[tag]
+
+    def rank(self, user_tags, k: int, now: float | None = None) -> list[int]:
+        now = now or time.time()
+        tags = [tag for tag in set(user_tags) if tag in self._postings]
+        if not tags:
+            return []
+
+        total = len(self._events)
+        idf = {tag: math.log(1 + total / len(self._postings[tag])) for tag in tags}
+        positions = dict.fromkeys(tags, 0)
+        seen = set()
+        heap: list[tuple[float, int]] = []
+        depth = max(4 * k, 256)
+        active = tags
+
+        while True:
+            for tag in active:
+                postings = self._postings[tag]
+                stop = min(depth, len(postings))
+                for event_id in postings.ids[positions[tag]:stop]:
+                    if event_id in seen:
+                        continue
+                    seen.add(event_id)
+                    start, end, event_tags = self._events[event_id]
+                    if end <= now:
+                        continue
+                    score = sum(idf.get(event_tag, 0) for event_tag in event_tags) * self._boost(start, now)
+                    if len(heap) < k:
+                        heapq.heappush(heap, (score, event_id))
+                    elif score > heap[0][0]:
+                        heapq.heapreplace(heap, (score, event_id))
+                positions[tag] = stop
+
+            truncated = [tag for tag in tags if positions[tag] < len(self._postings[tag])]
+            if not truncated:
+                break
+            if len(heap) < k:
+                active = truncated
+            else:
+                # Непросмотренное мероприятие из списков S оценивается сверху как
+                # sum(IDF S) * min(буст непрочитанного начала в S). Списки частых тэгов,
+                # которые даже вместе не дотягивают до k-го результата, дальше не читаем.
+                threshold = heap[0][0]
+                bounds = {tag: (idf[tag], self._boost(self._postings[tag].starts[positions[tag]], now))
+                          for tag in truncated}
+                if self._upper_bound(bounds.values()) <= threshold:
+                    break
+                skipped = []
+                for tag in sorted(truncated, key=idf.get):
+                    if self._upper_bound([bounds[other] for other in skipped + [tag]]) > threshold:
+                        break
+                    skipped.append(tag)
+                active = [tag for tag in truncated if tag not in skipped]
+            depth *= 2
+
+        return [event_id for _, event_id in sorted(heap, reverse=True)]
+
+    async def _fetch(self) -> list[dict]:
+        """Предстоящие мероприятия (id, tags, start/end_timestamptz)"""
+        threshold = now_iso()
+        return await fetch_all(lambda: supabase_client.table("events")
+                               .select("id, tags, start_timestamptz, end_timestamptz")
+                               .gt("end_timestamptz", threshold))
+
+    def _boost(self, start: float, now: float) -> float:
+        return 1 + self.time_boost * math.exp(-max(start - now, 0) / self.decay_seconds)
+
+    @staticmethod
+    def _upper_bound(lists) -> float:
+        """max по S оценки sum(IDF S) * min(буст S) для списков (idf, буст)"""
+        best = weight = 0
+        for idf, boost in sorted(lists, key=lambda item: item[1], reverse=True):
+            weight += idf
+            best = max(best, weight * boost)
+        return best
+
+    def _invalidate_tags(self, tags):
+        for tag in tags:
+            for user_id in list(self._tag_users.get(tag, ())):
+                self.invalidate_user(user_id)
+
+
+recommendation_engine = RecommendationEngine()
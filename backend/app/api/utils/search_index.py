@@ -0,0 +1,301 @@
+import bisect
+import heapq
+import math
+import re
+import time
+from array import array
+
+from api.utils.memory_index import ReloadableIndex, fetch_all
+from api.utils.supabase_client import supabase_client
+from config import SEARCH_MAX_EXPANSIONS, SEARCH_FACET_SCAN, SEARCH_REFRESH_SECONDS
+
+TYPES = ("users", "groups", "events")
+
+NAME_WEIGHT = 3
+TAG_WEIGHT = 2
+TEXT_WEIGHT = 1
+
+EXACT, PREFIX, INFIX = 1.0, 0.7, 0.4
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text) -> list[str]:
+    if not text:
+        return []
+    return _TOKEN.findall(str(text).lower().replace("ё", "е"))
+
+
+def _trigrams(term: str) -> set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+class _Index:
+    """Инвертированный индекс: термин -> документы, триграмма -> термины.
+
+    Список документов термина разбит на три яруса по весу поля, в котором
+    встретился термин; внутри яруса документы идут по порядку добавления и
+    только дописываются. Прямой индекс документ -> (термин, вес) нужен для
+    оценки остальных слов запроса. Удалённые и изменённые документы
+    помечаются мёртвыми, списки чистятся лениво при поиске.
+    """
+
+    def __init__(self):
+        self.term_ids: dict[str, int] = {}
+        self.terms: list[str] = []
+        self.sorted_terms: list[str] = []
+        self.postings: list[tuple[array, array, array]] = []
+        self.trigrams: dict[str, array] = {}
+        self.doc_type = array("b")
+        self.doc_entity = array("q")
+        self.doc_terms: list[array | None] = []
+        self.alive = bytearray()
+        self.docs: dict[int, dict[int, int]] = {code: {} for code in range(len(TYPES))}
+        self.live = 0
+
+    def add(self, code: int, entity_id: int, fields, sort_terms: bool = True):
+        """fields — пары (текст или список тэгов, вес поля)"""
+        self.remove(code, entity_id)
+        doc = len(self.alive)
+        self.doc_type.append(code)
+        self.doc_entity.append(entity_id)
+        self.alive.append(1)
+        self.docs[code][entity_id] = doc
+        self.live += 1
+
+        terms: dict[str, int] = {}
+        for value, weight in fields:
+            values = value if isinstance(value, list) else [value]
+            for text in values:
+                for term in tokenize(text):
+                    if terms.get(term, 0) < weight:
+                        terms[term] = weight
+
+        encoded = array("i")
+        for term, weight in terms.items():
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                term_id = self._new_term(term, sort_terms)
+            self.postings[term_id][weight - 1].append(doc)
+            encoded.append(term_id << 2 | weight)
+        self.doc_terms.append(encoded)
+
+    def remove(self, code: int, entity_id: int):
+        doc = self.docs[code].pop(entity_id, None)
+        if doc is not None:
+            self.alive[doc] = 0
+            self.doc_terms[doc] = None
+            self.live -= 1
+
+    def search(self, query: str, limit: int, types=None, max_expansions: int = SEARCH_MAX_EXPANSIONS,
+               facet_scan: int = SEARCH_FACET_SCAN):
+        """Top-limit документов и число совпадений по типам.
+
+        Ведущим становится слово запроса с самыми короткими списками; его ярусы
+        читаются по убыванию оценки, остальные слова оцениваются по прямому
+        индексу. Чтение останавливается, когда следующий документ уже не может
+        попасть в top и просмотрено не меньше facet_scan записей; тогда
+        счётчики типов экстраполируются и помечаются как приблизительные.
+        """
+        empty = [], dict.fromkeys(TYPES, 0), True
+        tokens = list(dict.fromkeys(tokenize(query)))[:8]
+        if not tokens or not self.live:
+            return empty
+
+        bases = []
+        for token in tokens:
+            terms = {}
+            for term_id, quality in self._candidates(token, max_expansions):
+                base = quality * math.log(1 + self.live / max(self._df(term_id), 1))
+                if base > terms.get(term_id, 0):
+                    terms[term_id] = base
+            if not terms:
+                return empty
+            bases.append(terms)
+
+        bases.sort(key=lambda terms: sum(self._df(term_id) for term_id in terms))
+        driver, others = bases[0], bases[1:]
+        others_max = sum(max(terms.values()) * NAME_WEIGHT for terms in others)
+        segments = sorted(((base * weight, term_id, weight) for term_id, base in driver.items()
+                           for weight in (NAME_WEIGHT, TAG_WEIGHT, TEXT_WEIGHT)
+                           if self.postings[term_id][weight - 1]), reverse=True)
+        total = sum(len(self.postings[term_id][weight - 1]) for _, term_id, weight in segments)
+
+        allowed = None if types is None else {TYPES.index(kind) for kind in types}
+        alive, doc_type, doc_terms = self.alive, self.doc_type, self.doc_terms
+        heap: list[tuple[float, int]] = []
+        seen = set()
+        facets = [0] * len(TYPES)
+        scanned = 0
+        exact = True
+
+        for segment_score, term_id, weight in segments:
+            postings = self.postings[term_id][weight - 1]
+            if scanned >= facet_scan and len(heap) == limit and segment_score + others_max <= heap[0][0]:
+                exact = False
+                break
+            dead = 0
+            for doc in postings:
+                scanned += 1
+                if not alive[doc]:
+                    dead += 1
+                    continue
+                if doc in seen:
+                    continue
+                if scanned >= facet_scan and len(heap) == limit and segment_score + others_max <= heap[0][0]:
+                    exact = False
+                    break
+                seen.add(doc)
+
+                score = segment_score
+                for terms in others:
+                    best = 0
+                    for code in doc_terms[doc]:
+                        base = terms.get(code >> 2)
+                        if base is not None and base * (code & 3) > best:
+                            best = base * (code & 3)
+                    if not best:
+                        score = 0
+                        break
+                    score += best
+                if not score:
+                    continue
+
+                facets[doc_type[doc]] += 1
+                if allowed is not None and doc_type[doc] not in allowed:
+                    continue
+                if len(heap) < limit:
+                    heapq.heappush(heap, (score, -doc))
+                elif score > heap[0][0]:
+                    heapq.heapreplace(heap, (score, -doc))
+            if dead * 2 > len(postings):
+                self._compact(term_id, weight)
+            if not exact:
+                break
+
+        if not exact and scanned:
+            scale = total / scanned
+            facets = [round(count * scale) for count in facets]
+        results = [(TYPES[doc_type[-doc]], self.doc_entity[-doc], round(score, 4))
+                   for score, doc in sorted(heap, reverse=True)]
+        return results, dict(zip(TYPES, facets)), exact
+
+    def _df(self, term_id: int) -> int:
+        return sum(len(postings) for postings in self.postings[term_id])
+
+    def _candidates(self, token: str, max_expansions: int) -> list[tuple[int, float]]:
+        """Термины запроса: точное совпадение, самые частые продолжения префикса и вхождения по триграммам"""
+        result = []
+        exact = self.term_ids.get(token)
+        if exact is not None:
+            result.append((exact, EXACT))
+
+        start = bisect.bisect_left(self.sorted_terms, token)
+        stop = bisect.bisect_left(self.sorted_terms, token + "\uffff", start)
+        prefixed = (self.term_ids[term] for term in self.sorted_terms[start:stop] if term != token)
+        best = heapq.nlargest(max_expansions, prefixed, key=self._df)
+        result.extend((term_id, PREFIX) for term_id in best)
+
+        if len(token) >= 3:
+            grams = sorted((self.trigrams.get(gram) for gram in _trigrams(token)),
+                           key=lambda ids: len(ids) if ids is not None else -1)
+            if grams and grams[0] is not None:
+                matched = set(grams[0])
+                for ids in grams[1:]:
+                    matched.intersection_update(ids)
+                    if not matched:
+                        break
+                infix = (term_id for term_id in matched
+                         if token in self.terms[term_id] and not self.terms[term_id].startswith(token))
+                best = heapq.nlargest(max_expansions, infix, key=self._df)
+                result.extend((term_id, INFIX) for term_id in best)
+        return result
+
+    def _compact(self, term_id: int, weight: int):
+        alive = self.alive
+        tiers = list(self.postings[term_id])
+        tiers[weight - 1] = array("i", (doc for doc in tiers[weight - 1] if alive[doc]))
+        self.postings[term_id] = tuple(tiers)
+
+    def _new_term(self, term: str, sort_terms: bool) -> int:
+        term_id = len(self.terms)
+        self.term_ids[term] = term_id
+        self.terms.append(term)
+        self.postings.append((array("i"), array("i"), array("i")))
+        if sort_terms:
+            bisect.insort(self.sorted_terms, term)
+        else:
+            self.sorted_terms.append(term)
+        for gram in _trigrams(term):
+            self.trigrams.setdefault(gram, array("i")).append(term_id)
+        return term_id
+
+
+def user_fields(row: dict):
+    return [(row.get("first_name"), NAME_WEIGHT), (row.get("last_name"), NAME_WEIGHT)]
+
+
+def group_fields(row: dict):
+    return [(row.get("name"), NAME_WEIGHT), (row.get("description"), TEXT_WEIGHT)]
+
+
+def event_fields(row: dict):
+    return [(row.get("title"), NAME_WEIGHT), (row.get("tags") or [], TAG_WEIGHT),
+            (row.get("description"), TEXT_WEIGHT)]
+
+
+SOURCES = {
+    "users": ("users", "id, first_name, last_name", user_fields),
+    "groups": ("groups", "id, name, description", group_fields),
+    "events": ("events", "id, title, description, tags", event_fields),
+}
+
+
+class SearchIndex(ReloadableIndex):
+    """Единый поиск по пользователям, группам и мероприятиям.
+
+    Индекс строится в памяти процесса при первом запросе и обновляется
+    роутами создания/изменения/удаления; раз в refresh_seconds он
+    перестраивается в фоне, изменения во время перестройки доигрываются.
+    Релевантность: сумма по словам запроса лучшего совпадения
+    (точное > префикс > подстрока) * вес поля * IDF термина; все слова обязательны.
+    """
+
+    def __init__(self, refresh_seconds: float = SEARCH_REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self._index = _Index()
+
+    def __len__(self):
+        return self._index.live
+
+    def load(self, documents):
+        """Полная замена индекса документами (тип, id, поля)"""
+        index = _Index()
+        for kind, entity_id, fields in documents:
+            index.add(TYPES.index(kind), entity_id, fields, sort_terms=False)
+        index.sorted_terms.sort()
+        self._index = index
+        self._loaded_at = time.monotonic()
+
+    def upsert(self, kind: str, row: dict):
+        self._record(self.upsert, kind, row)
+        self._index.add(TYPES.index(kind), row["id"], SOURCES[kind][2](row))
+
+    def remove(self, kind: str, entity_id: int):
+        self._record(self.remove, kind, entity_id)
+        self._index.remove(TYPES.index(kind), entity_id)
+
+    def search(self, query: str, limit: int, types=None):
+        """Возвращает [(тип, id, релевантность)], число совпадений по типам и точность этого числа"""
+        return self._index.search(query, limit, types)
+
+    async def _fetch(self) -> list[tuple]:
+        """Документы (тип, id, поля) всех источников"""
+        documents = []
+        for kind, (table, columns, fields) in SOURCES.items():
+            rows = await fetch_all(lambda: supabase_client.table(table).select(columns))
+            documents.extend((kind, row["id"], fields(row)) for row in rows)
+        return documents
+
+
+search_index = SearchIndex()
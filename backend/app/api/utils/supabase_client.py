@@ -1,14 +1,148 @@
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
 
-load_dotenv()
+from api.utils.metrics import instrument_client
+from api.utils.query_trace import trace_client
+from config import (QUERY_TRACE, SUPABASE_HTTP2, SUPABASE_KEEPALIVE_EXPIRY, SUPABASE_KEY, SUPABASE_MAX_CONNECTIONS,
+                    SUPABASE_MAX_KEEPALIVE, SUPABASE_STORAGE_TIMEOUT, SUPABASE_TIMEOUT, SUPABASE_URL,
+                    SUPABASE_WARMUP_CONNECTIONS)
+
+logger = logging.getLogger(__name__)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 AVATAR_BUCKET = 'images/avatars'
 
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Не заданы SUPABASE_URL или SUPABASE_KEY в .env файле")
 
-supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
\ No newline at end of file
+
+class SupabaseClientManager:
+    """Единственный клиент Supabase процесса.
+
+    Клиент (и тяжёлый импорт supabase) создаётся при первом обращении, поэтому
+    импорт main дешёвый. Запросы к PostgREST и storage идут через общий пул
+    httpx-соединений с настраиваемыми лимитами, keep-alive и HTTP/2. В
+    lifespan приложения вызываются start() — создание клиента и прогрев
+    соединений до готовности воркера — и aclose().
+    """
+
+    def __init__(self, url: str, key: str):
+        self.url = url
+        self.key = key
+        self.timings: dict[str, float] = {}
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._create()
+        return self._client
+
+    async def start(self, warmup_connections: int = SUPABASE_WARMUP_CONNECTIONS):
+        started = time.perf_counter()
+        client = self.client
+        self.timings["create_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if warmup_connections:
+            started = time.perf_counter()
+            await self.warm_up(client, warmup_connections)
+            self.timings["warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    @staticmethod
+    async def warm_up(client, connections: int):
+        """Открывает соединения заранее (TCP + TLS), чтобы первые запросы их не ждали.
+
+        Ошибки только логируются: недоступный Supabase не должен мешать старту.
+        """
+        session = client.postgrest.session
+        results = await asyncio.gather(*(session.head("/") for _ in range(connections)),
+                                       client.storage.session.head("/"), return_exceptions=True)
+        failed = [result for result in results if isinstance(result, BaseException)]
+        if failed:
+            logger.warning("supabase warm-up: %d of %d requests failed: %r", len(failed), len(results), failed[0])
+
+    async def aclose(self):
+        if self._client is None:
+            return
+        await asyncio.gather(self._client.postgrest.session.aclose(), self._client.storage.session.aclose(),
+                             return_exceptions=True)
+        self._client = None
+
+    def _create(self):
+        import httpx
+        from postgrest import AsyncPostgrestClient
+        from storage3 import AsyncStorageClient
+        from supabase import AsyncClient, AsyncClientOptions
+
+        _check_extension_points(AsyncClient, AsyncPostgrestClient, AsyncStorageClient)
+
+        limits = httpx.Limits(max_connections=SUPABASE_MAX_CONNECTIONS,
+                              max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+                              keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY)
+        # Один SSL-контекст на обе сессии: создание контекста — десятки мс старта
+        ssl_context = httpx.create_ssl_context()
+
+        def pooled(base_url: str, headers: dict, timeout) -> httpx.AsyncClient:
+            session = httpx.AsyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=limits,
+                                        http2=SUPABASE_HTTP2, verify=ssl_context, follow_redirects=True)
+            instrument_client(session)
+            if QUERY_TRACE != "off":
+                trace_client(session)
+            return session
+
+        class PooledPostgrestClient(AsyncPostgrestClient):
+            def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+                return pooled(base_url, headers, timeout)
+
+        class PooledStorageClient(AsyncStorageClient):
+            def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+                return pooled(base_url, headers, timeout)
+
+        # supabase 2.15 не принимает готовый httpx-клиент в ClientOptions, поэтому
+        # переопределяются фабрики, через которые свойства postgrest и storage
+        # создают (и после событий auth пересоздают) свои клиенты
+        class PooledClient(AsyncClient):
+            @staticmethod
+            def _init_postgrest_client(rest_url, headers, schema, timeout=SUPABASE_TIMEOUT, verify=True,
+                                       proxy=None):
+                return PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+            @staticmethod
+            def _init_storage_client(storage_url, headers, storage_client_timeout=SUPABASE_STORAGE_TIMEOUT,
+                                     verify=True, proxy=None):
+                return PooledStorageClient(storage_url, headers, storage_client_timeout)
+
+        return PooledClient(self.url, self.key, AsyncClientOptions(
+            postgrest_client_timeout=SUPABASE_TIMEOUT, storage_client_timeout=SUPABASE_STORAGE_TIMEOUT))
+
+
+def _check_extension_points(client_class, postgrest_class, storage_class):
+    """Проверка при старте, что у supabase-py (зафиксирован в requirements.txt) есть переопределяемые фабрики.
+
+    Это внутренние методы библиотеки: если обновление их уберёт или переименует,
+    пул молча перестанет применяться, поэтому воркер лучше не запускать.
+    """
+    missing = [f"{cls.__name__}.{name}" for cls, name in (
+        (client_class, "_init_postgrest_client"),
+        (client_class, "_init_storage_client"),
+        (postgrest_class, "create_session"),
+        (storage_class, "_create_session"),
+    ) if not callable(getattr(cls, name, None))]
+    if missing:
+        from supabase import __version__
+        raise RuntimeError(f"supabase {__version__}: no {', '.join(missing)}; "
+                           f"update SupabaseClientManager._create for this version")
+
+
+class _LazyClient:
+    """supabase_client для роутеров: все обращения уходят к клиенту менеджера, созданному при первом из них"""
+    __slots__ = ("_manager",)
+
+    def __init__(self, manager: SupabaseClientManager):
+        self._manager = manager
+
+    def __getattr__(self, name: str):
+        return getattr(self._manager.client, name)
+
+
+supabase_manager = SupabaseClientManager(SUPABASE_URL, SUPABASE_KEY)
+supabase_client = _LazyClient(supabase_manager)
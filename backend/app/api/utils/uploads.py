@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from api.utils.supabase_client import supabase_client
+from config import IMAGE_MAX_BYTES, IMAGE_SIZES, IMAGE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Байт от начала файла, которых достаточно для sniff_image
+SNIFF_BYTES = 16
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png", "png"),
+    (b"GIF87a", "image/gif", "gif"),
+    (b"GIF89a", "image/gif", "gif"),
+)
+
+
+def sniff_image(head: bytes) -> tuple[str, str] | None:
+    """(content-type, расширение) по сигнатуре файла, None если это не поддерживаемое изображение"""
+    for signature, content_type, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", "webp"
+    return None
+
+
+def limit_upload_size(request: Request):
+    """Зависимость FastAPI: отклоняет запрос по Content-Length до чтения тела.
+
+    Работает только для маршрутов без File/Form-параметров: их тело FastAPI
+    разбирает целиком ещё до зависимостей. Такие маршруты читают тело сами
+    через receive_image, который сверяет размер с лимитом по мере чтения.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > IMAGE_MAX_BYTES + CHUNK_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large")
+
+
+# openapi_extra для маршрутов с receive_image: тело не описано параметрами, поэтому схема задаётся вручную
+IMAGE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}},
+        }}},
+    },
+}
+
+
+@dataclass
+class ReceivedImage:
+    path: str
+    content_type: str
+    extension: str
+    size: int
+
+    def discard(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File is too large")
+
+
+class _ImagePart:
+    """Колбэки MultipartParser: копит поле field в памяти, остальные части пропускает.
+
+    Колбэки синхронные и вызываются в цикле событий, поэтому в файл они не
+    пишут: накопленное за один parser.write() сбрасывает flush() в потоке.
+    """
+
+    def __init__(self, field: str, max_bytes: int):
+        self.field = field.encode()
+        self.max_bytes = max_bytes
+        self.image: ReceivedImage | None = None
+        self._target = None
+        self._head = b""
+        self._pending: list[bytes] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_field = False
+        self.done = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value_part,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def _part_begin(self):
+        self._header_name = self._header_value = self._disposition = b""
+        self._in_field = False
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _header_value_part(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_field = not self.done and options.get(b"name") == self.field
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if not self._in_field:
+            return
+        if self.image is None:
+            # Тип определяется, когда набралось достаточно байт для сигнатуры
+            self._head += data[start:end]
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+            return
+        self._take(data[start:end])
+
+    def _part_end(self):
+        if not self._in_field:
+            return
+        if self.image is None:
+            self._sniff()
+        self._in_field = False
+        self.done = True
+
+    def _sniff(self):
+        sniffed = sniff_image(self._head)
+        if sniffed is None:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                detail="Only JPEG, PNG, GIF and WebP images are allowed")
+        self.image = ReceivedImage("", *sniffed, 0)
+        head, self._head = self._head, b""
+        self._take(head)
+
+    def _take(self, data: bytes):
+        self.image.size += len(data)
+        if self.image.size > self.max_bytes:
+            raise _too_large()
+        self._pending.append(data)
+
+    async def flush(self):
+        """Дописывает накопленное во временный файл, а после конца поля закрывает его"""
+        if self._pending or (self.done and self._target is not None and not self._target.closed):
+            data, self._pending = b"".join(self._pending), []
+            await asyncio.to_thread(self._store, data)
+
+    def _store(self, data: bytes):
+        if self._target is None:
+            self._target = tempfile.NamedTemporaryFile(delete=False, suffix=f".{self.image.extension}")
+            self.image.path = self._target.name
+        self._target.write(data)
+        if self.done:
+            self._target.close()
+
+    def discard(self):
+        self._pending = []
+        if self._target is not None:
+            self._target.close()
+            self.image.discard()
+
+
+async def receive_image(request: Request, field: str = "file", max_bytes: int = IMAGE_MAX_BYTES) -> ReceivedImage:
+    """Разбирает multipart-тело из потока запроса и пишет поле field во временный файл.
+
+    Тело не буферизуется целиком: каждая порция после разбора уходит в файл
+    в потоке, так что в памяти не больше одной порции, а на диске одна копия. Лимит сверяется по мере чтения и с размером файла, и с числом
+    сырых байт тела. Тип определяется по первым байтам, а не по заголовку
+    клиента. Маршрут не должен объявлять File/Form-параметры, иначе FastAPI
+    прочитает тело раньше.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type"))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected multipart/form-data")
+
+    part = _ImagePart(field, max_bytes)
+    parser = MultipartParser(boundary, part.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + CHUNK_SIZE:
+                raise _too_large()
+            parser.write(chunk)
+            await part.flush()
+        parser.finalize()
+        await part.flush()
+    except MultipartParseError:
+        part.discard()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed multipart body")
+    except BaseException:
+        part.discard()
+        raise
+
+    if part.image is None or not part.done:
+        part.discard()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Field '{field}' is required")
+    return part.image
+
+
+def _resize(source: str, sizes: dict[str, int]) -> dict[str, str]:
+    """Выполняется в процессе пула: JPEG-копии, вписанные в квадрат каждого размера"""
+    from PIL import Image, ImageOps
+
+    variants = {}
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        try:
+            for name, side in sizes.items():
+                variant = image.copy()
+                variant.thumbnail((side, side))
+                variants[name] = f"{source}.{name}.jpg"
+                variant.save(variants[name], "JPEG", quality=85, optimize=True)
+        except BaseException:
+            for path in variants.values():
+                if os.path.exists(path):
+                    os.unlink(path)
+            raise
+    return variants
+
+
+class ImageProcessor:
+    """Сохранение загруженных изображений и фоновая нарезка размеров.
+
+    Оригинал загружается в хранилище сразу, а уменьшенные копии делаются в
+    пуле процессов уже после ответа; по готовности вызывается on_ready со
+    ссылками на все размеры.
+    """
+
+    def __init__(self, sizes: dict[str, int] = IMAGE_SIZES, workers: int = IMAGE_WORKERS):
+        self.sizes = sizes
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def store(self, image: ReceivedImage, bucket: str, path: str, save_original, on_ready) -> str:
+        """Загружает оригинал в path, записывает ссылку и ставит нарезку в очередь; возвращает ссылку.
+
+        save_original(url) должен сохранить ссылку на оригинал (со сброшенными
+        размерами) до запуска нарезки: on_ready пишет размеры только пока
+        ссылка не сменилась, и иначе быстрая нарезка затёрлась бы этой записью.
+        Копии сохраняются рядом: <path без расширения>_<размер>.jpg.
+        """
+        try:
+            url = await self._upload(image.path, image.content_type, bucket, path)
+        except BaseException:
+            image.discard()
+            raise
+        try:
+            await save_original(url)
+        except BaseException:
+            image.discard()
+            await self._remove(bucket, path)
+            raise
+
+        task = asyncio.create_task(self._make_variants(image, bucket, path, url, on_ready))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return url
+
+    async def drain(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _make_variants(self, image: ReceivedImage, bucket: str, path: str, original_url: str, on_ready):
+        variants = {}
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            loop = asyncio.get_running_loop()
+            variants = await loop.run_in_executor(self._pool, _resize, image.path, self.sizes)
+            urls = {"original": original_url}
+            for name, variant_path in variants.items():
+                urls[name] = await self._upload(variant_path, "image/jpeg", bucket,
+                                                f"{path.rsplit('.', 1)[0]}_{name}.jpg")
+            await on_ready(urls)
+        except Exception:
+            logger.exception("Failed to resize %s", path)
+        finally:
+            image.discard()
+            for variant_path in variants.values():
+                os.unlink(variant_path)
+
+    @staticmethod
+    async def _remove(bucket: str, path: str):
+        """Удаляет загруженный оригинал, на который не осталось ссылки; ошибку только логирует"""
+        try:
+            await supabase_client.storage.from_(bucket).remove([path])
+        except Exception:
+            logger.exception("Failed to remove orphaned %s", path)
+
+    @staticmethod
+    async def _upload(source: str, content_type: str, bucket: str, path: str) -> str:
+        storage = supabase_client.storage.from_(bucket)
+        with open(source, "rb") as file:
+            await storage.upload(path, file, {"content-type": content_type})
+        return await storage.get_public_url(path)
+
+
+image_processor = ImageProcessor()
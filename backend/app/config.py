@@ -5,6 +5,92 @@ load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# Пул httpx-соединений к Supabase (api/utils/supabase_client.py)
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", 100))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", 20))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", 30))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 30))
+SUPABASE_STORAGE_TIMEOUT = float(os.getenv("SUPABASE_STORAGE_TIMEOUT", 60))
+# Сколько соединений открыть при старте воркера; 0 — без прогрева
+SUPABASE_WARMUP_CONNECTIONS = int(os.getenv("SUPABASE_WARMUP_CONNECTIONS", 1))
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+FRIEND_GRAPH_MAX_USERS = int(os.getenv("FRIEND_GRAPH_MAX_USERS", 100_000))
+FRIEND_GRAPH_TTL_SECONDS = int(os.getenv("FRIEND_GRAPH_TTL_SECONDS", 300))
+
+PARTICIPATION_INDEX_MAX_USERS = int(os.getenv("PARTICIPATION_INDEX_MAX_USERS", 100_000))
+PARTICIPATION_INDEX_TTL_SECONDS = int(os.getenv("PARTICIPATION_INDEX_TTL_SECONDS", 300))
+
+GROUP_TIMELINE_MAX_GROUPS = int(os.getenv("GROUP_TIMELINE_MAX_GROUPS", 50_000))
+GROUP_TIMELINE_TTL_SECONDS = int(os.getenv("GROUP_TIMELINE_TTL_SECONDS", 300))
+
+# Материализованная домашняя лента (api/utils/home_feed.py)
+HOME_FEED_SIZE = int(os.getenv("HOME_FEED_SIZE", 300))
+HOME_FEED_MAX_USERS = int(os.getenv("HOME_FEED_MAX_USERS", 20_000))
+HOME_FEED_TTL_SECONDS = int(os.getenv("HOME_FEED_TTL_SECONDS", 600))
+# Больше стольких лент в памяти у источника — его мероприятия подмешиваются при чтении
+HOME_FEED_FANOUT_LIMIT = int(os.getenv("HOME_FEED_FANOUT_LIMIT", 500))
+
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", 200))
+RECOMMENDATIONS_CACHE_SIZE = int(os.getenv("RECOMMENDATIONS_CACHE_SIZE", 50_000))
+RECOMMENDATIONS_CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATIONS_CACHE_TTL_SECONDS", 120))
+RECOMMENDATIONS_REFRESH_SECONDS = int(os.getenv("RECOMMENDATIONS_REFRESH_SECONDS", 900))
+RECOMMENDATIONS_TIME_BOOST = float(os.getenv("RECOMMENDATIONS_TIME_BOOST", 1.0))
+RECOMMENDATIONS_TIME_DECAY_DAYS = float(os.getenv("RECOMMENDATIONS_TIME_DECAY_DAYS", 14))
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 20))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 100))
+# Сколько id принимают пакетные роуты /events/batch, /groups/batch, /user/profile/batch
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 100))
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 100_000))
+USER_EXISTS_CACHE_SIZE = int(os.getenv("USER_EXISTS_CACHE_SIZE", 100_000))
+USER_EXISTS_TTL_SECONDS = int(os.getenv("USER_EXISTS_TTL_SECONDS", 300))
+USER_MISSING_TTL_SECONDS = int(os.getenv("USER_MISSING_TTL_SECONDS", 30))
+
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", 2 ** 14))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", 8))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", 1))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", 0))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 256))
+
+LOOKUP_CACHE_TTL_SECONDS = int(os.getenv("LOOKUP_CACHE_TTL_SECONDS", 600))
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", 50_000))
+ENTITY_CACHE_TTL_SECONDS = int(os.getenv("ENTITY_CACHE_TTL_SECONDS", 60))
+
+SEARCH_MAX_EXPANSIONS = int(os.getenv("SEARCH_MAX_EXPANSIONS", 50))
+SEARCH_FACET_SCAN = int(os.getenv("SEARCH_FACET_SCAN", 20_000))
+SEARCH_REFRESH_SECONDS = int(os.getenv("SEARCH_REFRESH_SECONDS", 1800))
+SEARCH_LIMIT_MAX = int(os.getenv("SEARCH_LIMIT_MAX", 50))
+
+GROUP_ACCESS_CACHE_SIZE = int(os.getenv("GROUP_ACCESS_CACHE_SIZE", 100_000))
+GROUP_ACCESS_TTL_SECONDS = int(os.getenv("GROUP_ACCESS_TTL_SECONDS", 30))
+
+EVENT_INDEX_PRUNE_SECONDS = int(os.getenv("EVENT_INDEX_PRUNE_SECONDS", 60))
+EVENT_INDEX_REFRESH_SECONDS = int(os.getenv("EVENT_INDEX_REFRESH_SECONDS", 1800))
+
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+IMAGE_SIZES = {name: int(side) for name, side in (
+    item.split(":") for item in os.getenv("IMAGE_SIZES", "thumb:200,feed:1080").split(","))}
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 1))
+
+CHAT_BATCH_WINDOW_MS = float(os.getenv("CHAT_BATCH_WINDOW_MS", 5))
+CHAT_BATCH_MAX = int(os.getenv("CHAT_BATCH_MAX", 500))
+CHAT_SEND_QUEUE = int(os.getenv("CHAT_SEND_QUEUE", 256))
+CHAT_AUTH_TIMEOUT_SECONDS = float(os.getenv("CHAT_AUTH_TIMEOUT_SECONDS", 10))
+
+NOTIFY_BUFFER_SIZE = int(os.getenv("NOTIFY_BUFFER_SIZE", 100))
+NOTIFY_MAX_USERS = int(os.getenv("NOTIFY_MAX_USERS", 100_000))
+NOTIFY_HEARTBEAT_SECONDS = float(os.getenv("NOTIFY_HEARTBEAT_SECONDS", 15))
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 256))
+STREAM_TICKET_TTL_SECONDS = float(os.getenv("STREAM_TICKET_TTL_SECONDS", 30))
+STREAM_TICKET_MAX = int(os.getenv("STREAM_TICKET_MAX", 100_000))
+
+# off | log | header | strict (см. api/utils/query_trace.py)
+QUERY_TRACE = os.getenv("QUERY_TRACE", "off")
+QUERY_TRACE_BUDGET = int(os.getenv("QUERY_TRACE_BUDGET", 10))
+QUERY_TRACE_REPEAT = int(os.getenv("QUERY_TRACE_REPEAT", 3))
@@ -1,14 +1,53 @@
-from fastapi import FastAPI
+import time
+
+# Отсчёт времени от импорта до готовности воркера (/stats/startup)
+_IMPORT_STARTED = time.perf_counter()
+
+import logging
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from api.authentication_and_profile.register import register_router
+from api.chats.chats import chats_router
 from api.authentication_and_profile.login import login_router
 from api.authentication_and_profile.profile import profile_router
 from api.friends.friends import friends_router
 from api.global_search.search import search_router
 from api.events.events import events_router
+from api.notifications.notifications import notifications_router
 from api.groups.groups import groups_router
+from api.utils.auth_cache import token_cache, user_exists_cache
+from api.utils.chat_hub import chat_hub
+from api.utils.group_access import group_access_cache
+from api.utils.home_feed import home_feed
+from api.utils.http_cache import entity_cache
+from api.utils.metrics import MetricsMiddleware, metrics
+from api.utils.query_trace import QueryTraceMiddleware
+from config import QUERY_TRACE
+from api.utils.notifications import notification_broker
+from api.utils.passwords import password_hasher
+from api.utils.supabase_client import supabase_manager
+from api.utils.uploads import image_processor
+
+logger = logging.getLogger("uvicorn.error")
+startup = {"import_ms": round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)}
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Клиент Supabase и пулы процессов живут вместе с приложением"""
+    await supabase_manager.start()
+    startup.update(supabase_manager.timings, ready_ms=round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1))
+    logger.info("worker ready: %s", startup)
+    yield
+    await image_processor.drain()
+    image_processor.shutdown()
+    password_hasher.shutdown()
+    await supabase_manager.aclose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +56,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if QUERY_TRACE != "off":
+    app.add_middleware(QueryTraceMiddleware)
 
 app.include_router(register_router)
 app.include_router(login_router)
@@ -25,7 +67,59 @@ app.include_router(friends_router)
 app.include_router(search_router)
 app.include_router(events_router)
 app.include_router(groups_router)
+app.include_router(chats_router)
+app.include_router(notifications_router)
+
+
+@app.get("/stats/auth", tags=["stats"])
+async def auth_cache_stats():
+    """Счётчики попаданий кэшей аутентификации"""
+    return {"tokens": token_cache.stats(), "users": user_exists_cache.stats()}
+
+
+@app.get("/stats/cache", tags=["stats"])
+async def entity_cache_stats():
+    """Счётчики попаданий кэша сущностей"""
+    return entity_cache.stats()
+
+
+@app.get("/stats/groups", tags=["stats"])
+async def group_access_stats():
+    """Счётчики попаданий кэша доступа к группам"""
+    return group_access_cache.stats()
+
+
+@app.get("/stats/feed", tags=["stats"])
+async def home_feed_stats():
+    """Ленты в памяти, доставки fan-out и популярные источники"""
+    return home_feed.stats()
+
+
+@app.get("/stats/chat", tags=["stats"])
+async def chat_stats():
+    """Подключения и пачки сообщений чата в этом процессе"""
+    return chat_hub.stats()
+
+
+@app.get("/stats/notifications", tags=["stats"])
+async def notification_stats():
+    """Открытые SSE-потоки и число опубликованных уведомлений"""
+    return notification_broker.stats()
+
+
+@app.get("/stats/startup", tags=["stats"])
+async def startup_stats():
+    """Время импорта и готовности воркера (мс от начала импорта main)"""
+    return startup
+
+
+@app.get("/metrics", tags=["stats"], include_in_schema=False)
+async def prometheus_metrics():
+    """Метрики роутов и обращений к Supabase в текстовом формате Prometheus"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Сжатие кадров WebSocket стоит ~90KB памяти на соединение и CPU на каждую копию рассылки
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=False)
@@ -0,0 +1,168 @@
+"""Нагрузочный тест чата: много WebSocket-соединений к одному воркеру.
+
+Сервер (uvicorn, один процесс) запускается отдельным процессом с заглушкой
+Supabase: пользователь u состоит в комнате u // --room-size. Клиент открывает
+--sockets соединений, затем --senders случайных пользователей шлют сообщения
+с заданной общей частотой. Печатается время подключения, память сервера на
+соединение, задержка доставки p50/p95/p99 (от отправки до получения каждым
+участником комнаты) и число пачек вставки.
+
+Запуск из каталога backend:
+    python benchmarks/bench_chat.py --sockets 10000 --room-size 100 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+
+def raise_fd_limit():
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(port: int, room_size: int, latency: float):
+    import uvicorn
+    from main import app
+    from api.utils.supabase_client import supabase_client
+    from stand_in import attach_stand_in, create_stand_in
+
+    async def user_chats(request):
+        user_id = (await request.json())["p_user_id"]
+        return [{"id": user_id // room_size, "title": None, "event_id": None, "group_id": None,
+                 "created_by": None}]
+
+    raise_fd_limit()
+    attach_stand_in(supabase_client, create_stand_in(latency, handlers={"user_chats": user_chats}))
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096,
+                ws_per_message_deflate=False)
+
+
+def server_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def run(args, server: subprocess.Popen):
+    import httpx
+    from websockets.asyncio.client import connect
+    from api.utils.functions import create_access_token
+
+    url = f"ws://127.0.0.1:{args.port}/chats/ws"
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as http:
+        for _ in range(100):
+            try:
+                await http.get("/stats/chat")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        idle_rss = server_rss_mb(server.pid)
+
+        sockets = {}
+        gate = asyncio.Semaphore(args.connect_concurrency)
+
+        async def open_socket(user_id: int):
+            async with gate:
+                websocket = await connect(url, max_queue=None, ping_interval=None)
+                await websocket.send(json.dumps({"type": "auth", "token": create_access_token({"sub": str(user_id)})}))
+                await websocket.recv()
+                sockets[user_id] = websocket
+
+        started = time.perf_counter()
+        await asyncio.gather(*(open_socket(user_id) for user_id in range(args.sockets)))
+        connect_time = time.perf_counter() - started
+        await asyncio.sleep(1)
+        connected_rss = server_rss_mb(server.pid)
+        print(f"sockets={len(sockets)} connect={connect_time:.1f}s "
+              f"server rss {idle_rss:.0f}MB -> {connected_rss:.0f}MB "
+              f"({(connected_rss - idle_rss) * 1024 / len(sockets):.1f}KB per socket)")
+
+        latencies = []
+        received = 0
+
+        async def reader(websocket):
+            nonlocal received
+            async for raw in websocket:
+                frame = json.loads(raw)
+                if frame["type"] != "messages":
+                    continue
+                now = time.time()
+                for message in frame["messages"]:
+                    latencies.append((now - float(message["body"])) * 1000)
+                    received += 1
+
+        readers = [asyncio.create_task(reader(websocket)) for websocket in sockets.values()]
+        senders = random.sample(sorted(sockets), args.senders)
+        sent = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.duration:
+            user_id = random.choice(senders)
+            await sockets[user_id].send(json.dumps({"type": "send", "chat_id": user_id // args.room_size,
+                                                    "body": repr(time.time())}))
+            sent += 1
+            await asyncio.sleep(1 / args.rate)
+        await asyncio.sleep(2)
+
+        stats = (await http.get("/stats/chat")).json()
+        expected = sent * min(args.room_size, args.sockets)
+        print(f"sent={sent} delivered={received}/{expected} batches={stats['batches']} "
+              f"({stats['messages'] / max(stats['batches'], 1):.1f} messages per insert)")
+        if len(latencies) > 1:
+            print(f"delivery: p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+                  f"p99={percentile(latencies, 99):.1f}ms max={max(latencies):.1f}ms")
+
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*(websocket.close() for websocket in sockets.values()), return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--room-size", type=int, default=100)
+    parser.add_argument("--senders", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=200, help="сообщений в секунду суммарно")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка заглушки Supabase, с")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.room_size, args.latency)
+        return
+
+    raise_fd_limit()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+                               "--room-size", str(args.room_size), "--latency", str(args.latency)])
+    try:
+        asyncio.run(run(args, server))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
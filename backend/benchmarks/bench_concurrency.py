@@ -0,0 +1,73 @@
+"""Пропускная способность роутеров при большом числе одновременных клиентов.
+
+Приложение и заглушка Supabase (benchmarks/stand_in.py) вызываются in-process
+через ASGI; заглушка отвечает с задержкой --latency.
+Для сравнения печатается потолок старой схемы: синхронные обработчики
+упирались в пул потоков Starlette (40 потоков), т.е. не больше 40 / latency rps.
+
+Запуск из каталога backend:
+    python benchmarks/bench_concurrency.py --clients 500 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+THREADPOOL_SIZE = 40
+
+
+async def run(clients: int, total: int, path: str, latency: float):
+    import httpx
+    from main import app
+    from api.utils.functions import create_access_token
+    from api.utils.supabase_client import supabase_client
+    from stand_in import attach_stand_in, create_stand_in
+
+    attach_stand_in(supabase_client, create_stand_in(latency))
+
+    token = create_access_token({"sub": "1"})
+    headers = {"Authorization": f"Bearer {token}"}
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(path)
+    statuses = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                url = queue.get_nowait()
+                response = await client.get(url, headers=headers)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return elapsed, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.1, help="задержка заглушки, сек")
+    parser.add_argument("--path", default="/events/1")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+    elapsed, statuses = asyncio.run(run(args.clients, args.requests, args.path, args.latency))
+    print(f"clients={args.clients} requests={args.requests} latency={args.latency * 1000:.0f}ms")
+    print(f"elapsed={elapsed:.2f}s throughput={args.requests / elapsed:.0f} rps statuses={statuses}")
+    print(f"threadpool ceiling (sync handlers): {THREADPOOL_SIZE / args.latency:.0f} rps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Стоимость fan-out при записи и при чтении для домашней ленты.
+
+Данные засеваются как в bench_routes.py (заглушка Supabase в памяти, без
+задержки), плюс --popular пользователей с --popular-friends друзьями —
+длинный хвост распределения подписчиков. Для каждого --fanout-limits
+материализуются ленты --resident пользователей, затем выполняются --writes
+записей на мероприятия (участник -> ленты его друзей) от случайных
+пользователей, в том числе популярных, и --reads чтений первой страницы.
+
+Печатается время записи и чтения (мкс, p50/p99, только работа в памяти:
+запрос строк страницы одинаков при любом лимите), число доставок в ленты на
+запись и число популярных источников. fanout_limit=0 — чистый
+fan-out-on-read, inf — чистый fan-out-on-write.
+
+Запуск из каталога backend:
+    python benchmarks/bench_home_feed.py --fanout-limits 0,50,500,inf
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+def distribution(values: list[int]) -> str:
+    values = sorted(values)
+    return f"p50={values[len(values) // 2]} p99={values[int(len(values) * 0.99)]} max={values[-1]}"
+
+
+async def run(args):
+    from api.utils.friend_graph import friend_graph
+    from api.utils.functions import now_iso
+    from api.utils.home_feed import HomeFeed
+    from api.utils.participation_index import participation_index
+    from api.utils.supabase_client import supabase_client
+    from memory_supabase import MemorySupabase, seed
+    from stand_in import attach_stand_in
+
+    rng = random.Random(0)
+    store = MemorySupabase(0)
+    seed(store, users=args.users, events=args.events, groups=args.groups)
+    popular = rng.sample(range(1, args.users + 1), args.popular)
+    for user_id in popular:
+        existing = {row["recipient_id"] for row in store.table("friends").rows.values() if row["sender_id"] == user_id}
+        for friend_id in rng.sample(range(1, args.users + 1), min(args.popular_friends, args.users - 1)):
+            if friend_id != user_id and friend_id not in existing:
+                store.insert("friends", {"sender_id": user_id, "recipient_id": friend_id, "status": True})
+    attach_stand_in(supabase_client, store.app())
+    await friend_graph.rebuild()
+
+    counts = [len(await friend_graph.friends(user_id)) for user_id in range(1, args.users + 1)]
+    print(f"friends per user: {distribution(counts)}; popular users: {args.popular}")
+
+    threshold = now_iso()
+    upcoming = [row for row in store.table("events").rows.values() if row["end_timestamptz"] > threshold]
+    residents = rng.sample(range(1, args.users + 1), min(args.resident, args.users))
+    # Каждая десятая запись — от популярного пользователя
+    actors = [rng.choice(popular) if popular and i % 10 == 0 else rng.randint(1, args.users)
+              for i in range(args.writes)]
+    writes = []
+    for actor in actors:
+        event = rng.choice(upcoming)
+        while actor in event["participants"]:
+            event = rng.choice(upcoming)
+        writes.append((actor, event))
+    readers = [rng.choice(residents) for _ in range(args.reads)]
+
+    # Прогрев общих индексов (друзья, участие, ленты групп, рекомендации), чтобы сборка сравнивалась честно
+    warm_up = HomeFeed(size=args.size, max_users=args.resident)
+    for user_id in residents:
+        await warm_up.page(user_id, 20)
+
+    print(f"{'fanout_limit':>12}{'build s':>9}{'write p50':>11}{'write p99':>11}{'deliv/write':>13}"
+          f"{'read p50':>10}{'read p99':>10}{'hot':>6}")
+    for limit in args.fanout_limits:
+        feed = HomeFeed(size=args.size, max_users=args.resident, ttl=3600,
+                        fanout_limit=limit if limit != float("inf") else 10 ** 9)
+        started = time.perf_counter()
+        for user_id in residents:
+            await feed.page(user_id, 20)
+        build = time.perf_counter() - started
+
+        write_times = []
+        for actor, event in writes:
+            started = time.perf_counter()
+            participation_index.add(actor, event["id"], event["start_timestamptz"], event["end_timestamptz"])
+            feed.participant_added(event["id"], actor, event["start_timestamptz"], event["end_timestamptz"])
+            write_times.append((time.perf_counter() - started) * 1e6)
+
+        read_times = []
+        for user_id in readers:
+            started = time.perf_counter()
+            await feed.page(user_id, 20)
+            read_times.append((time.perf_counter() - started) * 1e6)
+        for actor, event in writes:
+            participation_index.remove(actor, event["id"])
+
+        stats = feed.stats()
+        print(f"{'inf' if limit == float('inf') else int(limit):>12}{build:>9.2f}"
+              f"{percentile(write_times, 50):>11.1f}{percentile(write_times, 99):>11.1f}"
+              f"{stats['deliveries'] / len(writes):>13.1f}{percentile(read_times, 50):>10.1f}"
+              f"{percentile(read_times, 99):>10.1f}{stats['hot_users'] + stats['hot_groups']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--popular", type=int, default=20, help="пользователей с большим числом друзей")
+    parser.add_argument("--popular-friends", type=int, default=2000)
+    parser.add_argument("--resident", type=int, default=2000, help="лент в памяти")
+    parser.add_argument("--size", type=int, default=300, help="размер окна ленты")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--fanout-limits", type=lambda value: [float(level) for level in value.split(",")],
+                        default=[0, 50, 500, float("inf")], help="лимиты через запятую, inf — без лимита")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
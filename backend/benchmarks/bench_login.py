@@ -0,0 +1,98 @@
+"""Пропускная способность входа с хэшированием паролей в пуле процессов.
+
+Пока клиенты логинятся, отдельный зонд опрашивает лёгкий роут /user/profile/me
+и замеряет его задержку — она показывает, не голодают ли остальные роуты
+во время «шторма» логинов.
+
+Запуск из каталога backend:
+    python benchmarks/bench_login.py --clients 64 --logins 400 --workers 2 --n 16384
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "bench-password"
+
+
+async def run(clients: int, total: int, latency: float):
+    import httpx
+    from main import app
+    from api.utils.functions import create_access_token
+    from api.utils.passwords import password_hasher
+    from api.utils.supabase_client import supabase_client
+    from stand_in import attach_stand_in, create_stand_in
+
+    stored = await password_hasher.hash(PASSWORD)
+    attach_stand_in(supabase_client, create_stand_in(latency, {"email": "bench@example.com",
+                                                               "hashed_password": stored}))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': '1'})}"}
+    body = {"email": "bench@example.com", "password": PASSWORD}
+    statuses = {}
+    probe = []
+    remaining = total
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.post("/user/login", json=body)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def prober(stop: asyncio.Event):
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/user/profile/me", headers=headers)
+                probe.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(prober(stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await probe_task
+
+    password_hasher.shutdown()
+    return elapsed, statuses, probe
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.005, help="задержка заглушки, сек")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов в пуле")
+    parser.add_argument("--n", type=int, default=2 ** 14, help="параметр стоимости scrypt")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ["PASSWORD_SCRYPT_N"] = str(args.n)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_QUEUE"] = str(args.clients)
+
+    elapsed, statuses, probe = asyncio.run(run(args.clients, args.logins, args.latency))
+    rate = statuses.get(200, 0) / elapsed
+    probe_ms = sorted(value * 1000 for value in probe)
+    print(f"clients={args.clients} logins={args.logins} workers={args.workers} scrypt n={args.n}")
+    print(f"elapsed={elapsed:.2f}s throughput={rate:.1f} logins/s per core={rate / args.workers:.1f} "
+          f"statuses={statuses}")
+    if probe_ms:
+        print(f"probe /user/profile/me during storm: n={len(probe_ms)} "
+              f"p50={statistics.median(probe_ms):.1f}ms "
+              f"p99={probe_ms[min(len(probe_ms) - 1, int(len(probe_ms) * 0.99))]:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Построение индекса и выбор top-k рекомендаций на синтетических мероприятиях.
+
+Тэги распределены по Ципфу (несколько очень популярных и длинный хвост),
+у мероприятия 1-5 тэгов, начало равномерно в ближайший год. Печатается время
+построения индекса, задержки ранжирования p50/p95/p99 для случайных наборов
+тэгов пользователя и время ответа из кэша.
+
+Запуск из каталога backend:
+    python benchmarks/bench_recommendations.py --events 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+
+def synthetic_events(count: int, tags: list[str], weights: list[float], now: float):
+    for event_id in range(1, count + 1):
+        start = now + random.random() * 365 * 86400
+        yield {
+            "id": event_id,
+            "tags": random.choices(tags, weights, k=random.randint(1, 5)),
+            "start_timestamptz": _iso(start),
+            "end_timestamptz": _iso(start + 3 * 3600),
+        }
+
+
+def _iso(timestamp: float) -> str:
+    from datetime import datetime, timezone
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=300)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    from api.utils.recommendations import RecommendationEngine
+
+    random.seed(args.seed)
+    tags = [f"tag{i}" for i in range(args.tags)]
+    weights = [1 / (i + 1) for i in range(args.tags)]
+    now = time.time()
+
+    engine = RecommendationEngine(top_k=args.k)
+    started = time.perf_counter()
+    engine.load(synthetic_events(args.events, tags, weights, now))
+    print(f"events={args.events} tags={args.tags} build={time.perf_counter() - started:.1f}s")
+
+    latencies = []
+    for user_id in range(args.users):
+        user_tags = random.choices(tags, weights, k=random.randint(1, 6))
+        started = time.perf_counter()
+        engine.recommend(user_id, user_tags)
+        latencies.append((time.perf_counter() - started) * 1000)
+    print(f"rank k={args.k}: p50={percentile(latencies, 50):.2f}ms p95={percentile(latencies, 95):.2f}ms "
+          f"p99={percentile(latencies, 99):.2f}ms max={max(latencies):.2f}ms")
+
+    started = time.perf_counter()
+    for user_id in range(args.users):
+        engine.cached(user_id)
+    print(f"cached: {(time.perf_counter() - started) * 1e6 / args.users:.2f}us per user")
+
+
+if __name__ == "__main__":
+    main()
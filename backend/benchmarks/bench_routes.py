@@ -0,0 +1,243 @@
+"""Задержка и пропускная способность роутов на синтетических данных.
+
+Приложение вызывается in-process через ASGI, Supabase заменён заглушкой в
+памяти (benchmarks/memory_supabase.py) с засеянными пользователями, друзьями,
+мероприятиями и группами и задержкой --latency на каждое обращение. Для
+каждого роута и каждого уровня --concurrency выполняется --requests запросов
+со случайными id и пользователями; печатаются p50/p95/p99 и rps.
+
+--save сохраняет результаты в JSON, --compare сравнивает с сохранёнными:
+роут считается регрессией, если p95 вырос или rps упал больше, чем на
+--threshold, и тогда скрипт завершается с кодом 1.
+
+Запуск из каталога backend:
+    python benchmarks/bench_routes.py --save baseline.json
+    python benchmarks/bench_routes.py --compare baseline.json --routes events
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+PASSWORD = "bench-password"
+WORDS = ["концерт", "клуб", "Иван", "фестиваль", "Смирнов", "квиз", "прогулка", "Анна"]
+
+
+def batch_ids(rng: random.Random, count: int, size: int = 30) -> str:
+    return ",".join(str(item_id) for item_id in rng.sample(range(1, count + 1), min(size, count)))
+
+
+class Scenario:
+    """Роут и генератор запросов к нему: (rng, размеры данных) -> (путь, тело)"""
+
+    def __init__(self, name: str, build, method: str = "GET", accepted=(200,)):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.accepted = accepted
+
+
+SCENARIOS = [
+    Scenario("GET /events/{event_id}", lambda rng, size: (f"/events/{rng.randint(1, size.events)}", None)),
+    # Пакетные роуты: экран списка из 30 элементов одним запросом
+    Scenario("GET /events/batch", lambda rng, size: (f"/events/batch?ids={batch_ids(rng, size.events)}", None)),
+    Scenario("GET /events/events/{event_id}/participants",
+             lambda rng, size: (f"/events/events/{rng.randint(1, size.events)}/participants", None)),
+    Scenario("GET /events/search",
+             lambda rng, size: (f"/events/search?city={rng.choice(['Москва', 'Казань', 'Томск'])}"
+                                f"&tags={rng.choice(['music', 'sport', 'art'])}", None)),
+    Scenario("GET /events/filter?friends", lambda rng, size: ("/events/filter?filter_type=friends", None)),
+    Scenario("GET /events/filter?recommendations",
+             lambda rng, size: ("/events/filter?filter_type=recommendations", None)),
+    Scenario("GET /events/feed", lambda rng, size: ("/events/feed", None)),
+    Scenario("GET /events/filter?groups", lambda rng, size: ("/events/filter?filter_type=groups", None)),
+    Scenario("GET /events/group/{group_id}",
+             lambda rng, size: (f"/events/group/{rng.randint(1, size.groups)}", None)),
+    Scenario("GET /events/user/{target_id}/created",
+             lambda rng, size: (f"/events/user/{rng.randint(1, size.users)}/created", None)),
+    Scenario("GET /events/user/{target_id}/participants",
+             lambda rng, size: (f"/events/user/{rng.randint(1, size.users)}/participants", None)),
+    Scenario("GET /user/profile/me", lambda rng, size: ("/user/profile/me", None)),
+    Scenario("GET /user/profile/{user_id}",
+             lambda rng, size: (f"/user/profile/{rng.randint(1, size.users)}", None)),
+    Scenario("GET /user/profile/batch",
+             lambda rng, size: (f"/user/profile/batch?ids={batch_ids(rng, size.users)}", None)),
+    Scenario("GET /user/friends/requests", lambda rng, size: ("/user/friends/requests", None)),
+    Scenario("GET /user/friends/{target_id}",
+             lambda rng, size: (f"/user/friends/{rng.randint(1, size.users)}", None)),
+    Scenario("GET /search", lambda rng, size: (f"/search?query={rng.choice(WORDS)}", None)),
+    Scenario("GET /search/users/", lambda rng, size: (f"/search/users/?query={rng.choice(WORDS)[:3]}", None)),
+    Scenario("GET /groups/{group_id}", lambda rng, size: (f"/groups/{rng.randint(1, size.groups)}", None)),
+    Scenario("GET /groups/batch", lambda rng, size: (f"/groups/batch?ids={batch_ids(rng, size.groups)}", None)),
+    Scenario("GET /groups/{group_id}/members",
+             lambda rng, size: (f"/groups/{rng.randint(1, size.groups)}/members", None)),
+    Scenario("GET /groups/user/{target_user_id}",
+             lambda rng, size: (f"/groups/user/{rng.randint(1, size.users)}", None)),
+    Scenario("GET /chats", lambda rng, size: ("/chats", None)),
+    # Записи меняют данные, поэтому повторные попытки законно отвечают 409/400
+    Scenario("POST /events/{event_id}/participants",
+             lambda rng, size: (f"/events/{rng.randint(1, size.events)}/participants", None),
+             method="POST", accepted=(200, 409)),
+    Scenario("POST /user/friends/requests/{target_id}",
+             lambda rng, size: (f"/user/friends/requests/{rng.randint(1, size.users)}", None),
+             method="POST", accepted=(200, 400)),
+    Scenario("POST /groups/{group_id}/join",
+             lambda rng, size: (f"/groups/{rng.randint(1, size.groups)}/join", None),
+             method="POST", accepted=(200, 400)),
+    Scenario("POST /user/login",
+             lambda rng, size: ("/user/login", {"email": f"user{rng.randint(1, size.users)}@example.com",
+                                                "password": PASSWORD}),
+             method="POST"),
+]
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def measure(client, scenario: Scenario, args, tokens: list[str], concurrency: int) -> dict:
+    rng = random.Random(f"{scenario.name}:{concurrency}")
+    requests = [(scenario.build(rng, args), rng.choice(tokens)) for _ in range(args.requests)]
+    latencies = []
+    statuses = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while requests:
+            (path, body), token = requests.pop()
+            started = time.perf_counter()
+            response = await client.request(scenario.method, path, json=body,
+                                            headers={"Authorization": f"Bearer {token}"})
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code not in scenario.accepted:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50": round(percentile(latencies, 50), 2),
+        "p95": round(percentile(latencies, 95), 2),
+        "p99": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+    from api.utils.functions import create_access_token
+    from api.utils.passwords import password_hasher
+    from api.utils.supabase_client import supabase_client
+    from memory_supabase import MemorySupabase, seed
+    from stand_in import attach_stand_in
+
+    started = time.perf_counter()
+    store = MemorySupabase(args.latency, args.jitter)
+    seed(store, users=args.users, events=args.events, groups=args.groups,
+         hashed_password=await password_hasher.hash(PASSWORD))
+    attach_stand_in(supabase_client, store.app())
+    print(f"seeded {', '.join(f'{name}={len(table.rows)}' for name, table in store.tables.items())} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    rng = random.Random(0)
+    tokens = [create_access_token({"sub": str(user_id)})
+              for user_id in rng.sample(range(1, args.users + 1), min(args.users, 500))]
+    scenarios = [scenario for scenario in SCENARIOS
+                 if not args.routes or any(part in scenario.name for part in args.routes)]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'route':<48}{'conc':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}  errors")
+        for scenario in scenarios:
+            # Первый запрос прогревает индексы и кэши роута и не учитывается
+            path, body = scenario.build(rng, args)
+            await client.request(scenario.method, path, json=body, headers={"Authorization": f"Bearer {tokens[0]}"})
+            for concurrency in args.concurrency:
+                result = await measure(client, scenario, args, tokens, concurrency)
+                results.setdefault(scenario.name, {})[str(concurrency)] = result
+                print(f"{scenario.name:<48}{concurrency:>6}{result['rps']:>9.1f}{result['p50']:>9.1f}"
+                      f"{result['p95']:>9.1f}{result['p99']:>9.1f}  "
+                      f"{result['errors'] or ''}{' ' + str(result['statuses']) if result['errors'] else ''}")
+    password_hasher.shutdown()
+    return {
+        "settings": {"users": args.users, "events": args.events, "groups": args.groups, "latency": args.latency,
+                     "jitter": args.jitter, "requests": args.requests, "concurrency": args.concurrency},
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Строки отчёта о регрессиях p95 и rps относительно baseline"""
+    if baseline.get("settings") != current["settings"]:
+        print(f"warning: settings differ from baseline: {baseline.get('settings')}")
+    regressions = []
+    print(f"\n{'route':<48}{'conc':>6}{'p95 base':>10}{'p95 now':>10}{'rps base':>10}{'rps now':>10}")
+    for route, levels in current["results"].items():
+        for concurrency, result in levels.items():
+            base = baseline["results"].get(route, {}).get(concurrency)
+            if base is None:
+                continue
+            slower = result["p95"] > base["p95"] * (1 + threshold)
+            fewer = result["rps"] < base["rps"] * (1 - threshold)
+            mark = "  REGRESSION" if slower or fewer else ""
+            print(f"{route:<48}{concurrency:>6}{base['p95']:>10.1f}{result['p95']:>10.1f}"
+                  f"{base['rps']:>10.1f}{result['rps']:>10.1f}{mark}")
+            if mark:
+                regressions.append(f"{route} @{concurrency}: p95 {base['p95']} -> {result['p95']} ms, "
+                                   f"rps {base['rps']} -> {result['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.005, help="задержка заглушки Supabase, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, до, с")
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32, 128], help="уровни через запятую")
+    parser.add_argument("--requests", type=int, default=200, help="запросов на роут и уровень")
+    parser.add_argument("--routes", nargs="*", help="только роуты, содержащие эти подстроки")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", help="сравнить с результатами из JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля")
+    args = parser.parse_args()
+
+    current = asyncio.run(run(args))
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(current, output, ensure_ascii=False, indent=2)
+        print(f"saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as source:
+            regressions = compare(json.load(source), current, args.threshold)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Построение поискового индекса и задержки запросов на синтетических документах.
+
+Словарь из --vocab псевдослов с частотами по Ципфу; документы делятся между
+пользователями (имя и фамилия), группами (название и описание) и мероприятиями
+(название, тэги и описание). Запросы — целые слова, префиксы 2-5 букв,
+подстроки и пары слов. Печатается время построения, пиковая память процесса,
+задержки p50/p95/p99 по видам запросов и стоимость инкрементального обновления.
+
+Запуск из каталога backend:
+    python benchmarks/bench_search.py --documents 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+LETTERS = "абвгдежзиклмнопрстуфхцчшэюяabcdefghiklmnoprstuvz"
+
+
+def make_vocabulary(size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(LETTERS, k=random.randint(3, 10))))
+    return list(words)
+
+
+def synthetic_documents(count: int, words: list[str], cum_weights: list[float], names: list[str]):
+    from api.utils.search_index import event_fields, group_fields, user_fields
+
+    def text(k: int) -> str:
+        return " ".join(random.choices(words, cum_weights=cum_weights, k=k))
+
+    for doc_id in range(count):
+        kind = random.random()
+        if kind < 0.4:
+            yield "users", doc_id, user_fields({"first_name": random.choice(names),
+                                                "last_name": random.choice(names)})
+        elif kind < 0.5:
+            yield "groups", doc_id, group_fields({"name": text(random.randint(1, 3)),
+                                                  "description": text(10)})
+        else:
+            yield "events", doc_id, event_fields({"title": text(random.randint(2, 5)),
+                                                  "tags": random.choices(words[:300], k=2),
+                                                  "description": text(15)})
+
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--vocab", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+    os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    from api.utils.search_index import SearchIndex
+
+    random.seed(args.seed)
+    words = make_vocabulary(args.vocab)
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(words))))
+    names = words[:5000]
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.load(synthetic_documents(args.documents, words, cum_weights, names))
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"documents={len(index)} vocab={args.vocab} build={time.perf_counter() - started:.1f}s "
+          f"peak rss={peak_mb:.0f}MB")
+
+    def sample_word() -> str:
+        return random.choices(words, cum_weights=cum_weights)[0]
+
+    kinds = {
+        "word": sample_word,
+        "prefix": lambda: sample_word()[:random.randint(2, 5)],
+        "infix": lambda: (lambda word: word[1:4] if len(word) > 4 else word)(sample_word()),
+        "two words": lambda: f"{sample_word()} {sample_word()[:4]}",
+    }
+    for name, make_query in kinds.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = make_query()
+            started = time.perf_counter()
+            index.search(query, args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+        print(f"{name:>9}: p50={percentile(latencies, 50):.2f}ms p95={percentile(latencies, 95):.2f}ms "
+              f"p99={percentile(latencies, 99):.2f}ms max={max(latencies):.2f}ms")
+
+    started = time.perf_counter()
+    for doc_id in range(1000):
+        index.upsert("events", {"id": doc_id, "title": f"{sample_word()} {sample_word()}",
+                                "tags": [sample_word()], "description": sample_word()})
+    print(f"upsert: {(time.perf_counter() - started) * 1000:.3f}us per document")
+
+
+if __name__ == "__main__":
+    main()
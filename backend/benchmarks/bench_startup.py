@@ -0,0 +1,96 @@
+"""Время от запуска воркера до готовности.
+
+Несколько раз подряд запускает `uvicorn main:app` отдельным процессом и
+опрашивает /stats/startup. Печатает время от запуска процесса до первого
+ответа и то, что воркер посчитал сам: импорт main, создание клиента
+Supabase, прогрев соединений, готовность (от начала импорта main).
+Supabase имитирует локальный HTTP-сервер с задержкой --latency на запрос,
+если не задан --supabase-url.
+
+Запуск из каталога backend:
+    python benchmarks/bench_startup.py --runs 5 --warmup-connections 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+
+
+def serve_supabase(latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_worker(args, url: str) -> tuple[float, dict]:
+    env = {**os.environ, "SUPABASE_URL": url, "SUPABASE_KEY": os.environ.get("SUPABASE_KEY", "bench.bench.bench"),
+           "SECRET_KEY": os.environ.get("SECRET_KEY", "bench"),
+           "SUPABASE_WARMUP_CONNECTIONS": str(args.warmup_connections)}
+    started = time.perf_counter()
+    worker = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+                               "--log-level", "warning"], cwd=APP_DIR, env=env)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{args.port}/stats/startup") as response:
+                    return time.perf_counter() - started, json.load(response)
+            except OSError:
+                if worker.poll() is not None:
+                    raise RuntimeError("worker exited")
+                time.sleep(0.005)
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup-connections", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка локальной заглушки Supabase, с")
+    parser.add_argument("--supabase-url", help="настоящий Supabase вместо локальной заглушки")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    url = args.supabase_url
+    if url is None:
+        server = serve_supabase(args.latency)
+        url = f"http://127.0.0.1:{server.server_port}"
+
+    walls, reports = [], []
+    for _ in range(args.runs):
+        wall, report = start_worker(args, url)
+        walls.append(wall * 1000)
+        reports.append(report)
+        print(f"spawn->ready {wall * 1000:.0f}ms  {report}")
+
+    print(f"\nmedian of {args.runs}: spawn->ready {statistics.median(walls):.0f}ms", end="")
+    for key in ("import_ms", "create_ms", "warmup_ms", "ready_ms"):
+        values = [report[key] for report in reports if key in report]
+        if values:
+            print(f", {key}={statistics.median(values):.0f}", end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,610 @@
+"""In-memory заглушка Supabase (PostgREST + storage) с синтетическими данными.
+
+В отличие от stand_in.py, который отвечает одной фиксированной строкой, здесь
+таблицы лежат в памяти и запросы роутеров выполняются по-настоящему: select
+с вложенными связями, фильтры eq/neq/gt/gte/lt/lte/in/cs/ov/like/ilike/is,
+or/and, order/limit/offset, single(), insert/update/delete/upsert, RPC-функции
+из sql/ и загрузка файлов в storage. Каждый ответ задерживается на latency
+(+ случайный jitter), чтобы имитировать round trip до Supabase.
+
+    store = MemorySupabase(latency=0.005)
+    seed(store, users=5000, events=10000, groups=500)
+    attach_stand_in(supabase_client, store.app())
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from stand_in import now_iso
+
+# Внешние ключи для вложенных select вида organizer:sponsor_id(...) и users(...)
+FOREIGN_KEYS = {
+    "events": {"sponsor_id": "users", "group_id": "groups"},
+    "groups": {"creator_id": "users"},
+    "group_members": {"user_id": "users", "group_id": "groups"},
+    "friends": {"sender_id": "users", "recipient_id": "users"},
+    "chat_members": {"chat_id": "chats", "user_id": "users"},
+    "chat_messages": {"chat_id": "chats", "sender_id": "users"},
+}
+
+# Колонки с одним индексом на значение; для массивов индексируется каждый элемент
+INDEXED = {
+    "users": ("email", "phone_number"),
+    "events": ("sponsor_id", "participants", "group_id"),
+    "friends": ("sender_id", "recipient_id"),
+    "groups": ("creator_id",),
+    "group_members": ("user_id", "group_id"),
+    "chats": ("event_id", "group_id"),
+    "chat_members": ("user_id", "chat_id"),
+    "chat_messages": ("chat_id",),
+}
+
+DEFAULTS = {
+    "events": {"participants": [], "participants_count": 0, "image": None, "image_sizes": None},
+    "users": {"avatar_url": None, "avatar_sizes": None, "tags": None, "city": None, "bio": None,
+              "friends_count": 0, "events_created_count": 0, "events_attending_count": 0, "groups_count": 0},
+    "groups": {"avatar_url": None, "tags": None, "description": None},
+}
+
+
+def _split(text: str) -> list[str]:
+    """Разбивает по запятым верхнего уровня, не заходя в скобки"""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _coerce(value: str, sample):
+    """Строка фильтра в тип значения колонки"""
+    if value == "null":
+        return None
+    if isinstance(sample, bool):
+        return value.lower() in ("true", "t", "1")
+    if isinstance(sample, int):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(sample, float):
+        return float(value)
+    return value
+
+
+def _as_set(values: str, sample_list) -> set:
+    sample = sample_list[0] if sample_list else 0
+    return {_coerce(item.strip().strip('"'), sample) for item in values.strip("{}()").split(",") if item.strip()}
+
+
+def _like(pattern: str, flags=0):
+    regex = "".join(".*" if char in "%*" else re.escape(char) for char in pattern)
+    return re.compile(f"^{regex}$", flags | re.DOTALL)
+
+
+class _Filter:
+    """Условие PostgREST: колонка, оператор, значение; или вложенные and/or"""
+
+    def __init__(self, column=None, operator=None, value=None, negate=False, children=None, conjunction=None):
+        self.column = column
+        self.operator = operator
+        self.value = value
+        self.negate = negate
+        self.children = children
+        self.conjunction = conjunction
+        if operator in ("like", "ilike"):
+            self.pattern = _like(value, re.IGNORECASE if operator == "ilike" else 0)
+
+    @classmethod
+    def parse_param(cls, key: str, value: str) -> "_Filter":
+        if key in ("or", "and"):
+            return cls(children=[cls.parse_condition(part) for part in _split(value[1:-1])], conjunction=key)
+        negate = value.startswith("not.")
+        if negate:
+            value = value[4:]
+        operator, _, operand = value.partition(".")
+        return cls(key, operator, operand, negate)
+
+    @classmethod
+    def parse_condition(cls, text: str) -> "_Filter":
+        for conjunction in ("and", "or"):
+            if text.startswith(conjunction + "("):
+                return cls(children=[cls.parse_condition(part) for part in _split(text[len(conjunction) + 1:-1])],
+                           conjunction=conjunction)
+        column, _, rest = text.partition(".")
+        return cls.parse_param(column, rest)
+
+    def matches(self, row: dict) -> bool:
+        if self.children is not None:
+            results = (child.matches(row) for child in self.children)
+            return all(results) if self.conjunction == "and" else any(results)
+        return self._test(row.get(self.column)) != self.negate
+
+    def _test(self, actual) -> bool:
+        operator, value = self.operator, self.value
+        if operator == "is":
+            return actual is None if value == "null" else actual is _coerce(value, True)
+        if operator == "in":
+            return actual in _as_set(value, [actual])
+        if operator in ("cs", "cd", "ov"):
+            if actual is None:
+                return False
+            wanted = _as_set(value, actual)
+            present = set(actual)
+            return wanted <= present if operator == "cs" else (
+                present <= wanted if operator == "cd" else bool(present & wanted))
+        if operator in ("like", "ilike"):
+            return actual is not None and bool(self.pattern.match(str(actual)))
+        if actual is None:
+            return False
+        expected = _coerce(value, actual)
+        if operator == "eq":
+            return actual == expected
+        if operator == "neq":
+            return actual != expected
+        try:
+            return {"gt": actual > expected, "gte": actual >= expected,
+                    "lt": actual < expected, "lte": actual <= expected}[operator]
+        except TypeError:
+            return False
+
+    def candidates(self, table: "_Table"):
+        """id строк-кандидатов по индексу или None, если условие требует полного просмотра"""
+        if self.negate:
+            return None
+        if self.children is not None:
+            found = [child.candidates(table) for child in self.children]
+            if self.conjunction == "or":
+                return None if any(ids is None for ids in found) else set().union(*found)
+            found = [ids for ids in found if ids is not None]
+            return set.intersection(*found) if found else None
+        if self.column == "id" and self.operator in ("eq", "in"):
+            values = [self.value] if self.operator == "eq" else _split(self.value[1:-1])
+            return {_coerce(item.strip('"'), 0) for item in values}
+        index = table.indexes.get(self.column)
+        if index is None:
+            return None
+        if self.operator == "eq":
+            return index.get(_coerce(self.value, table.sample(self.column)), set())
+        if self.operator == "in":
+            ids = set()
+            for value in _split(self.value[1:-1]):
+                ids |= index.get(_coerce(value.strip('"'), table.sample(self.column)), set())
+            return ids
+        if self.operator in ("cs", "ov"):
+            sets = [index.get(value, set()) for value in _as_set(self.value, [table.sample(self.column, 0)])]
+            if not sets:
+                return None
+            return set.intersection(*sets) if self.operator == "cs" else set.union(*sets)
+        return None
+
+
+class _Table:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: dict[int, dict] = {}
+        self.ids = itertools.count(1)
+        self.indexes: dict[str, dict] = {column: {} for column in INDEXED.get(name, ())}
+
+    def sample(self, column: str, default=0):
+        """Пример значения колонки (для приведения типов фильтров)"""
+        for row in self.rows.values():
+            value = row.get(column)
+            if value is not None:
+                return value[0] if isinstance(value, list) and value else value
+        return default
+
+    def insert(self, row: dict) -> dict:
+        row = {**DEFAULTS.get(self.name, {}), **row}
+        if row.get("id") is None:
+            row["id"] = next(self.ids)
+        else:
+            self.ids = itertools.count(max(row["id"] + 1, next(self.ids)))
+        row.setdefault("created_at", now_iso())
+        self.rows[row["id"]] = row
+        self._index(row, add=True)
+        return row
+
+    def update(self, row: dict, changes: dict):
+        self._index(row, add=False)
+        row.update(changes)
+        self._index(row, add=True)
+
+    def delete(self, row: dict):
+        self._index(row, add=False)
+        del self.rows[row["id"]]
+
+    def _index(self, row: dict, add: bool):
+        for column, index in self.indexes.items():
+            value = row.get(column)
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                if add:
+                    index.setdefault(item, set()).add(row["id"])
+                else:
+                    ids = index.get(item)
+                    if ids is not None:
+                        ids.discard(row["id"])
+
+
+class MemorySupabase:
+    """Таблицы и функции Supabase в памяти процесса; app() — ASGI-приложение для attach_stand_in"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.tables: dict[str, _Table] = {}
+        self.storage: dict[str, int] = {}
+        self.requests = 0
+        self.functions = {
+            "join_event": self._join_event,
+            "leave_event": self._leave_event,
+            "event_participants": self._event_participants,
+            "user_chats": self._user_chats,
+            "profile_view": self._profile_view,
+        }
+
+    def table(self, name: str) -> _Table:
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = _Table(name)
+        return table
+
+    def insert(self, name: str, row: dict) -> dict:
+        row = self.table(name).insert(row)
+        # Триггеры из sql/003_chats.sql
+        if name == "events":
+            self.table("chats").insert({"event_id": row["id"], "created_by": row.get("sponsor_id")})
+        elif name == "groups":
+            self.table("chats").insert({"group_id": row["id"], "created_by": row.get("creator_id")})
+        self._count(name, None, row)
+        return row
+
+    def update(self, name: str, row: dict, changes: dict):
+        old = dict(row)
+        self.table(name).update(row, changes)
+        self._count(name, old, row)
+
+    def delete(self, name: str, row: dict):
+        self.table(name).delete(row)
+        self._count(name, row, None)
+        if name == "groups":
+            # on delete set null из sql/006_group_events.sql
+            for event in self._find(self.table("events"), [_Filter("group_id", "eq", str(row["id"]))]):
+                self.table("events").update(event, {"group_id": None})
+
+    def _count(self, name: str, old: dict | None, new: dict | None):
+        """Счётчики профиля, как триггеры из sql/005_profile_counters.sql"""
+        users = self.table("users").rows
+
+        def bump(user_ids, column: str, delta: int):
+            for user_id in user_ids:
+                if user_id in users:
+                    users[user_id][column] += delta
+
+        if name == "friends":
+            delta = bool(new and new.get("status")) - bool(old and old.get("status"))
+            row = new or old
+            bump({row["sender_id"], row["recipient_id"]}, "friends_count", delta)
+        elif name == "events":
+            if old is None or new is None:
+                delta = 1 if old is None else -1
+                row = new or old
+                bump([row["sponsor_id"]], "events_created_count", delta)
+                bump(set(row["participants"] or ()), "events_attending_count", delta)
+            else:
+                before, after = set(old["participants"] or ()), set(new["participants"] or ())
+                bump(after - before, "events_attending_count", 1)
+                bump(before - after, "events_attending_count", -1)
+        elif name == "group_members":
+            bump([(new or old)["user_id"]], "groups_count", 1 if old is None else -1)
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/rest/v1/rpc/{function}", self._rpc, methods=["GET", "POST"]),
+            Route("/rest/v1/{table}", self._rest, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/storage/v1/object/{path:path}", self._storage, methods=["POST", "PUT", "DELETE"]),
+        ])
+
+    async def _delay(self):
+        self.requests += 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def _rest(self, request: Request) -> Response:
+        await self._delay()
+        name = request.path_params["table"]
+        table = self.table(name)
+        params = request.query_params.multi_items()
+        filters = [_Filter.parse_param(key, value) for key, value in params
+                   if key not in ("select", "order", "limit", "offset", "on_conflict", "columns") and "." not in key]
+        # Фильтры встроенных таблиц: group_members.user_id=eq.1
+        embedded = {}
+        for key, value in params:
+            if "." in key:
+                relation, _, column = key.rpartition(".")
+                embedded.setdefault(relation, []).append(_Filter.parse_param(column, value))
+
+        if request.method == "POST":
+            body = json.loads(await request.body() or b"[]")
+            rows = body if isinstance(body, list) else [body]
+            upsert = "resolution=merge-duplicates" in request.headers.get("prefer", "")
+            result = []
+            for row in rows:
+                existing = table.rows.get(row.get("id")) if upsert else None
+                if existing is not None:
+                    self.update(name, existing, row)
+                    result.append(existing)
+                else:
+                    result.append(self.insert(name, dict(row)))
+            return self._respond(request, [dict(row) for row in result])
+
+        rows = self._find(table, filters)
+        if request.method == "PATCH":
+            changes = json.loads(await request.body() or b"{}")
+            for row in rows:
+                self.update(name, row, changes)
+            return self._respond(request, [dict(row) for row in rows])
+        if request.method == "DELETE":
+            for row in rows:
+                self.delete(name, row)
+            return self._respond(request, rows)
+
+        return self._respond(request, self._shape(name, rows, dict(params), embedded))
+
+    async def _rpc(self, request: Request) -> Response:
+        await self._delay()
+        function = self.functions.get(request.path_params["function"])
+        if function is None:
+            return JSONResponse({"message": "function not found"}, status_code=404)
+        arguments = json.loads(await request.body() or b"{}") if request.method == "POST" else dict(
+            request.query_params)
+        rows = function(**arguments)
+        params = request.query_params.multi_items()
+        filters = [_Filter.parse_param(key, value) for key, value in params
+                   if key not in ("select", "order", "limit", "offset")]
+        rows = [row for row in rows if all(condition.matches(row) for condition in filters)]
+        return self._respond(request, self._shape(None, rows, dict(params)))
+
+    async def _storage(self, request: Request) -> Response:
+        body = await request.body()
+        await self._delay()
+        if request.method == "DELETE":
+            # remove(paths): путь здесь — имя бакета, файлы в теле
+            bucket = request.path_params["path"]
+            keys = [f"{bucket}/{name}" for name in json.loads(body)["prefixes"]]
+            return JSONResponse([{"name": key} for key in keys if self.storage.pop(key, None) is not None])
+        self.storage[request.path_params["path"]] = len(body)
+        return JSONResponse({"Key": request.path_params["path"]})
+
+    @staticmethod
+    def _respond(request: Request, rows: list) -> Response:
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) "
+                                                                   "rows returned", "details": None, "hint": None},
+                                    status_code=406)
+            return JSONResponse(rows[0])
+        return JSONResponse(rows)
+
+    @staticmethod
+    def _find(table: _Table, filters: list[_Filter]) -> list[dict]:
+        candidates = None
+        for condition in filters:
+            ids = condition.candidates(table)
+            if ids is not None:
+                candidates = ids if candidates is None else candidates & ids
+        rows = table.rows.values() if candidates is None else (
+            table.rows[row_id] for row_id in candidates if row_id in table.rows)
+        return [row for row in rows if all(condition.matches(row) for condition in filters)]
+
+    def _shape(self, name: str | None, rows: list[dict], params: dict, embedded: dict | None = None) -> list[dict]:
+        """order, offset/limit и select (со встраиванием связанных строк)"""
+        if "order" in params:
+            for term in reversed(params["order"].split(",")):
+                column, _, direction = term.partition(".")
+                rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)),
+                              reverse=direction.startswith("desc"))
+        offset = int(params.get("offset", 0))
+        if "limit" in params:
+            rows = rows[offset:offset + int(params["limit"])]
+        elif offset:
+            rows = rows[offset:]
+        return [self._select(name, row, params.get("select", "*"), embedded or {}) for row in rows]
+
+    def _select(self, name: str | None, row: dict, select: str, embedded: dict | None = None) -> dict:
+        result = {}
+        for item in _split(select):
+            if item == "*":
+                result.update(row)
+                continue
+            if "(" not in item:
+                result[item] = row.get(item)
+                continue
+            head, columns = item[:-1].split("(", 1)
+            alias, _, source = head.rpartition(":")
+            keys = FOREIGN_KEYS.get(name, {})
+            if source in keys:
+                column, target = source, keys[source]
+            else:
+                column = next((key for key, table in keys.items() if table == source), None)
+                target = source
+            if column is None and name in FOREIGN_KEYS.get(source, {}).values():
+                # Один-ко-многим: строки source, ссылающиеся на эту строку
+                back = next(key for key, table in FOREIGN_KEYS[source].items() if table == name)
+                children = self._find(self.table(source), [_Filter(back, "eq", str(row["id"])),
+                                                           *(embedded or {}).get(alias or source, ())])
+                result[alias or source] = [self._select(source, child, columns) for child in children]
+                continue
+            related = self.table(target).rows.get(row.get(column)) if column else None
+            result[alias or source] = self._select(target, related, columns) if related else None
+        return result
+
+    # --- функции из sql/ ---
+
+    def _join_event(self, p_event_id, p_user_ids):
+        event = self.table("events").rows.get(p_event_id)
+        if event is None:
+            return []
+        current = event["participants"] or []
+        joined = sorted(set(p_user_ids) - set(current))
+        self.update("events", event, {"participants": current + joined,
+                                      "participants_count": event["participants_count"] + len(joined)})
+        return [{"start_timestamptz": event["start_timestamptz"], "end_timestamptz": event["end_timestamptz"],
+                 "participants_count": event["participants_count"], "joined": joined,
+                 "sponsor_id": event["sponsor_id"]}]
+
+    def _leave_event(self, p_event_id, p_user_id):
+        event = self.table("events").rows.get(p_event_id)
+        if event is None:
+            return []
+        left = p_user_id in (event["participants"] or [])
+        if left:
+            participants = [user for user in event["participants"] if user != p_user_id]
+            self.update("events", event, {"participants": participants, "participants_count": len(participants)})
+        return [{"participants_count": event["participants_count"], "left_event": left,
+                 "sponsor_id": event["sponsor_id"]}]
+
+    def _event_participants(self, p_event_id):
+        event = self.table("events").rows.get(p_event_id)
+        users = self.table("users").rows
+        if event is None:
+            return []
+        return [{key: users[user_id].get(key) for key in ("id", "first_name", "last_name", "avatar_url")}
+                for user_id in event["participants"] or [] if user_id in users]
+
+    def _profile_view(self, p_user_id, p_viewer_id):
+        user = self.table("users").rows.get(p_user_id)
+        if user is None:
+            return []
+        profile = {key: user.get(key) for key in (
+            "id", "email", "phone_number", "first_name", "last_name", "city", "birthday", "tags", "avatar_url",
+            "avatar_sizes", "friends_count", "events_created_count", "events_attending_count", "groups_count")}
+        profile["friendship_status"] = None
+        if p_viewer_id != p_user_id:
+            links = self._find(self.table("friends"), [_Filter.parse_param(
+                "or", f"(and(sender_id.eq.{p_viewer_id},recipient_id.eq.{p_user_id}),"
+                      f"and(sender_id.eq.{p_user_id},recipient_id.eq.{p_viewer_id}))")])
+            link = max(links, key=lambda row: row["status"], default=None)
+            profile["friendship_status"] = "not_in_friends" if link is None else (
+                "in_friends" if link["status"] else
+                "application_sent" if link["sender_id"] == p_viewer_id else "application_received")
+        return [profile]
+
+    def _user_chats(self, p_user_id):
+        chats = self.table("chats")
+        rooms = []
+        for membership in self._find(self.table("chat_members"), [_Filter("user_id", "eq", str(p_user_id))]):
+            rooms.append((chats.rows.get(membership["chat_id"]), None))
+        for event in self._find(self.table("events"), [_Filter("participants", "cs", f"{{{p_user_id}}}")]):
+            rooms += [(chat, event["title"]) for chat in
+                      self._find(chats, [_Filter("event_id", "eq", str(event["id"]))])]
+        groups = self.table("groups").rows
+        for membership in self._find(self.table("group_members"), [_Filter("user_id", "eq", str(p_user_id))]):
+            group = groups.get(membership["group_id"])
+            if group is not None:
+                rooms += [(chat, group["name"]) for chat in
+                          self._find(chats, [_Filter("group_id", "eq", str(group["id"]))])]
+        return [{"id": chat["id"], "title": title or chat.get("title"), "event_id": chat.get("event_id"),
+                 "group_id": chat.get("group_id"), "created_by": chat.get("created_by")}
+                for chat, title in rooms if chat is not None]
+
+
+TAGS = ["music", "sport", "art", "games", "food", "travel", "science", "movies", "books", "tech",
+        "dance", "photo", "theatre", "outdoor", "kids", "business", "language", "yoga", "cars", "pets"]
+CITIES = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург", "Самара", "Пермь", "Томск"]
+NAMES = ["Иван", "Анна", "Пётр", "Мария", "Алексей", "Ольга", "Дмитрий", "Елена", "Сергей", "Наталья",
+         "Андрей", "Татьяна", "Михаил", "Юлия", "Николай", "Ирина"]
+SURNAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+            "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров"]
+WORDS = ["встреча", "концерт", "прогулка", "турнир", "лекция", "мастер-класс", "вечеринка", "квиз",
+         "выставка", "поход", "фестиваль", "показ", "клуб", "забег", "ярмарка", "чтения"]
+
+
+def seed(store: MemorySupabase, users: int = 5000, events: int = 10000, groups: int = 500,
+         friends_per_user: int = 20, participants_per_event: int = 15, members_per_group: int = 40,
+         hashed_password: str = "", random_seed: int = 1):
+    """Заполняет store детерминированными синтетическими данными"""
+    rng = random.Random(random_seed)
+    # Отдельный генератор, чтобы привязка к группам не меняла остальные данные
+    group_rng = random.Random(random_seed + 1)
+    now = datetime.now(timezone.utc)
+
+    for tag in TAGS:
+        store.insert("tags", {"tag": tag})
+    for user_id in range(1, users + 1):
+        store.insert("users", {
+            "id": user_id,
+            "email": f"user{user_id}@example.com",
+            "phone_number": f"8900{user_id:07d}",
+            "hashed_password": hashed_password,
+            "first_name": rng.choice(NAMES),
+            "last_name": rng.choice(SURNAMES),
+            "city": rng.choice(CITIES),
+            "birthday": f"{rng.randint(1970, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "tags": rng.sample(TAGS, 3),
+            "bio": "",
+        })
+
+    pairs = set()
+    for user_id in range(1, users + 1):
+        for friend_id in rng.sample(range(1, users + 1), min(friends_per_user // 2, users - 1)):
+            if friend_id != user_id and (friend_id, user_id) not in pairs:
+                pairs.add((user_id, friend_id))
+    for sender_id, recipient_id in pairs:
+        # Каждая десятая заявка ещё не принята
+        store.insert("friends", {"sender_id": sender_id, "recipient_id": recipient_id,
+                                 "status": rng.random() > 0.1})
+
+    for event_id in range(1, events + 1):
+        sponsor_id = rng.randint(1, users)
+        start = now + timedelta(hours=rng.randint(-24 * 7, 24 * 60))
+        participants = [sponsor_id, *{rng.randint(1, users) for _ in range(participants_per_event)} - {sponsor_id}]
+        store.insert("events", {
+            "id": event_id,
+            "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "location": f"{rng.choice(CITIES)}, ул. Ленина, {rng.randint(1, 100)}",
+            "start_timestamptz": start.isoformat(),
+            "end_timestamptz": (start + timedelta(hours=rng.randint(1, 6))).isoformat(),
+            "sponsor_id": sponsor_id,
+            "tags": rng.sample(TAGS, 2),
+            "participants": participants,
+            "participants_count": len(participants),
+            # Каждое третье мероприятие опубликовано от имени группы
+            "group_id": group_rng.randint(1, groups) if groups and group_rng.random() < 0.3 else None,
+        })
+
+    for group_id in range(1, groups + 1):
+        creator_id = rng.randint(1, users)
+        store.insert("groups", {
+            "id": group_id,
+            "name": f"Клуб «{rng.choice(WORDS)}» {group_id}",
+            "description": " ".join(rng.choices(WORDS, k=8)),
+            "tags": rng.sample(TAGS, 2),
+            "creator_id": creator_id,
+        })
+        members = {rng.randint(1, users) for _ in range(members_per_group)} - {creator_id}
+        store.insert("group_members", {"group_id": group_id, "user_id": creator_id, "is_admin": True})
+        for user_id in members:
+            store.insert("group_members", {"group_id": group_id, "user_id": user_id, "is_admin": False})
+    return store
@@ -0,0 +1,88 @@
+"""Локальная заглушка PostgREST для бенчмарков.
+
+Отвечает на любые запросы к /rest/v1/{table} фиксированной строкой (вставки —
+самими вставленными строками) с искусственной задержкой, имитирующей сетевой
+round trip до Supabase.
+Подключается к клиенту in-process через ASGI-транспорт httpx.
+"""
+import asyncio
+import itertools
+from datetime import datetime, timezone
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+ROW = {
+    "id": 1,
+    "title": "Benchmark event",
+    "description": "",
+    "location": "Moscow",
+    "start_timestamptz": "2030-01-01T10:00:00+00:00",
+    "end_timestamptz": "2030-01-01T12:00:00+00:00",
+    "sponsor_id": 1,
+    "tags": ["music"],
+    "tag": "music",
+    "participants": [1, 2],
+    "participants_count": 2,
+    "joined": [1],
+    "left_event": True,
+    "sender_id": 1,
+    "recipient_id": 2,
+    "status": True,
+    "first_name": "Ivan",
+    "last_name": "Ivanov",
+    "avatar_url": None,
+    "organizer": {"id": 1, "first_name": "Ivan", "last_name": "Ivanov", "avatar_url": None},
+}
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_stand_in(latency: float = 0.1, row: dict | None = None, handlers: dict | None = None) -> Starlette:
+    """handlers — {таблица или функция: async (request) -> список строк} вместо фиксированной строки.
+
+    Вставки возвращают переданные строки с новыми id.
+    """
+    row = {**ROW, **(row or {})}
+    handlers = handlers or {}
+    ids = itertools.count(1000)
+
+    async def table(request: Request):
+        await asyncio.sleep(latency)
+        name = request.path_params.get("table") or request.path_params["function"]
+        if name in handlers:
+            return JSONResponse(await handlers[name](request))
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            return JSONResponse(row)
+        if request.method == "POST" and "table" in request.path_params:
+            inserted = await request.json()
+            if isinstance(inserted, dict):
+                inserted = [inserted]
+            return JSONResponse([{**item, "id": next(ids), "created_at": now_iso()} for item in inserted])
+        return JSONResponse([row])
+
+    async def storage_object(request: Request):
+        await request.body()
+        await asyncio.sleep(latency)
+        return JSONResponse({"Key": request.path_params["path"]})
+
+    return Starlette(routes=[
+        Route("/rest/v1/{table}", table, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/rest/v1/rpc/{function}", table, methods=["GET", "POST"]),
+        Route("/storage/v1/object/{path:path}", storage_object, methods=["POST", "PUT"]),
+    ])
+
+
+def attach_stand_in(supabase_client, stand_in: Starlette):
+    """Перенаправляет PostgREST- и Storage-сессии клиента в заглушку.
+
+    Меняется только транспорт, поэтому хуки сессий (метрики) продолжают работать.
+    """
+    for session in (supabase_client.postgrest.session, supabase_client.storage.session):
+        session._transport = httpx.ASGITransport(app=stand_in)
+        session._mounts = {}
@@ -0,0 +1,70 @@
+-- Атомарное участие в мероприятиях и счётчик участников.
+-- Применяется в SQL-редакторе Supabase (или psql) один раз; функции вызываются через RPC.
+
+alter table events add column if not exists participants_count integer not null default 0;
+
+update events set participants_count = coalesce(cardinality(participants), 0);
+
+
+-- Добавляет пользователей в участники одним UPDATE под блокировкой строки.
+-- Возвращает пустой результат, если мероприятия нет; joined — реально добавленные id.
+create or replace function join_event(p_event_id bigint, p_user_ids bigint[])
+returns table (start_timestamptz timestamptz, end_timestamptz timestamptz,
+               participants_count integer, joined bigint[])
+language plpgsql as $$
+#variable_conflict use_column
+declare
+    v_current bigint[];
+    v_new bigint[];
+begin
+    select coalesce(e.participants, '{}') into v_current from events e where e.id = p_event_id for update;
+    if not found then
+        return;
+    end if;
+
+    select coalesce(array_agg(distinct u order by u), '{}') into v_new
+    from unnest(p_user_ids) as u
+    where u <> all(v_current);
+
+    return query
+    update events e
+    set participants = v_current || v_new,
+        participants_count = e.participants_count + cardinality(v_new)
+    where e.id = p_event_id
+    returning e.start_timestamptz, e.end_timestamptz, e.participants_count, v_new;
+end;
+$$;
+
+
+-- Убирает пользователя из участников. Пустой результат — мероприятия нет,
+-- left_event = false — пользователь не был участником.
+create or replace function leave_event(p_event_id bigint, p_user_id bigint)
+returns table (participants_count integer, left_event boolean)
+language plpgsql as $$
+#variable_conflict use_column
+begin
+    return query
+    update events e
+    set participants = array_remove(e.participants, p_user_id),
+        participants_count = cardinality(array_remove(e.participants, p_user_id))
+    where e.id = p_event_id and p_user_id = any(e.participants)
+    returning e.participants_count, true;
+
+    if not found then
+        return query select e.participants_count, false from events e where e.id = p_event_id;
+    end if;
+end;
+$$;
+
+
+-- Карточки участников мероприятия; фильтры, сортировка и limit из PostgREST
+-- применяются к результату (функция инлайнится планировщиком).
+create or replace function event_participants(p_event_id bigint)
+returns table (id bigint, first_name text, last_name text, avatar_url text)
+language sql stable as $$
+    select u.id, u.first_name, u.last_name, u.avatar_url
+    from events e
+    cross join unnest(e.participants) as participant_id
+    join users u on u.id = participant_id
+    where e.id = p_event_id
+$$;
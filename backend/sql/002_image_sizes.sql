@@ -0,0 +1,6 @@
+-- Ссылки на уменьшенные копии изображений: {"original": ..., "thumb": ..., "feed": ...}.
+-- Заполняются фоновой нарезкой после загрузки оригинала.
+
+alter table events add column if not exists image_sizes jsonb;
+
+alter table users add column if not exists avatar_sizes jsonb;
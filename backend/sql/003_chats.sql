@@ -0,0 +1,76 @@
+-- Чаты: личные/групповые по списку участников, а также комнаты мероприятий и групп.
+-- Участники комнаты мероприятия — events.participants, комнаты группы — group_members;
+-- отдельных строк в chat_members для них нет.
+
+create table if not exists chats (
+    id bigint generated by default as identity primary key,
+    title text,
+    event_id bigint unique references events (id) on delete cascade,
+    group_id bigint unique references groups (id) on delete cascade,
+    created_by bigint references users (id) on delete set null,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists chat_members (
+    chat_id bigint not null references chats (id) on delete cascade,
+    user_id bigint not null references users (id) on delete cascade,
+    primary key (chat_id, user_id)
+);
+
+create index if not exists chat_members_user_id on chat_members (user_id);
+
+create table if not exists chat_messages (
+    id bigint generated by default as identity primary key,
+    chat_id bigint not null references chats (id) on delete cascade,
+    sender_id bigint references users (id) on delete set null,
+    body text not null,
+    created_at timestamptz not null default now()
+);
+
+-- История читается страницами от новых к старым внутри чата
+create index if not exists chat_messages_chat_id_id on chat_messages (chat_id, id desc);
+
+create index if not exists events_participants_gin on events using gin (participants);
+
+
+-- Комната создаётся вместе с мероприятием или группой
+create or replace function create_room() returns trigger
+language plpgsql as $$
+begin
+    if tg_table_name = 'events' then
+        insert into chats (event_id, created_by) values (new.id, new.sponsor_id);
+    else
+        insert into chats (group_id, created_by) values (new.id, new.creator_id);
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists events_create_room on events;
+create trigger events_create_room after insert on events
+    for each row execute function create_room();
+
+drop trigger if exists groups_create_room on groups;
+create trigger groups_create_room after insert on groups
+    for each row execute function create_room();
+
+insert into chats (event_id, created_by) select id, sponsor_id from events on conflict do nothing;
+insert into chats (group_id, created_by) select id, creator_id from groups on conflict do nothing;
+
+
+-- Все чаты пользователя; фильтры, сортировка и limit из PostgREST применяются к результату
+create or replace function user_chats(p_user_id bigint)
+returns table (id bigint, title text, event_id bigint, group_id bigint, created_by bigint)
+language sql stable as $$
+    select c.id, c.title, c.event_id, c.group_id, c.created_by
+    from chat_members m join chats c on c.id = m.chat_id
+    where m.user_id = p_user_id
+    union all
+    select c.id, e.title, c.event_id, c.group_id, c.created_by
+    from events e join chats c on c.event_id = e.id
+    where e.participants @> array[p_user_id]
+    union all
+    select c.id, g.name, c.event_id, c.group_id, c.created_by
+    from group_members gm join groups g on g.id = gm.group_id join chats c on c.group_id = g.id
+    where gm.user_id = p_user_id
+$$;
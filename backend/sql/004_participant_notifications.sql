@@ -0,0 +1,53 @@
+-- join_event и leave_event дополнительно возвращают организатора мероприятия,
+-- чтобы уведомить его об изменении состава участников без лишнего запроса.
+-- Тип результата меняется, поэтому функции пересоздаются.
+
+drop function if exists join_event(bigint, bigint[]);
+
+create function join_event(p_event_id bigint, p_user_ids bigint[])
+returns table (start_timestamptz timestamptz, end_timestamptz timestamptz,
+               participants_count integer, joined bigint[], sponsor_id bigint)
+language plpgsql as $$
+#variable_conflict use_column
+declare
+    v_current bigint[];
+    v_new bigint[];
+begin
+    select coalesce(e.participants, '{}') into v_current from events e where e.id = p_event_id for update;
+    if not found then
+        return;
+    end if;
+
+    select coalesce(array_agg(distinct u order by u), '{}') into v_new
+    from unnest(p_user_ids) as u
+    where u <> all(v_current);
+
+    return query
+    update events e
+    set participants = v_current || v_new,
+        participants_count = e.participants_count + cardinality(v_new)
+    where e.id = p_event_id
+    returning e.start_timestamptz, e.end_timestamptz, e.participants_count, v_new, e.sponsor_id;
+end;
+$$;
+
+
+drop function if exists leave_event(bigint, bigint);
+
+create function leave_event(p_event_id bigint, p_user_id bigint)
+returns table (participants_count integer, left_event boolean, sponsor_id bigint)
+language plpgsql as $$
+#variable_conflict use_column
+begin
+    return query
+    update events e
+    set participants = array_remove(e.participants, p_user_id),
+        participants_count = cardinality(array_remove(e.participants, p_user_id))
+    where e.id = p_event_id and p_user_id = any(e.participants)
+    returning e.participants_count, true, e.sponsor_id;
+
+    if not found then
+        return query select e.participants_count, false, e.sponsor_id from events e where e.id = p_event_id;
+    end if;
+end;
+$$;
@@ -0,0 +1,107 @@
+-- Счётчики профиля: друзья, созданные мероприятия, участие в мероприятиях, группы.
+-- Поддерживаются триггерами в тех же транзакциях, что и изменения из роутов,
+-- поэтому профиль читается одной строкой независимо от числа друзей.
+
+alter table users add column if not exists friends_count integer not null default 0;
+alter table users add column if not exists events_created_count integer not null default 0;
+alter table users add column if not exists events_attending_count integer not null default 0;
+alter table users add column if not exists groups_count integer not null default 0;
+
+create index if not exists friends_sender_recipient on friends (sender_id, recipient_id);
+create index if not exists friends_recipient_id on friends (recipient_id);
+
+
+create or replace function count_friends() returns trigger
+language plpgsql as $$
+declare
+    v_delta integer;
+begin
+    v_delta := (case when tg_op <> 'DELETE' and new.status then 1 else 0 end)
+             - (case when tg_op <> 'INSERT' and old.status then 1 else 0 end);
+    if v_delta <> 0 then
+        update users set friends_count = friends_count + v_delta
+        where id in (coalesce(new.sender_id, old.sender_id), coalesce(new.recipient_id, old.recipient_id));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists friends_count_friends on friends;
+create trigger friends_count_friends after insert or update of status or delete on friends
+    for each row execute function count_friends();
+
+
+create or replace function count_events() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        update users set events_created_count = events_created_count + 1 where id = new.sponsor_id;
+        update users set events_attending_count = events_attending_count + 1
+        where id = any(coalesce(new.participants, '{}'));
+    elsif tg_op = 'DELETE' then
+        update users set events_created_count = events_created_count - 1 where id = old.sponsor_id;
+        update users set events_attending_count = events_attending_count - 1
+        where id = any(coalesce(old.participants, '{}'));
+    else
+        update users set events_attending_count = events_attending_count + 1
+        where id = any(coalesce(new.participants, '{}')) and not id = any(coalesce(old.participants, '{}'));
+        update users set events_attending_count = events_attending_count - 1
+        where id = any(coalesce(old.participants, '{}')) and not id = any(coalesce(new.participants, '{}'));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists events_count_events on events;
+create trigger events_count_events after insert or update of participants or delete on events
+    for each row execute function count_events();
+
+
+create or replace function count_groups() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        update users set groups_count = groups_count + 1 where id = new.user_id;
+    else
+        update users set groups_count = groups_count - 1 where id = old.user_id;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists group_members_count_groups on group_members;
+create trigger group_members_count_groups after insert or delete on group_members
+    for each row execute function count_groups();
+
+
+update users u set
+    friends_count = (select count(*) from friends f
+                     where f.status and (f.sender_id = u.id or f.recipient_id = u.id)),
+    events_created_count = (select count(*) from events e where e.sponsor_id = u.id),
+    events_attending_count = (select count(*) from events e where e.participants @> array[u.id]),
+    groups_count = (select count(*) from group_members gm where gm.user_id = u.id);
+
+
+-- Профиль со счётчиками и статусом дружбы со смотрящим за одно обращение; пусто — нет пользователя.
+-- friendship_status — как в FriendGraph.status; null, если смотрят свой профиль.
+create or replace function profile_view(p_user_id bigint, p_viewer_id bigint)
+returns setof jsonb
+language sql stable as $$
+    select jsonb_build_object(
+        'id', u.id, 'email', u.email, 'phone_number', u.phone_number,
+        'first_name', u.first_name, 'last_name', u.last_name, 'city', u.city, 'birthday', u.birthday,
+        'tags', u.tags, 'avatar_url', u.avatar_url, 'avatar_sizes', u.avatar_sizes,
+        'friends_count', u.friends_count, 'events_created_count', u.events_created_count,
+        'events_attending_count', u.events_attending_count, 'groups_count', u.groups_count,
+        'friendship_status', case when p_viewer_id = p_user_id then null else coalesce((
+            select case when f.status then 'in_friends'
+                        when f.sender_id = p_viewer_id then 'application_sent'
+                        else 'application_received' end
+            from friends f
+            where (f.sender_id = p_viewer_id and f.recipient_id = p_user_id)
+               or (f.sender_id = p_user_id and f.recipient_id = p_viewer_id)
+            order by f.status desc
+            limit 1), 'not_in_friends') end)
+    from users u
+    where u.id = p_user_id
+$$;
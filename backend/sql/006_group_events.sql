@@ -0,0 +1,7 @@
+-- Мероприятия, опубликованные от имени группы. Лента группы и лента групп
+-- пользователя читаются по индексу (group_id, start_timestamptz, id), без
+-- просмотра всей таблицы events. При удалении группы мероприятия остаются.
+
+alter table events add column if not exists group_id bigint references groups (id) on delete set null;
+
+create index if not exists events_group_start on events (group_id, start_timestamptz, id) where group_id is not null;
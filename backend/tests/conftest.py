@@ -0,0 +1,26 @@
+"""Общая настройка тестов: пути к app и benchmarks и окружение до импорта config.
+
+QUERY_TRACE задаётся здесь, а не только в test_query_budgets: config читается
+один раз, и модуль, импортированный раньше, зафиксировал бы другой режим.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["QUERY_TRACE"] = "strict"
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
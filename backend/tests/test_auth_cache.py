@@ -0,0 +1,97 @@
+"""Кэши проверки токенов и существования пользователей, билеты SSE"""
+import pytest
+
+import api.utils.auth_cache as auth_cache
+from api.utils.auth_cache import StreamTickets, TokenCache, UserExistenceCache
+
+
+class _Clock:
+    """Подменяет модуль time в auth_cache: и time(), и monotonic() — одно управляемое значение"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(auth_cache, "time", clock)
+    return clock
+
+
+def test_token_cache_expires_with_token(clock):
+    cache = TokenCache()
+    cache.put("token", 7, exp=clock.now + 60)
+
+    assert cache.get("token") == 7
+    clock.now += 60
+    assert cache.get("token") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_token_cache_evicts_least_recently_used(clock):
+    cache = TokenCache(max_size=2)
+    cache.put("a", 1, exp=clock.now + 60)
+    cache.put("b", 2, exp=clock.now + 60)
+    cache.get("a")
+
+    cache.put("c", 3, exp=clock.now + 60)
+
+    assert [cache.get(token) for token in ("a", "b", "c")] == [1, None, 3]
+
+
+def test_existence_cache_keeps_missing_users_shorter(clock):
+    cache = UserExistenceCache(ttl=300, missing_ttl=30)
+    cache.put(1, True)
+    cache.put(2, False)
+
+    clock.now += 30
+    assert cache.get(1) is True
+    assert cache.get(2) is None
+
+    clock.now += 270
+    assert cache.get(1) is None
+
+
+def test_existence_cache_invalidate(clock):
+    cache = UserExistenceCache()
+    cache.put(1, False)
+
+    cache.invalidate(1)
+
+    assert cache.get(1) is None
+
+
+def test_stream_ticket_is_single_use(clock):
+    tickets = StreamTickets(ttl=30)
+    ticket = tickets.issue(5)
+
+    assert tickets.redeem(ticket) == 5
+    assert tickets.redeem(ticket) is None
+    assert tickets.redeem("forged") is None
+
+
+def test_stream_ticket_expires(clock):
+    tickets = StreamTickets(ttl=30)
+    ticket = tickets.issue(5)
+
+    clock.now += 30
+
+    assert tickets.redeem(ticket) is None
+
+
+def test_stream_tickets_are_bounded(clock):
+    tickets = StreamTickets(ttl=30, max_size=2)
+    first = tickets.issue(1)
+    tickets.issue(2)
+    tickets.issue(3)
+
+    assert len(tickets) == 2
+    assert tickets.redeem(first) is None
@@ -0,0 +1,108 @@
+"""Индекс предстоящих мероприятий: фильтры find, курсор, правки и пересборка"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.utils.event_index import EventDiscoveryIndex, city_key
+
+NOW = datetime.now(timezone.utc)
+
+
+def _event(event_id: int, hours: float, location: str = "Москва, Тверская 1", tags=("music",), length: float = 2):
+    start = NOW + timedelta(hours=hours)
+    return {"id": event_id, "location": location, "tags": list(tags),
+            "start_timestamptz": start.isoformat(), "end_timestamptz": (start + timedelta(hours=length)).isoformat()}
+
+
+ROWS = [
+    _event(1, 1),
+    _event(2, 2, "Казань, Баумана 5", ("sport",)),
+    _event(3, 3, tags=("sport", "music")),
+    _event(4, 4, "Санкт-Петербург", ("art",)),
+    _event(5, 5),
+    # Уже идёт: в выдаче, пока не закончилось
+    _event(6, -1),
+    # Закончилось
+    _event(7, -5),
+]
+
+
+@pytest.fixture
+def index():
+    index = EventDiscoveryIndex()
+    index.load(ROWS)
+    return index
+
+
+def _all(index, **filters) -> list[int]:
+    ids, cursor = index.find(100, **filters)
+    assert cursor is None
+    return ids
+
+
+def test_city_key():
+    assert city_key("Москва, Тверская 1") == city_key(" москва") == "москва"
+    assert city_key("Королёв") == "королев"
+    assert city_key(None) == ""
+
+
+def test_find_orders_by_start_and_skips_finished(index):
+    assert _all(index) == [6, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"city": "москва"}, [6, 1, 3, 5]),
+    ({"city": "Тула"}, []),
+    ({"tags": ["sport"]}, [2, 3]),
+    ({"tags": ["sport", "art"]}, [2, 3, 4]),
+    ({"tags": ["unknown"]}, []),
+    ({"city": "Москва", "tags": ["sport"]}, [3]),
+    ({"start_from": (NOW + timedelta(hours=2.5)).timestamp()}, [3, 4, 5]),
+    ({"start_to": (NOW + timedelta(hours=2.5)).timestamp()}, [6, 1, 2]),
+])
+def test_find_filters(index, filters, expected):
+    assert _all(index, **filters) == expected
+
+
+def test_find_pages_with_cursor(index):
+    pages, after = [], None
+    while True:
+        ids, after = index.find(2, city="москва", after=after)
+        pages.append(ids)
+        if after is None:
+            break
+
+    assert pages == [[6, 1], [3, 5]]
+
+
+def test_upsert_moves_and_remove_drops(index):
+    index.upsert(_event(1, 6, "Казань", ("art",)))
+    index.remove(5)
+
+    assert _all(index) == [6, 2, 3, 4, 1]
+    assert _all(index, city="Казань") == [2, 1]
+    assert _all(index, tags=["music"]) == [6, 3]
+
+
+def test_upsert_of_finished_event_removes_it(index):
+    index.upsert(_event(3, -5))
+
+    assert 3 not in _all(index)
+    assert len(index) == 6
+
+
+def test_rebuild_replays_changes_made_during_fetch(loop):
+    index = EventDiscoveryIndex()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        # Пока строки читаются, мероприятие создано и другое удалено
+        index.upsert(_event(10, 0.5))
+        index.remove(2)
+        return ROWS
+
+    index._fetch = fetch
+    loop.run_until_complete(index.rebuild())
+
+    assert _all(index) == [6, 10, 1, 3, 4, 5]
@@ -0,0 +1,104 @@
+"""Граф друзей в памяти: загрузка по требованию, правки, сброс и пересборка"""
+import asyncio
+
+import pytest
+
+import api.utils.friend_graph as friend_graph_module
+from api.utils.friend_graph import FriendGraph
+from api.utils.supabase_client import supabase_client
+from memory_supabase import MemorySupabase
+from stand_in import attach_stand_in
+
+
+@pytest.fixture
+def store():
+    store = MemorySupabase(0)
+    for sender_id, recipient_id, accepted in ((1, 2, True), (3, 1, False), (1, 4, False)):
+        store.insert("friends", {"sender_id": sender_id, "recipient_id": recipient_id, "status": accepted})
+    attach_stand_in(supabase_client, store.app())
+    return store
+
+
+def test_loads_once_and_reports_status(loop, store):
+    graph = FriendGraph()
+
+    assert loop.run_until_complete(graph.friends(1)) == {2}
+    requests = store.requests
+    statuses = [loop.run_until_complete(graph.status(1, other)) for other in (2, 3, 4, 5)]
+
+    assert statuses == ["in_friends", "application_received", "application_sent", "not_in_friends"]
+    assert store.requests == requests
+
+
+def test_updates_apply_to_both_sides(loop, store):
+    graph = FriendGraph()
+    loop.run_until_complete(graph.friends(1))
+    loop.run_until_complete(graph.friends(3))
+
+    graph.accept_request(3, 1)
+
+    assert loop.run_until_complete(graph.friends(1)) == {2, 3}
+    assert loop.run_until_complete(graph.friends(3)) == {1}
+
+
+def test_invalidate_forgets_user_everywhere(loop, store):
+    graph = FriendGraph()
+    loop.run_until_complete(graph.friends(1))
+    loop.run_until_complete(graph.friends(2))
+    for row in list(store.table("friends").rows.values()):
+        if 1 in (row["sender_id"], row["recipient_id"]):
+            store.delete("friends", row)
+    requests = store.requests
+
+    graph.invalidate(1)
+
+    assert loop.run_until_complete(graph.friends(2)) == set()
+    assert store.requests == requests
+    assert loop.run_until_complete(graph.friends(1)) == set()
+    assert store.requests == requests + 1
+
+
+def test_invalidate_during_load_skips_caching(loop, store):
+    graph = FriendGraph()
+
+    async def scenario():
+        loading = asyncio.create_task(graph.friends(1))
+        await asyncio.sleep(0)
+        graph.invalidate(1)
+        await loading
+
+    loop.run_until_complete(scenario())
+    requests = store.requests
+    loop.run_until_complete(graph.friends(1))
+
+    assert store.requests == requests + 1
+
+
+def test_failed_load_clears_stale_flag(loop, store, mocker):
+    graph = FriendGraph()
+    graph._stale.add(1)
+    broken = mocker.Mock()
+    broken.table.side_effect = RuntimeError("down")
+    mocker.patch.object(friend_graph_module, "supabase_client", broken)
+
+    with pytest.raises(RuntimeError):
+        loop.run_until_complete(graph.friends(1))
+
+    assert 1 not in graph._stale
+
+
+def test_rebuild_replays_changes_and_keeps_recent_users(loop, store):
+    graph = FriendGraph(max_users=3)
+    for user_id in (2, 3, 1):
+        loop.run_until_complete(graph.friends(user_id))
+
+    async def scenario():
+        rebuilding = asyncio.create_task(graph.rebuild(page_size=1))
+        await asyncio.sleep(0)
+        graph.accept_request(3, 1)
+        await rebuilding
+
+    loop.run_until_complete(scenario())
+
+    assert list(graph._users) == [2, 3, 1]
+    assert loop.run_until_complete(graph.friends(1)) == {2, 3}
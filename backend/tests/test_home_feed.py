@@ -0,0 +1,70 @@
+"""Fan-out домашней ленты: раскладка по лентам и гистерезис популярных источников"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from api.utils.home_feed import HomeFeed, _Feed
+
+START = datetime.now(timezone.utc) + timedelta(hours=1)
+END = START + timedelta(hours=2)
+
+
+def _follow(home_feed: HomeFeed, user_id: int, friends=(), groups=()):
+    """Лента в памяти, как после сборки, но пустая и без обращений к базе"""
+    feed = _Feed(set(friends), set(groups))
+    home_feed._feeds[user_id] = feed
+    for source in (*(("friend", friend) for friend in friends), *(("group", group) for group in groups)):
+        home_feed._followers.setdefault(source, set()).add(user_id)
+    return feed
+
+
+@pytest.fixture
+def home_feed():
+    home_feed = HomeFeed(size=3, fanout_limit=2)
+    for user_id in (1, 2, 3):
+        _follow(home_feed, user_id, friends=[10])
+    return home_feed
+
+
+def test_event_is_fanned_out_to_followers():
+    home_feed = HomeFeed(size=3, fanout_limit=2)
+    feeds = [_follow(home_feed, user_id, friends=[10]) for user_id in (1, 2)]
+
+    home_feed.event_added(100, START, END, sponsor_id=10)
+
+    assert [feed.items for feed in feeds] == [[(START.timestamp(), 100)]] * 2
+    assert home_feed.stats()["deliveries"] == 2
+
+
+def test_window_is_trimmed_to_size():
+    home_feed = HomeFeed(size=3, fanout_limit=2)
+    feed = _follow(home_feed, 1, friends=[10])
+
+    for event_id in (4, 0, 3, 1, 2):
+        home_feed.event_added(event_id, START + timedelta(minutes=event_id), END, sponsor_id=10)
+
+    assert [event_id for _, event_id in feed.items] == [0, 1, 2]
+    assert feed.horizon == ((START + timedelta(minutes=2)).timestamp(), 2)
+
+
+def test_popular_source_is_not_fanned_out(home_feed):
+    home_feed.event_added(100, START, END, sponsor_id=10)
+
+    assert home_feed.stats()["hot_users"] == 1
+    assert home_feed.stats()["skipped"] == 1
+    assert all(not feed.items for feed in home_feed._feeds.values())
+
+
+def test_popular_source_cools_down_with_hysteresis(home_feed):
+    home_feed.event_added(100, START, END, sponsor_id=10)
+
+    # Два читателя из трёх: всё ещё больше fanout_limit // 2
+    home_feed.invalidate(1)
+    assert home_feed.stats()["hot_users"] == 1
+    assert home_feed.stats()["feeds"] == 2
+
+    # Остался один: флаг снят, а его лента, пропустившая мероприятие, сброшена
+    home_feed.invalidate(2)
+    assert home_feed.stats()["hot_users"] == 0
+    assert home_feed.stats()["feeds"] == 0
+    assert ("friend", 10) not in home_feed._followers
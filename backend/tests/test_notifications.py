@@ -0,0 +1,88 @@
+"""Брокер уведомлений: доставка подписчикам и продолжение по Last-Event-ID"""
+import asyncio
+
+import pytest
+
+from api.utils.notifications import NotificationBroker
+
+
+def _ids(frames) -> list[str]:
+    return [frame.decode().split("\n")[0].removeprefix("id: ") for frame in frames]
+
+
+def _events(frames) -> list[str]:
+    return [frame.decode().split("\n")[1].removeprefix("event: ") for frame in frames]
+
+
+async def _read(stream, count: int) -> list[bytes]:
+    """count кадров после приветственного retry"""
+    try:
+        assert (await anext(stream)).startswith(b"retry:")
+        return [await asyncio.wait_for(anext(stream), 1) for _ in range(count)]
+    finally:
+        await stream.aclose()
+
+
+@pytest.fixture
+def broker():
+    return NotificationBroker(buffer_size=3, max_users=2, heartbeat=60)
+
+
+def test_live_events_reach_subscriber(loop, broker):
+    async def scenario():
+        stream = broker.stream(1)
+        assert (await anext(stream)).startswith(b"retry:")
+        broker.publish([1, 2], "friend_request", {"from": 2})
+        frame = await asyncio.wait_for(anext(stream), 1)
+        await stream.aclose()
+        return frame
+
+    frame = loop.run_until_complete(scenario())
+
+    assert _events([frame]) == ["friend_request"]
+    assert b'"from": 2' in frame
+    assert broker.stats()["streams"] == 0
+
+
+def test_reconnect_replays_missed_events(loop, broker):
+    broker.publish([1], "a", {})
+    seen = f"{broker.epoch}-1"
+    broker.publish([1], "b", {})
+    broker.publish([2], "other user", {})
+    broker.publish([1], "c", {})
+
+    frames = loop.run_until_complete(_read(broker.stream(1, seen), 2))
+
+    assert _events(frames) == ["b", "c"]
+    assert _ids(frames) == [f"{broker.epoch}-2", f"{broker.epoch}-4"]
+
+
+@pytest.mark.parametrize("last_event_id", ["1-1", "garbage"])
+def test_unknown_epoch_resets(loop, broker, last_event_id):
+    broker.publish([1], "a", {})
+
+    frames = loop.run_until_complete(_read(broker.stream(1, last_event_id), 1))
+
+    assert _events(frames) == ["reset"]
+
+
+def test_truncated_history_resets(loop, broker):
+    for name in "abcd":
+        broker.publish([1], name, {})
+
+    # Из буфера на три события вытеснено только уже полученное первое
+    assert _events(loop.run_until_complete(_read(broker.stream(1, f"{broker.epoch}-1"), 3))) == ["b", "c", "d"]
+    broker.publish([1], "e", {})
+    assert _events(loop.run_until_complete(_read(broker.stream(1, f"{broker.epoch}-1"), 1))) == ["reset"]
+
+
+def test_forgotten_user_resets(loop, broker):
+    broker.publish([1], "a", {})
+    seen = f"{broker.epoch}-0"
+    # Историю пользователя 1 вытесняют два других
+    broker.publish([2], "b", {})
+    broker.publish([3], "c", {})
+
+    frames = loop.run_until_complete(_read(broker.stream(1, seen), 1))
+
+    assert _events(frames) == ["reset"]
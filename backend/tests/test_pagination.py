@@ -0,0 +1,58 @@
+"""Курсоры keyset-пагинации: кодирование и проверка типов ключа"""
+import base64
+
+import pytest
+from fastapi import HTTPException
+
+from api.utils.pagination import PageParams, check_cursor, decode_cursor, encode_cursor
+
+
+def _raw(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1700000000.5, 42)) == [1700000000.5, 42]
+    assert decode_cursor(None) is None
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", _raw("not json"), _raw("[]"), _raw('{"id": 1}')])
+def test_decode_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("values, types, expected", [
+    (None, (int,), None),
+    ([5], (int,), (5,)),
+    ([1.5, 7], (float, int), (1.5, 7)),
+    # float-ключ из JSON может прийти целым числом
+    ([1700000000, 7], (float, int), (1700000000, 7)),
+    (["2030-01-01", 3], (str, int), ("2030-01-01", 3)),
+])
+def test_check_cursor_accepts(values, types, expected):
+    assert check_cursor(values, types) == expected
+
+
+@pytest.mark.parametrize("values, types", [
+    ([5, 6], (int,)),
+    ([5], (float, int)),
+    (["5"], (int,)),
+    ([True], (int,)),
+    ([1.5], (int,)),
+    ([float("inf"), 1], (float, int)),
+    ([None, 1], (float, int)),
+])
+def test_check_cursor_rejects(values, types):
+    with pytest.raises(HTTPException) as error:
+        check_cursor(values, types)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid cursor"
+
+
+def test_page_params_key():
+    page = PageParams(limit=10, cursor=encode_cursor(3.5, 9))
+    assert page.key(float, int) == (3.5, 9)
+    with pytest.raises(HTTPException):
+        page.key(int)
@@ -0,0 +1,117 @@
+"""Бюджеты запросов к Supabase (@query_budget) под QUERY_TRACE=strict.
+
+Приложение вызывается in-process через ASGI, Supabase заменён заглушкой в
+памяти (benchmarks/memory_supabase.py). В режиме strict трассировка при
+превышении бюджета, дублях и N+1 отдаёт 500 с отчётом вместо ответа, так что
+каждый роут с бюджетом проверяется одним успешным запросом.
+
+Запуск из каталога backend:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+os.environ.setdefault("SUPABASE_URL", "http://stand-in")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["QUERY_TRACE"] = "strict"
+
+import httpx  # noqa: E402
+
+from api.utils.functions import create_access_token  # noqa: E402
+from api.utils.supabase_client import supabase_client  # noqa: E402
+from main import app  # noqa: E402
+from memory_supabase import MemorySupabase, seed  # noqa: E402
+from stand_in import attach_stand_in  # noqa: E402
+
+
+def _members(store, group_id: int) -> list[dict]:
+    return [row for row in store.table("group_members").rows.values() if row["group_id"] == group_id]
+
+
+def _admin(store, group_id: int) -> int:
+    return next(row["user_id"] for row in _members(store, group_id) if row["is_admin"])
+
+
+def _member(store, group_id: int) -> int:
+    return next(row["user_id"] for row in _members(store, group_id) if not row["is_admin"])
+
+
+def _outsider(store, group_id: int) -> int:
+    members = {row["user_id"] for row in _members(store, group_id)}
+    return next(user_id for user_id in store.table("users").rows if user_id not in members)
+
+
+# Роут -> (store) -> (метод, путь, пользователь, тело). Группа 1 для чтения и
+# изменений, группа 2 удаляется, поэтому удаление идёт последним
+CASES = {
+    ("GET", "/user/profile/batch"): lambda store: ("GET", "/user/profile/batch?ids=1,2,3", 1, None),
+    ("GET", "/user/profile/{user_id}"): lambda store: ("GET", "/user/profile/2", 1, None),
+    ("GET", "/user/friends/requests"): lambda store: ("GET", "/user/friends/requests", 1, None),
+    ("GET", "/events/group/{group_id}"): lambda store: ("GET", "/events/group/1", _member(store, 1), None),
+    ("GET", "/events/batch"): lambda store: ("GET", "/events/batch?ids=1,2,3", 1, None),
+    ("GET", "/events/{event_id}"): lambda store: ("GET", "/events/1", 1, None),
+    ("GET", "/events/events/{event_id}/participants"):
+        lambda store: ("GET", "/events/events/1/participants", 1, None),
+    ("GET", "/groups/batch"): lambda store: ("GET", "/groups/batch?ids=1,2,3", 1, None),
+    ("GET", "/groups/{group_id}"): lambda store: ("GET", "/groups/1", 1, None),
+    ("PUT", "/groups/{group_id}"):
+        lambda store: ("PUT", "/groups/1", _admin(store, 1), {"description": "Обновлено"}),
+    ("GET", "/groups/{group_id}/members"): lambda store: ("GET", "/groups/1/members", _member(store, 1), None),
+    ("POST", "/groups/{group_id}/join"): lambda store: ("POST", "/groups/1/join", _outsider(store, 1), None),
+    ("DELETE", "/groups/{group_id}/leave"):
+        lambda store: ("DELETE", "/groups/1/leave", _member(store, 1), None),
+    ("POST", "/groups/{group_id}/members/{target_user_id}/toggle_admin"):
+        lambda store: ("POST", f"/groups/1/members/{_member(store, 1)}/toggle_admin", _admin(store, 1), None),
+    ("DELETE", "/groups/{group_id}"): lambda store: ("DELETE", "/groups/2", _admin(store, 2), None),
+}
+
+
+def budgeted_routes() -> set[tuple[str, str]]:
+    return {(method, route.path) for route in app.routes
+            if getattr(getattr(route, "endpoint", None), "query_budget", None) is not None
+            for method in route.methods}
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def store():
+    store = MemorySupabase(0)
+    seed(store, users=60, events=120, groups=5, friends_per_user=6, participants_per_event=5, members_per_group=8)
+    attach_stand_in(supabase_client, store.app())
+    return store
+
+
+@pytest.fixture(scope="module")
+def client(loop, store):
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    yield client
+    loop.run_until_complete(client.aclose())
+
+
+def test_every_budgeted_route_is_covered():
+    assert budgeted_routes() == set(CASES)
+
+
+@pytest.mark.parametrize("route", list(CASES), ids=" ".join)
+def test_route_within_budget(route, loop, store, client):
+    method, path, user_id, body = CASES[route](store)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+    response = loop.run_until_complete(client.request(method, path, headers=headers, json=body))
+
+    assert response.status_code == 200, response.text
+    assert "problems=0" in response.headers["x-query-trace"]
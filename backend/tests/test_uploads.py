@@ -0,0 +1,101 @@
+"""Потоковый приём изображений: тип по сигнатуре, лимиты размера и временные файлы"""
+import tempfile
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from api.utils.uploads import CHUNK_SIZE, receive_image, sniff_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+BOUNDARY = "test-boundary"
+
+
+def _multipart(*parts: tuple[str, bytes]) -> bytes:
+    body = b""
+    for name, data in parts:
+        body += (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{name}.bin\"\r\n"
+                 f"Content-Type: application/octet-stream\r\n\r\n").encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _request(body: bytes, content_type: str = f"multipart/form-data; boundary={BOUNDARY}",
+             chunk: int = 100) -> Request:
+    chunks = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b""]
+
+    async def receive():
+        data = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": data, "more_body": bool(chunks)}
+
+    return Request({"type": "http", "method": "POST", "headers": [(b"content-type", content_type.encode())]},
+                   receive)
+
+
+@pytest.fixture(autouse=True)
+def temp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def _receive(loop, request: Request, max_bytes: int = 4096):
+    return loop.run_until_complete(receive_image(request, max_bytes=max_bytes))
+
+
+def _status(loop, request: Request, max_bytes: int = 4096) -> int:
+    with pytest.raises(HTTPException) as error:
+        _receive(loop, request, max_bytes)
+    return error.value.status_code
+
+
+@pytest.mark.parametrize("head, expected", [
+    (PNG[:16], ("image/png", "png")),
+    (b"\xff\xd8\xff\xe0" + bytes(12), ("image/jpeg", "jpg")),
+    (b"GIF89a" + bytes(10), ("image/gif", "gif")),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", ("image/webp", "webp")),
+    (b"<svg xmlns=...>", None),
+])
+def test_sniff_image(head, expected):
+    assert sniff_image(head) == expected
+
+
+def test_image_is_written_to_temp_file(loop, temp_dir):
+    image = _receive(loop, _request(_multipart(("title", b"ignored"), ("file", PNG))))
+
+    with open(image.path, "rb") as file:
+        assert file.read() == PNG
+    assert (image.content_type, image.extension, image.size) == ("image/png", "png", len(PNG))
+    assert image.path.startswith(str(temp_dir))
+
+    image.discard()
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_image_at_limit_is_accepted(loop):
+    image = _receive(loop, _request(_multipart(("file", PNG))), max_bytes=len(PNG))
+
+    assert image.size == len(PNG)
+    image.discard()
+
+
+def test_image_over_limit_is_rejected_without_leftovers(loop, temp_dir):
+    assert _status(loop, _request(_multipart(("file", PNG))), max_bytes=len(PNG) - 1) == 413
+    assert list(temp_dir.iterdir()) == []
+
+
+def test_raw_body_over_limit_is_rejected(loop, temp_dir):
+    # Поле файла в лимите, но тело целиком больше лимита с запасом на заголовки частей
+    body = _multipart(("padding", bytes(CHUNK_SIZE + 8192)), ("file", PNG))
+
+    assert _status(loop, _request(body, chunk=64 * 1024)) == 413
+    assert list(temp_dir.iterdir()) == []
+
+
+@pytest.mark.parametrize("request_args, expected", [
+    ((_multipart(("file", b"plain text, not an image")),), 415),
+    ((_multipart(("avatar", PNG)),), 400),
+    ((_multipart(("file", PNG)), "application/json"), 400),
+    ((b"--" + BOUNDARY.encode() + b"\r\nbroken",), 400),
+])
+def test_invalid_uploads(loop, temp_dir, request_args, expected):
+    assert _status(loop, _request(*request_args)) == expected
+    assert list(temp_dir.iterdir()) == []